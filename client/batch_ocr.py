@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import os
+import io
+import csv
+import json
+import time
+import tarfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.npy')
+FIELDS = ['key', 'timing', 'confidence', 'valid', 'ms', 'error']
+
+_detector = None
+_datasets = {}
+
+def _init_worker():
+    global _detector
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    import cv2
+    cv2.setNumThreads(1)
+    from working_ocr_detector import WorkingOCRDetector
+    _detector = WorkingOCRDetector(workers=1)
+
+def _decode(name, data):
+    if name.endswith('.npy'):
+        import numpy as np
+        return Image.fromarray(np.load(io.BytesIO(data)))
+    return Image.open(io.BytesIO(data)).convert('RGB')
+
+def _load_dataset(path):
+    if path not in _datasets:
+        from ocr_dataset import OCRDataset
+        dataset = OCRDataset(path)
+        _datasets[path] = (dataset, dataset.crops())
+    return _datasets[path]
+
+def _load_chunk(keys):
+    container, _, _ = keys[0].partition('#')
+    if container.endswith('.tar') and '#' in keys[0]:
+        with tarfile.open(container) as archive:
+            for key in keys:
+                member = key.partition('#')[2]
+                yield key, lambda member=member: _decode(member, archive.extractfile(member).read())
+    elif os.path.isdir(container) and '#' in keys[0]:
+        dataset, crops = _load_dataset(container)
+        for key in keys:
+            yield key, lambda index=int(key.partition('#')[2]): dataset.image(index, crops)
+    else:
+        for key in keys:
+            yield key, lambda key=key: _decode(key, open(key, 'rb').read())
+
+def ocr_chunk(keys):
+    if _detector is None:
+        _init_worker()
+    results = []
+    for key, load in _load_chunk(keys):
+        started = time.perf_counter()
+        timing = None
+        confidence = 0.0
+        error = ''
+        try:
+            result = _detector.recognize(load())
+            timing, confidence = result.timing, result.confidence
+        except Exception as e:
+            error = str(e)
+        results.append({
+            'key': key,
+            'timing': timing or '',
+            'confidence': round(confidence, 3),
+            'valid': bool(timing and _detector.is_valid_timing(timing)),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'error': error
+        })
+    return results
+
+def iter_keys(source):
+    if os.path.isdir(source) and os.path.exists(os.path.join(source, 'meta.json')):
+        from ocr_dataset import OCRDataset
+        for index in range(len(OCRDataset(source))):
+            yield f"{source}#{index}"
+    elif os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if name.endswith('.tar'):
+                yield from iter_keys(path)
+            elif name.endswith(IMAGE_EXTENSIONS):
+                yield path
+    elif source.endswith('.tar'):
+        with tarfile.open(source) as archive:
+            for member in archive.getmembers():
+                if member.isfile() and member.name.endswith(IMAGE_EXTENSIONS):
+                    yield f"{source}#{member.name}"
+    else:
+        yield source
+
+def chunked(keys, chunk_size):
+    chunk = []
+    for key in keys:
+        if chunk and (len(chunk) >= chunk_size or key.partition('#')[0] != chunk[0].partition('#')[0]):
+            yield chunk
+            chunk = []
+        chunk.append(key)
+    if chunk:
+        yield chunk
+
+class ResultWriter:
+    def __init__(self, path, output_format=None, resume=True):
+        self.path = path
+        self.format = output_format or ('csv' if path.endswith('.csv') else 'jsonl')
+        self.done = self._load_done() if resume else set()
+        exists = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'a' if resume else 'w', newline='', encoding='utf-8')
+        self.csv = csv.DictWriter(self.file, fieldnames=FIELDS) if self.format == 'csv' else None
+        if self.csv and not exists:
+            self.csv.writeheader()
+    
+    def _load_done(self):
+        if not os.path.exists(self.path):
+            return set()
+        
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete < len(data):
+                f.truncate(complete)
+        
+        lines = data[:complete].decode('utf-8').splitlines()
+        if self.format == 'csv':
+            return {row['key'] for row in csv.DictReader(lines)}
+        done = set()
+        for line in lines:
+            try:
+                done.add(json.loads(line)['key'])
+            except (ValueError, KeyError):
+                continue
+        return done
+    
+    def write(self, results):
+        for result in results:
+            if self.csv:
+                self.csv.writerow(result)
+            else:
+                self.file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self.file.flush()
+    
+    def close(self):
+        self.file.close()
+
+def batch_ocr(sources, output, workers=None, chunk_size=32, output_format=None, resume=True, limit=None,
+              progress_interval=5.0):
+    writer = ResultWriter(output, output_format, resume)
+    keys = [key for source in sources for key in iter_keys(source) if key not in writer.done]
+    if limit:
+        keys = keys[:limit]
+    
+    stats = {'total': len(keys), 'done': 0, 'valid': 0, 'errors': 0, 'skipped': len(writer.done), 'seconds': 0.0}
+    if not keys:
+        writer.close()
+        return stats
+    
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    last_report = started
+    chunks = chunked(keys, chunk_size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = set()
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.add(executor.submit(ocr_chunk, chunk))
+                if not pending:
+                    break
+                
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results = future.result()
+                    writer.write(results)
+                    stats['done'] += len(results)
+                    stats['valid'] += sum(1 for r in results if r['valid'])
+                    stats['errors'] += sum(1 for r in results if r['error'])
+                
+                now = time.perf_counter()
+                if progress_interval and now - last_report >= progress_interval:
+                    last_report = now
+                    rate = stats['done'] / (now - started)
+                    eta = (stats['total'] - stats['done']) / rate if rate else 0
+                    print(f"⏳ {stats['done']}/{stats['total']} crops, {rate:.1f} crops/s, ETA {eta:.0f}s")
+    finally:
+        writer.close()
+        stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Run WorkingOCRDetector over directories, tar segments or OCR datasets')
+    parser.add_argument('sources', nargs='+', help='Image files, directories, segment_*.tar archives or OCR dataset directories')
+    parser.add_argument('-o', '--output', required=True, help='Results file (.csv or .jsonl)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='Output format (default: from the file extension)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=32, help='Crops sent to a worker at a time')
+    parser.add_argument('--limit', type=int, help='Process at most this many new crops')
+    parser.add_argument('--restart', action='store_true', help='Overwrite the output instead of resuming')
+    args = parser.parse_args()
+    
+    stats = batch_ocr(args.sources, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                      output_format=args.format, resume=not args.restart, limit=args.limit)
+    
+    if stats['skipped']:
+        print(f"⏭️ Skipped {stats['skipped']} crops already in {args.output}")
+    rate = stats['done'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"✅ OCR'd {stats['done']} crops in {stats['seconds']:.1f}s ({rate:.1f} crops/s), "
+          f"{stats['valid']} valid timings, {stats['errors']} errors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import gzip
+import time
+import random
+import socket
+import asyncio
+import argparse
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import shared_path
+from shared.subtitle_fetcher import SubtitleFetcher, AsyncSubtitleFetcher
+
+
+def make_vtt(cues, seed=0):
+    lines = ['WEBVTT', '']
+    for i in range(cues):
+        start = i * 3 + seed
+        lines += [
+            str(i + 1),
+            f"{start // 3600:02d}:{start // 60 % 60:02d}:{start % 60:02d}.250 --> "
+            f"{start // 3600:02d}:{start // 60 % 60:02d}:{start % 60:02d}.900",
+            f"Реплика номер {i} из серии {seed}",
+            ''
+        ]
+    return '\n'.join(lines).encode('utf-8')
+
+
+class SubtitleHTTPServer:
+    def __init__(self, host='127.0.0.1', port=0, cues=800, tracks=4, latency=0.0, fail_rate=0.0, compress=True):
+        self.bodies = {f"/track_{i}.vtt": make_vtt(cues, i) for i in range(tracks)}
+        self.gzipped = {path: gzip.compress(body) for path, body in self.bodies.items()}
+        self.etags = {path: '"' + hashlib.md5(body).hexdigest() + '"' for path, body in self.bodies.items()}
+        self.last_modified = formatdate(usegmt=True)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                server.count('connections')
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.fail_rate and random.random() < server.fail_rate:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                    server.count('failed')
+                    return
+                if self.path not in server.bodies:
+                    self.send_error(404)
+                    return
+
+                etag = server.etags[self.path]
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    server.count('not_modified')
+                    return
+
+                body = server.bodies[self.path]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/vtt; charset=utf-8')
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', server.last_modified)
+                if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = server.gzipped[self.path]
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                server.count('body_bytes', len(body))
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def run_requests_get(urls):
+    ok = 0
+    for url in urls:
+        try:
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            ok += bool(response.text)
+        except requests.RequestException:
+            pass
+    return ok
+
+
+def run_fetcher(fetcher, urls):
+    return sum(1 for url in urls if fetcher.fetch(url))
+
+
+async def run_async_fetcher(fetcher, urls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url):
+        async with semaphore:
+            return bool(await fetcher.fetch(url))
+
+    try:
+        return sum(await asyncio.gather(*(fetch(url) for url in urls)))
+    finally:
+        await fetcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark subtitle downloads against a local HTTP server')
+    parser.add_argument('--requests', type=int, default=400, help='Downloads per scenario')
+    parser.add_argument('--tracks', type=int, default=4, help='Distinct subtitle files served')
+    parser.add_argument('--cues', type=int, default=800, help='Cues per subtitle file')
+    parser.add_argument('--latency', type=float, default=0.002, help='Server think time per request, seconds')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests answered with 503')
+    parser.add_argument('--no-gzip', action='store_true', help='Serve uncompressed bodies')
+    parser.add_argument('--concurrency', type=int, default=8, help='Parallel downloads in the async scenario')
+    parser.add_argument('--url', help='Benchmark this URL instead of the local server')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        urls = [args.url] * args.requests
+    else:
+        server = SubtitleHTTPServer(cues=args.cues, tracks=args.tracks, latency=args.latency,
+                                    fail_rate=args.fail_rate, compress=not args.no_gzip).start()
+        urls = [f"{server.url}/track_{i % args.tracks}.vtt" for i in range(args.requests)]
+        print(f"📡 Serving {args.tracks} tracks of {len(server.bodies['/track_0.vtt'])} bytes at {server.url}")
+
+    scenarios = [
+        ('requests.get', lambda: run_requests_get(urls), None),
+        ('pooled', None, SubtitleFetcher(cache_size=0)),
+        ('pooled+etag', None, SubtitleFetcher()),
+        (f'async x{args.concurrency}', None, AsyncSubtitleFetcher(pool_size=args.concurrency))
+    ]
+
+    print(f"{'scenario':<14} {'ok':>6} {'req/s':>8} {'ms/req':>8} {'conns':>6} {'304':>6} {'retries':>8} {'body KB':>9}")
+    try:
+        for name, run, fetcher in scenarios:
+            if server:
+                server.reset()
+            if isinstance(fetcher, AsyncSubtitleFetcher):
+                run = lambda: asyncio.run(run_async_fetcher(fetcher, urls, args.concurrency))
+            elif fetcher is not None:
+                run = lambda: run_fetcher(fetcher, urls)
+
+            started = time.perf_counter()
+            ok = run()
+            elapsed = time.perf_counter() - started
+
+            counters = server.counters if server else {}
+            retries = fetcher.stats()['retried'] if fetcher else '-'
+            print(f"{name:<14} {ok:>6} {len(urls) / elapsed:>8.1f} {elapsed / len(urls) * 1000:>8.2f} "
+                  f"{counters.get('connections', '-'):>6} {counters.get('not_modified', '-'):>6} {retries:>8} "
+                  f"{counters.get('body_bytes', 0) / 1024:>9.1f}")
+            if isinstance(fetcher, SubtitleFetcher):
+                fetcher.close()
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
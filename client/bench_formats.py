@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import argparse
+import tempfile
+
+from vtt_parser import VTTParser
+
+
+def _clock(ms, separator='.', hour_digits=2, fraction_digits=3):
+    fraction = ms % 1000 if fraction_digits == 3 else ms % 1000 // 10
+    return (f"{ms // 3600000:0{hour_digits}d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}"
+            f"{separator}{fraction:0{fraction_digits}d}")
+
+
+def _cues(count):
+    for i in range(count):
+        start = i * 3000 + 250
+        yield i, start, start + 2400, f"Реплика номер {i}, вторая половина", f"and an English line {i}"
+
+
+def make_vtt(count):
+    lines = ['WEBVTT', '']
+    for i, start, end, first, second in _cues(count):
+        lines += [str(i + 1), f"{_clock(start)} --> {_clock(end)}", f"<i>{first}</i>", second, '']
+    return '\n'.join(lines)
+
+
+def make_srt(count):
+    lines = []
+    for i, start, end, first, second in _cues(count):
+        lines += [str(i + 1), f"{_clock(start, ',')} --> {_clock(end, ',')}",
+                  f'<font color="#ffff00">{first}</font>', f"<i>{second}</i>", '']
+    return '\n'.join(lines)
+
+
+def make_ass(count):
+    lines = [
+        '[Script Info]', 'ScriptType: v4.00+', '',
+        '[V4+ Styles]', 'Format: Name, Fontname, Fontsize', 'Style: Default,Arial,20', '',
+        '[Events]', 'Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text'
+    ]
+    for i, start, end, first, second in _cues(count):
+        lines.append(f"Dialogue: 0,{_clock(start, '.', 1, 2)},{_clock(end, '.', 1, 2)},Default,,0,0,0,,"
+                     f"{{\\fad(200,200)\\i1}}{first}{{\\i0}}\\N{second}")
+    return '\n'.join(lines)
+
+
+def make_ttml(count):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<tt xmlns="http://www.w3.org/ns/ttml" xmlns:tts="http://www.w3.org/ns/ttml#styling" xml:lang="ru">',
+        '<body><div>'
+    ]
+    for i, start, end, first, second in _cues(count):
+        lines.append(f'<p begin="{_clock(start)}" end="{_clock(end)}"><span tts:fontStyle="italic">{first}</span>'
+                     f'<br/>{second}</p>')
+    lines += ['</div></body>', '</tt>']
+    return '\n'.join(lines)
+
+
+GENERATORS = {'vtt': make_vtt, 'srt': make_srt, 'ass': make_ass, 'ttml': make_ttml}
+
+
+def bench(load, repeat):
+    best = None
+    parser = None
+    for _ in range(repeat):
+        parser = VTTParser()
+        started = time.perf_counter()
+        if not load(parser):
+            raise AssertionError("nothing parsed")
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parser
+
+
+def report(name, path_label, size, seconds, parser):
+    cues = len(parser.subtitles)
+    print(f"{name:<6} {path_label:<8} {parser.format:<6} {cues:>8} {size / 1e6:>8.2f} {seconds * 1000:>9.1f} "
+          f"{cues / seconds / 1000:>9.1f} {size / seconds / 1e6:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure subtitle parse throughput per format')
+    parser.add_argument('--cues', type=int, default=20000, help='Cues in each generated track')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the best one is reported')
+    parser.add_argument('--formats', default=','.join(GENERATORS), help='Generated formats to benchmark')
+    parser.add_argument('files', nargs='*', help='Also benchmark these subtitle files')
+    args = parser.parse_args()
+
+    print(f"{'format':<6} {'path':<8} {'parsed':<6} {'cues':>8} {'MB':>8} {'ms':>9} {'kcues/s':>9} {'MB/s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.formats.split(','):
+            content = GENERATORS[name](args.cues)
+            data = content.encode('utf-8')
+            path = os.path.join(directory, f"track.{name}")
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            seconds, result = bench(lambda p: p.parse_content(content), args.repeat)
+            report(name, 'text', len(data), seconds, result)
+            seconds, result = bench(lambda p: p.load_from_file(path), args.repeat)
+            report(name, 'mmap', len(data), seconds, result)
+
+    for path in args.files:
+        seconds, result = bench(lambda p: p.load_from_file(path), args.repeat)
+        report(os.path.basename(path)[:6], 'mmap', os.path.getsize(path), seconds, result)
+
+
+if __name__ == "__main__":
+    main()
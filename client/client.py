@@ -4,9 +4,18 @@ import json
 import signal
 import sys
 import uuid
+import time
 import logging
+import os
+import base64
 from datetime import datetime
-from screenshot_workflow import ScreenshotWorkflow
+from screenshot_workflow import ScreenshotWorkflow, SUBTITLE_SOURCES
+from input_backend import BACKENDS, create_backend
+from file_manager import FileManager, add_storage_arguments
+from ocr_dataset import OCRDataset, add_dataset_arguments
+from timing_locator import add_locator_arguments
+import shared_path
+from shared.protocol import WireCodec, ProtocolError, negotiate_protocol, PROTOCOL_JSON, PROTOCOL_VERSION
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -16,15 +25,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class ScreenshotClient:
-    def __init__(self, server_host='localhost', server_port=8765, vtt_url=None, enable_tts=True):
+    def __init__(self, server_host='localhost', server_port=8765, vtt_url=None, enable_tts=True,
+                 protocol='auto', deflate=False, seek_step=5.0, input_backend=None,
+                 file_manager=None, ocr_dataset=None, timing_roi='auto', roi_cache='timing_roi.json',
+                 subsecond=False, subtitle_source='local'):
         self.server_host = server_host
         self.server_port = server_port
         self.websocket = None
+        self.protocol = protocol
+        self.deflate = deflate
+        self.codec = WireCodec()
         self.client_id = str(uuid.uuid4())[:8]
-        self.workflow = ScreenshotWorkflow(vtt_url=vtt_url, enable_tts=enable_tts)
+        self.workflow = ScreenshotWorkflow(vtt_url=vtt_url, enable_tts=enable_tts, seek_step=seek_step,
+                                           input_backend=input_backend, file_manager=file_manager,
+                                           ocr_dataset=ocr_dataset, timing_roi=timing_roi, roi_cache=roi_cache,
+                                           subsecond=subsecond, subtitle_source=subtitle_source)
         self.is_running = False
         self.reconnect_delay = 5
         self.max_reconnect_delay = 60
+        self.heartbeat_interval = 30
+        self.heartbeat_id = 0
+        self.heartbeat_sent_at = {}
+        self.last_rtt_ms = None
     
     async def connect_to_server(self):
         uri = f"ws://{self.server_host}:{self.server_port}"
@@ -47,15 +69,16 @@ class ScreenshotClient:
     
     async def handle_connection(self):
         self.reconnect_delay = 5
+        self.codec = WireCodec()
         logger.info("Connection established, waiting for server messages...")
         
         async for message in self.websocket:
             try:
-                data = json.loads(message)
+                data = WireCodec.decode(message)
                 logger.debug(f"Received message from server: {data.get('type', 'unknown')}")
                 await self.handle_server_message(data)
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON received: {message[:100]}...")
+            except ProtocolError as e:
+                logger.warning(f"Invalid message received: {e}")
                 continue
             except Exception as e:
                 logger.error(f"Error handling message: {e}")
@@ -66,6 +89,16 @@ class ScreenshotClient:
         
         if message_type == 'connection_established':
             logger.info(f"Connection established with server. Ready for manual screenshot commands.")
+            await self.send_message({
+                'type': 'client_hello',
+                'client_id': self.client_id,
+                'timestamp': datetime.now().isoformat()
+            })
+            await self.select_protocol(data)
+            await self.subscribe_subtitles()
+        
+        elif message_type == 'protocol_selected':
+            logger.info(f"Server confirmed protocol: {data.get('protocol')} (deflate={data.get('deflate')})")
         
         elif message_type == 'execute_screenshot':
             command_id = data.get('command_id', 'unknown')
@@ -76,8 +109,9 @@ class ScreenshotClient:
         elif message_type == 'execute_left_key':
             command_id = data.get('command_id', 'unknown')
             telegram_user_id = data.get('telegram_user_id')
-            logger.info(f"Executing left key command: {command_id}")
-            await self.execute_left_key_command(command_id, telegram_user_id)
+            count = data.get('count', 1)
+            logger.info(f"Executing left key command: {command_id} (x{count})")
+            await self.execute_left_key_command(command_id, telegram_user_id, count)
         
         elif message_type == 'execute_space_key':
             command_id = data.get('command_id', 'unknown')
@@ -85,6 +119,13 @@ class ScreenshotClient:
             logger.info(f"Executing space key command: {command_id}")
             await self.execute_space_key_command(command_id, telegram_user_id)
         
+        elif message_type == 'execute_seek_cue':
+            command_id = data.get('command_id', 'unknown')
+            telegram_user_id = data.get('telegram_user_id')
+            offset = data.get('offset', -1)
+            logger.info(f"Executing seek cue command: {command_id} (offset {offset})")
+            await self.execute_seek_cue_command(command_id, telegram_user_id, offset)
+        
         elif message_type == 'execute_next_subtitle':
             command_id = data.get('command_id', 'unknown')
             telegram_user_id = data.get('telegram_user_id')
@@ -92,11 +133,71 @@ class ScreenshotClient:
             await self.execute_next_subtitle_command(command_id, telegram_user_id)
         
         elif message_type == 'heartbeat_ack':
-            logger.debug("Heartbeat acknowledged by server")
+            self.handle_heartbeat_ack(data)
+        
+        elif message_type == 'subtitle_track':
+            self.handle_subtitle_track(data)
         
         else:
             logger.warning(f"Unknown message type received: {message_type}")
     
+    async def select_protocol(self, data):
+        if self.protocol == PROTOCOL_JSON:
+            return
+        
+        offered = data.get('protocols', [PROTOCOL_JSON])
+        if data.get('protocol_version') != PROTOCOL_VERSION:
+            offered = [PROTOCOL_JSON]
+        
+        protocol = negotiate_protocol(offered, None if self.protocol == 'auto' else self.protocol)
+        if protocol == PROTOCOL_JSON:
+            return
+        
+        await self.send_message({
+            'type': 'protocol_select',
+            'client_id': self.client_id,
+            'protocol': protocol,
+            'protocol_version': PROTOCOL_VERSION,
+            'deflate': self.deflate
+        })
+        self.codec = WireCodec(protocol, deflate=self.deflate)
+        logger.info(f"Switched to {self.codec}")
+    
+    async def subscribe_subtitles(self):
+        if not self.websocket:
+            return
+        urls = self.workflow.subtitle_urls()
+        if self.workflow.subtitle_source != 'server':
+            urls = [url for url in urls if '://' in url and not url.startswith('file://')]
+            if urls:
+                await self.send_message({
+                    'type': 'subtitle_announce',
+                    'client_id': self.client_id,
+                    'urls': urls
+                })
+            return
+        await self.send_message({
+            'type': 'subtitle_subscribe',
+            'client_id': self.client_id,
+            'urls': urls,
+            'hashes': [self.workflow.track_hashes.get(url) for url in urls]
+        })
+    
+    def handle_subtitle_track(self, data):
+        url = data.get('url')
+        if data.get('error'):
+            logger.warning(f"Server could not load subtitles {url}: {data['error']}")
+            return
+        blob = data.get('blob')
+        if isinstance(blob, str):
+            blob = base64.b64decode(blob)
+        if blob is None:
+            logger.info(f"Subtitles unchanged on the server: {url}")
+        self.workflow.apply_track(url, data.get('hash'), blob)
+    
+    async def send_message(self, message):
+        await self.websocket.send(self.codec.encode(message))
+    
     async def execute_screenshot_command(self, command_id, telegram_user_id=None):
         try:
             logger.info(f"Starting screenshot workflow for command: {command_id}")
@@ -121,6 +222,8 @@ class ScreenshotClient:
                 'subtitle_text': eng_subtitle_text if eng_subtitle_text else subtitle_text,
                 'russian_text': subtitle_text,
                 'timing': timing,
+                'url': self.workflow.vtt_url,
+                'position': result.get('position'),
                 'result': {
                     'timing': result.get('timing'),
                     'mouse_position': {
@@ -133,7 +236,7 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(response))
+                await self.send_message(response)
                 logger.info(f"Sent completion response to server for command: {command_id}")
         
         except Exception as e:
@@ -148,14 +251,13 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(error_response))
+                await self.send_message(error_response)
                 logger.info(f"Sent error response to server for command: {command_id}")
     
-    async def execute_left_key_command(self, command_id, telegram_user_id=None):
+    async def execute_left_key_command(self, command_id, telegram_user_id=None, count=1):
         try:
-            from mouse_controller import MouseController
-            controller = MouseController()
-            mouse_position = controller.press_left_key()
+            controller = self.workflow.mouse_controller
+            mouse_position = controller.press_left_key(presses=count)
             
             response = {
                 'type': 'left_key_completed',
@@ -167,12 +269,13 @@ class ScreenshotClient:
                     'mouse_position': {
                         'x': mouse_position.x,
                         'y': mouse_position.y
-                    }
+                    },
+                    'count': count
                 }
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(response))
+                await self.send_message(response)
                 logger.info(f"Sent left key completion response to server for command: {command_id}")
         
         except Exception as e:
@@ -187,13 +290,12 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(error_response))
+                await self.send_message(error_response)
                 logger.info(f"Sent left key error response to server for command: {command_id}")
     
     async def execute_space_key_command(self, command_id, telegram_user_id=None):
         try:
-            from mouse_controller import MouseController
-            controller = MouseController()
+            controller = self.workflow.mouse_controller
             mouse_position = controller.press_space_key()
             
             response = {
@@ -211,7 +313,7 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(response))
+                await self.send_message(response)
                 logger.info(f"Sent space key completion response to server for command: {command_id}")
         
         except Exception as e:
@@ -226,13 +328,56 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(error_response))
+                await self.send_message(error_response)
                 logger.info(f"Sent space key error response to server for command: {command_id}")
     
+    async def execute_seek_cue_command(self, command_id, telegram_user_id=None, offset=-1):
+        try:
+            result = self.workflow.execute_seek_cue(offset)
+            mouse_position = result['mouse_position']
+            
+            response = {
+                'type': 'seek_cue_completed',
+                'client_id': self.client_id,
+                'command_id': command_id,
+                'telegram_user_id': telegram_user_id,
+                'timestamp': datetime.now().isoformat(),
+                'result': {
+                    'mouse_position': {
+                        'x': mouse_position.x,
+                        'y': mouse_position.y
+                    },
+                    'timing': result['timing'],
+                    'target_timing': result['target_timing'],
+                    'steps': result['steps'],
+                    'subtitle_text': result['subtitle_text']
+                }
+            }
+            
+            if self.websocket:
+                await self.send_message(response)
+                logger.info(f"Sent seek completion response to server for command: {command_id}")
+        
+        except Exception as e:
+            logger.error(f"Error executing seek: {e}")
+            error_response = {
+                'type': 'seek_cue_error',
+                'client_id': self.client_id,
+                'command_id': command_id,
+                'telegram_user_id': telegram_user_id,
+                'timestamp': datetime.now().isoformat(),
+                'error': str(e)
+            }
+            
+            if self.websocket:
+                await self.send_message(error_response)
+                logger.info(f"Sent seek error response to server for command: {command_id}")
+    
     async def execute_next_subtitle_command(self, command_id, telegram_user_id=None):
         try:
             logger.info(f"Executing next subtitle command: {command_id}")
             result = self.workflow.execute_next_subtitle()
+            await self.subscribe_subtitles()
             
             response = {
                 'type': 'next_subtitle_completed',
@@ -247,7 +392,7 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(response))
+                await self.send_message(response)
                 logger.info(f"Sent next subtitle completion response to server for command: {command_id}")
         
         except Exception as e:
@@ -262,23 +407,36 @@ class ScreenshotClient:
             }
             
             if self.websocket:
-                await self.websocket.send(json.dumps(error_response))
+                await self.send_message(error_response)
                 logger.info(f"Sent next subtitle error response to server for command: {command_id}")
     
     async def send_heartbeat(self):
-        while self.is_running and self.websocket:
+        while self.is_running:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not self.websocket or self.websocket.closed:
+                continue
             try:
+                self.heartbeat_id += 1
                 heartbeat = {
                     'type': 'heartbeat',
                     'client_id': self.client_id,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': datetime.now().isoformat(),
+                    'heartbeat_id': self.heartbeat_id,
+                    'rtt_ms': self.last_rtt_ms
                 }
-                await self.websocket.send(json.dumps(heartbeat))
+                self.heartbeat_sent_at[self.heartbeat_id] = time.monotonic()
+                await self.send_message(heartbeat)
                 logger.debug("Sent heartbeat to server")
-                await asyncio.sleep(30)
             except Exception as e:
                 logger.warning(f"Heartbeat failed: {e}")
-                break
+    
+    def handle_heartbeat_ack(self, data):
+        sent_at = self.heartbeat_sent_at.pop(data.get('heartbeat_id'), None)
+        if sent_at is not None:
+            self.last_rtt_ms = round((time.monotonic() - sent_at) * 1000, 1)
+        for heartbeat_id in [i for i in self.heartbeat_sent_at if i < self.heartbeat_id - 10]:
+            del self.heartbeat_sent_at[heartbeat_id]
+        logger.debug(f"Heartbeat acknowledged by server (RTT: {self.last_rtt_ms} ms)")
     
     async def start(self):
         self.is_running = True
@@ -309,6 +467,20 @@ async def main():
     parser.add_argument('--port', type=int, default=8765, help='Server port')
     parser.add_argument('--vtt-url', help='URL to VTT subtitles file')
     parser.add_argument('--no-tts', action='store_true', help='Disable TTS functionality')
+    parser.add_argument('--protocol', choices=['auto', 'json', 'msgpack'], default='auto',
+                        help='Wire protocol to negotiate with the server')
+    parser.add_argument('--deflate', action='store_true', help='Compress large binary messages')
+    parser.add_argument('--input-backend', choices=sorted(BACKENDS), default=os.getenv('INPUT_BACKEND', 'pyautogui'),
+                        help='How key presses and clicks are injected')
+    parser.add_argument('--key-delay', type=float, default=None, help='Seconds between repeated key presses')
+    parser.add_argument('--click-delay', type=float, default=None, help='Seconds to wait after each click')
+    add_storage_arguments(parser)
+    add_dataset_arguments(parser)
+    add_locator_arguments(parser)
+    parser.add_argument('--subtitle-source', choices=SUBTITLE_SOURCES, default='local',
+                        help='Download subtitles here or receive pre-indexed tracks from the server')
+    parser.add_argument('--seek-step', type=float, default=5.0,
+                        help='Seconds the player seeks per left/right arrow press')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     
     args = parser.parse_args()
@@ -317,7 +489,13 @@ async def main():
         logging.getLogger().setLevel(logging.DEBUG)
         logger.info("Debug logging enabled")
     
-    client = ScreenshotClient(args.host, args.port, args.vtt_url, enable_tts=not args.no_tts)
+    input_backend = create_backend(args.input_backend, args.key_delay, args.click_delay)
+    client = ScreenshotClient(args.host, args.port, args.vtt_url, enable_tts=not args.no_tts,
+                              protocol=args.protocol, deflate=args.deflate, seek_step=args.seek_step,
+                              input_backend=input_backend, file_manager=FileManager.from_args(args),
+                              ocr_dataset=OCRDataset.from_args(args), timing_roi=args.timing_roi,
+                              roi_cache=args.roi_cache, subsecond=args.subsecond,
+                              subtitle_source=args.subtitle_source)
     
     def signal_handler(sig, frame):
         logger.info(f"Received signal {sig}, shutting down...")
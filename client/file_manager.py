@@ -1,26 +1,213 @@
 import os
+import io
+import time
+import queue
+import atexit
+import tarfile
+import threading
+from collections import deque
 from datetime import datetime
 
+ENCODINGS = ('png', 'npy', 'skip')
+MANAGED_PREFIXES = ('screenshot_', 'segment_')
+
 class FileManager:
-    def __init__(self, output_dir="screenshots"):
+    def __init__(self, output_dir="screenshots", encoding='png', png_compress_level=1, max_files=None,
+                 max_bytes=None, max_age=None, segment_size=0, queue_size=64):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown screenshot encoding '{encoding}', choose from: {', '.join(ENCODINGS)}")
         self.output_dir = output_dir
+        self.encoding = encoding
+        self.png_compress_level = png_compress_level
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_size = segment_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.files = deque()
+        self.total_bytes = 0
+        self.segment = None
+        self.segment_path = None
+        self.next_segment_path = None
+        self.next_segment_members = 0
+        self.segment_count = 0
+        self.written = 0
+        self.dropped = 0
+        self.deleted = 0
+        self.errors = 0
         self._ensure_output_directory()
+        self._scan_existing_files()
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
     
     def _ensure_output_directory(self):
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
     
+    def _scan_existing_files(self):
+        entries = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and entry.name.startswith(MANAGED_PREFIXES):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        for mtime, path, size in sorted(entries):
+            self.files.append((path, size, mtime))
+            self.total_bytes += size
+    
     def generate_timestamp_filename(self, extension="png"):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
         return f"screenshot_{timestamp}.{extension}"
     
     def save_image(self, image, filename=None):
+        if self.encoding == 'skip':
+            return None
+        
         if filename is None:
-            filename = self.generate_timestamp_filename()
+            filename = self.generate_timestamp_filename(self.encoding)
         
-        filepath = os.path.join(self.output_dir, filename)
-        image.save(filepath)
+        segment_path = None
+        if self.segment_size:
+            if self.next_segment_path is None or self.next_segment_members >= self.segment_size:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+                self.segment_count += 1
+                self.next_segment_path = os.path.join(self.output_dir, f"segment_{timestamp}_{self.segment_count:04d}.tar")
+                self.next_segment_members = 0
+            segment_path = self.next_segment_path
+            filepath = f"{segment_path}#{filename}"
+        else:
+            filepath = os.path.join(self.output_dir, filename)
+        
+        try:
+            self.queue.put_nowait((image, filename, segment_path))
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ Screenshot writer is behind, dropped {filename}")
+            return None
+        if segment_path:
+            self.next_segment_members += 1
         return filepath
     
+    def _encode(self, image):
+        buffer = io.BytesIO()
+        if self.encoding == 'npy':
+            import numpy as np
+            np.save(buffer, np.asarray(image))
+        else:
+            image.save(buffer, format='PNG', compress_level=self.png_compress_level)
+        return buffer.getvalue()
+    
+    def _writer_loop(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                image, filename, segment_path = item
+                data = self._encode(image)
+                if segment_path:
+                    self._append_to_segment(segment_path, filename, data)
+                else:
+                    self._write_file(filename, data)
+                self.written += 1
+                self._apply_retention()
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Failed to save screenshot: {e}")
+            finally:
+                self.queue.task_done()
+    
+    def _write_file(self, filename, data):
+        filepath = os.path.join(self.output_dir, filename)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        self._track(filepath, len(data))
+    
+    def _append_to_segment(self, segment_path, filename, data):
+        if self.segment_path != segment_path:
+            self._close_segment()
+            self.segment_path = segment_path
+            self.segment = tarfile.open(segment_path, 'w')
+        
+        info = tarfile.TarInfo(filename)
+        info.size = len(data)
+        info.mtime = time.time()
+        self.segment.addfile(info, io.BytesIO(data))
+        self.segment.fileobj.flush()
+    
+    def _close_segment(self):
+        if self.segment is None:
+            return
+        self.segment.close()
+        self._track(self.segment_path, os.path.getsize(self.segment_path))
+        self.segment = None
+        self.segment_path = None
+        self._apply_retention()
+    
+    def _track(self, path, size):
+        self.files.append((path, size, time.time()))
+        self.total_bytes += size
+    
+    def _apply_retention(self):
+        deadline = time.time() - self.max_age if self.max_age else None
+        while self.files:
+            path, size, mtime = self.files[0]
+            over_count = self.max_files is not None and len(self.files) > self.max_files
+            over_size = self.max_bytes is not None and self.total_bytes > self.max_bytes
+            expired = deadline is not None and mtime < deadline
+            if not (over_count or over_size or expired):
+                break
+            self.files.popleft()
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+                self.deleted += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"❌ Failed to remove old screenshot {path}: {e}")
+    
+    def flush(self):
+        self.queue.join()
+    
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self._close_segment()
+    
+    def stats(self):
+        return {
+            'pending': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'deleted': self.deleted,
+            'errors': self.errors,
+            'files': len(self.files),
+            'bytes': self.total_bytes
+        }
+    
     def get_output_directory(self):
-        return self.output_dir 
\ No newline at end of file
+        return self.output_dir
+    
+    @classmethod
+    def from_args(cls, args, output_dir="screenshots"):
+        return cls(
+            output_dir,
+            encoding=args.save_format,
+            png_compress_level=args.png_level,
+            max_files=args.keep_files,
+            max_bytes=int(args.keep_mb * 1024 * 1024) if args.keep_mb else None,
+            max_age=args.keep_hours * 3600 if args.keep_hours else None,
+            segment_size=args.archive_segment
+        )
+
+def add_storage_arguments(parser):
+    parser.add_argument('--save-format', choices=ENCODINGS, default='png',
+                        help='How screenshots are stored: png, raw numpy array, or not at all')
+    parser.add_argument('--png-level', type=int, default=1, help='PNG compression level 0-9')
+    parser.add_argument('--keep-files', type=int, help='Keep at most this many screenshot files/segments')
+    parser.add_argument('--keep-mb', type=float, help='Keep at most this many megabytes of screenshots')
+    parser.add_argument('--keep-hours', type=float, help='Delete screenshots older than this many hours')
+    parser.add_argument('--archive-segment', type=int, default=0,
+                        help='Pack screenshots into tar segments of this many images (0 writes separate files)')
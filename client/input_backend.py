@@ -0,0 +1,224 @@
+import os
+import shutil
+import subprocess
+import time
+from collections import namedtuple
+
+Point = namedtuple('Point', ['x', 'y'])
+
+KEYSYMS = {
+    'left': 'Left',
+    'right': 'Right',
+    'up': 'Up',
+    'down': 'Down',
+    'space': 'space',
+    'enter': 'Return',
+    'esc': 'Escape',
+    'tab': 'Tab',
+}
+
+
+def key_action(key, presses=1):
+    return ('key', key, presses)
+
+
+def click_action(x=None, y=None):
+    return ('click', x, y)
+
+
+def sleep_action(seconds):
+    return ('sleep', seconds)
+
+
+class InputBackend:
+    name = 'base'
+
+    def __init__(self, key_delay=0.02, click_delay=0.0):
+        self.key_delay = key_delay
+        self.click_delay = click_delay
+
+    def position(self):
+        raise NotImplementedError
+
+    def press(self, key, presses=1):
+        self.run([key_action(key, presses)])
+
+    def click(self, x=None, y=None):
+        self.run([click_action(x, y)])
+
+    def run(self, actions):
+        for action in actions:
+            kind = action[0]
+            if kind == 'key':
+                self._press(action[1], action[2])
+            elif kind == 'click':
+                self._click(action[1], action[2])
+                if self.click_delay:
+                    time.sleep(self.click_delay)
+            elif kind == 'sleep':
+                time.sleep(action[1])
+            else:
+                raise ValueError(f"Unknown input action: {kind}")
+        return self.position()
+
+    def _press(self, key, presses):
+        raise NotImplementedError
+
+    def _click(self, x, y):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    name = 'pyautogui'
+
+    def __init__(self, key_delay=0.02, click_delay=0.0):
+        super().__init__(key_delay, click_delay)
+        import pyautogui
+        self.pyautogui = pyautogui
+        pyautogui.FAILSAFE = True
+        pyautogui.PAUSE = 0
+
+    def position(self):
+        return self.pyautogui.position()
+
+    def _press(self, key, presses):
+        self.pyautogui.press(key, presses=presses, interval=self.key_delay)
+
+    def _click(self, x, y):
+        self.pyautogui.click(x, y)
+
+
+class XdotoolBackend(InputBackend):
+    name = 'xdotool'
+
+    def __init__(self, key_delay=0.02, click_delay=0.0, binary=None):
+        super().__init__(key_delay, click_delay)
+        self.binary = binary or shutil.which('xdotool')
+        if not self.binary:
+            raise RuntimeError("xdotool is not installed")
+
+    def position(self):
+        output = subprocess.run([self.binary, 'getmouselocation', '--shell'],
+                                capture_output=True, text=True, check=True).stdout
+        values = dict(line.split('=', 1) for line in output.splitlines() if '=' in line)
+        return Point(int(values['X']), int(values['Y']))
+
+    def run(self, actions):
+        args = [self.binary]
+        for action in actions:
+            kind = action[0]
+            if kind == 'key':
+                keysym = KEYSYMS.get(action[1], action[1])
+                args += ['key', '--delay', str(int(self.key_delay * 1000))] + [keysym] * action[2]
+            elif kind == 'click':
+                if action[1] is not None and action[2] is not None:
+                    args += ['mousemove', str(action[1]), str(action[2])]
+                args += ['click', '1']
+                if self.click_delay:
+                    args += ['sleep', str(self.click_delay)]
+            elif kind == 'sleep':
+                args += ['sleep', str(action[1])]
+            else:
+                raise ValueError(f"Unknown input action: {kind}")
+        if len(args) > 1:
+            subprocess.run(args, check=True)
+        return self.position()
+
+
+class XTestBackend(InputBackend):
+    name = 'xtest'
+
+    def __init__(self, key_delay=0.02, click_delay=0.0, display=None):
+        super().__init__(key_delay, click_delay)
+        try:
+            from Xlib import X, XK, display as xdisplay
+            from Xlib.ext import xtest
+        except ImportError:
+            raise RuntimeError("python-xlib is not installed (pip install python-xlib)")
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = xdisplay.Display(display)
+        self.root = self.display.screen().root
+        self.keycodes = {}
+
+    def position(self):
+        pointer = self.root.query_pointer()
+        return Point(pointer.root_x, pointer.root_y)
+
+    def _keycode(self, key):
+        if key not in self.keycodes:
+            keysym = self.XK.string_to_keysym(KEYSYMS.get(key, key))
+            keycode = self.display.keysym_to_keycode(keysym)
+            if not keycode:
+                raise ValueError(f"Unknown key: {key}")
+            self.keycodes[key] = keycode
+        return self.keycodes[key]
+
+    def _press(self, key, presses):
+        keycode = self._keycode(key)
+        for i in range(presses):
+            self.xtest.fake_input(self.display, self.X.KeyPress, keycode)
+            self.xtest.fake_input(self.display, self.X.KeyRelease, keycode)
+            self.display.sync()
+            if self.key_delay and i < presses - 1:
+                time.sleep(self.key_delay)
+
+    def _click(self, x, y):
+        if x is not None and y is not None:
+            self.xtest.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.xtest.fake_input(self.display, self.X.ButtonPress, 1)
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, 1)
+        self.display.sync()
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(InputBackend):
+    name = 'recording'
+
+    def __init__(self, key_delay=0.0, click_delay=0.0, position=(0, 0)):
+        super().__init__(key_delay, click_delay)
+        self.pointer = Point(*position)
+        self.actions = []
+
+    def position(self):
+        return self.pointer
+
+    def run(self, actions):
+        for action in actions:
+            if action[0] not in ('key', 'click', 'sleep'):
+                raise ValueError(f"Unknown input action: {action[0]}")
+            if action[0] == 'click' and action[1] is not None and action[2] is not None:
+                self.pointer = Point(action[1], action[2])
+            self.actions.append(action)
+        return self.pointer
+
+
+BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    XdotoolBackend.name: XdotoolBackend,
+    XTestBackend.name: XTestBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def create_backend(name=None, key_delay=None, click_delay=None):
+    name = name or os.getenv('INPUT_BACKEND', PyAutoGUIBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}', choose from: {', '.join(BACKENDS)}")
+    if key_delay is None:
+        key_delay = float(os.getenv('INPUT_KEY_DELAY', '0.02'))
+    if click_delay is None:
+        click_delay = float(os.getenv('INPUT_CLICK_DELAY', '0'))
+    try:
+        return BACKENDS[name](key_delay=key_delay, click_delay=click_delay)
+    except RuntimeError as e:
+        if name != XTestBackend.name:
+            raise
+        print(f"⚠️ Input backend '{name}' unavailable: {e}, falling back to '{PyAutoGUIBackend.name}'")
+        return PyAutoGUIBackend(key_delay=key_delay, click_delay=click_delay)
@@ -4,11 +4,15 @@ import signal
 import sys
 import argparse
 from screenshot_workflow import ScreenshotWorkflow
-from scheduler import TaskScheduler
+from scheduler import TaskScheduler, CueScheduler
+from file_manager import FileManager, add_storage_arguments
+from ocr_dataset import OCRDataset, add_dataset_arguments
+from timing_locator import add_locator_arguments
 
 def signal_handler(sig, frame):
     if scheduler:
         scheduler.stop_scheduled_task()
+        print(f"📊 Scheduler: {scheduler.stats()}")
     sys.exit(0)
 
 def main():
@@ -16,21 +20,37 @@ def main():
     
     parser = argparse.ArgumentParser(description='Screenshot Workflow with VTT Subtitles and TTS')
     parser.add_argument('--vtt-url', help='URL to VTT subtitles file')
-    parser.add_argument('--interval', type=int, default=15, help='Screenshot interval in seconds')
+    parser.add_argument('--interval', type=int, default=15,
+                        help='Screenshot interval in seconds (with --schedule cues: used while the position is unknown)')
+    parser.add_argument('--schedule', choices=['cues', 'interval'], default='cues',
+                        help='Wake just before each subtitle cue starts, or every --interval seconds')
+    parser.add_argument('--lead', type=float, default=0.2, help='Seconds before a cue start to take the screenshot')
+    parser.add_argument('--max-gap', type=float, default=60.0,
+                        help='Take a screenshot at least this often to resync the position during long gaps')
     parser.add_argument('--no-tts', action='store_true', help='Disable TTS functionality')
+    add_storage_arguments(parser)
+    add_dataset_arguments(parser)
+    add_locator_arguments(parser)
     args = parser.parse_args()
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
-    workflow = ScreenshotWorkflow(vtt_url=args.vtt_url, enable_tts=not args.no_tts)
-    scheduler = TaskScheduler(interval_seconds=args.interval)
+    workflow = ScreenshotWorkflow(vtt_url=args.vtt_url, enable_tts=not args.no_tts,
+                                  file_manager=FileManager.from_args(args),
+                                  ocr_dataset=OCRDataset.from_args(args), timing_roi=args.timing_roi,
+                                  roi_cache=args.roi_cache, subsecond=args.subsecond)
+    if args.schedule == 'cues':
+        scheduler = CueScheduler(workflow.playhead, workflow.vtt_parser, interval_seconds=args.interval,
+                                 lead=args.lead, max_gap=args.max_gap)
+    else:
+        scheduler = TaskScheduler(interval_seconds=args.interval)
     
     scheduler.start_scheduled_task(workflow.execute_screenshot_workflow)
     
     try:
         while scheduler.is_task_running():
-            signal.pause()
+            scheduler.thread.join(timeout=1)
     except KeyboardInterrupt:
         signal_handler(signal.SIGINT, None)
 
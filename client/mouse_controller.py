@@ -1,27 +1,44 @@
-import pyautogui
-import time
+from input_backend import Point, create_backend, key_action, click_action
 
 class MouseController:
-    def __init__(self):
-        pyautogui.FAILSAFE = True
-        pyautogui.PAUSE = 0.1
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend()
+        self.listeners = []
+    
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+    
+    def _notify(self, actions):
+        for callback in self.listeners:
+            try:
+                callback(actions)
+            except Exception as e:
+                print(f"❌ Input listener failed: {e}")
     
     def click_at_current_position(self):
-        current_pos = pyautogui.position()
-        pyautogui.click(current_pos.x, current_pos.y)
+        current_pos = self.backend.position()
+        self.backend.click(current_pos.x, current_pos.y)
+        self._notify([click_action(current_pos.x, current_pos.y)])
         return current_pos
     
     def get_current_position(self):
-        return pyautogui.position()
+        return self.backend.position()
     
     def click_at_position(self, x, y):
-        pyautogui.click(x, y)
-        return pyautogui.Point(x, y)
+        self.backend.click(x, y)
+        self._notify([click_action(x, y)])
+        return Point(x, y)
     
-    def press_left_key(self):
-        pyautogui.press('left')
-        return pyautogui.position()
+    def press_left_key(self, presses=1):
+        return self.press_key('left', presses)
+    
+    def press_key(self, key, presses=1):
+        return self.run_sequence([key_action(key, presses)])
     
     def press_space_key(self):
-        pyautogui.press('space')
-        return pyautogui.position() 
\ No newline at end of file
+        return self.press_key('space')
+    
+    def run_sequence(self, actions):
+        position = self.backend.run(actions)
+        self._notify(actions)
+        return position
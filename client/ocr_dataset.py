@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import csv
+import json
+import time
+import hashlib
+import argparse
+import threading
+import numpy as np
+from PIL import Image
+
+CROPS_FILE = 'crops.u8'
+INDEX_FILE = 'index.jsonl'
+META_FILE = 'meta.json'
+PREVIEW_FILE = 'preview.png'
+DEFAULT_SHAPE = (40, 100)
+TIMING_PATTERN = re.compile(r'^(\d{1,2}):([0-5]\d):([0-5]\d)$')
+
+class OCRDataset:
+    def __init__(self, path, shape=DEFAULT_SHAPE):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                self.shape = tuple(json.load(f)['shape'])
+        else:
+            self.shape = tuple(shape)
+            self._write_json(META_FILE, {'shape': list(self.shape), 'dtype': 'uint8', 'mode': 'L'})
+        
+        self.frame_size = self.shape[0] * self.shape[1]
+        self.records = self._load_index()
+    
+    def _file(self, name):
+        return os.path.join(self.path, name)
+    
+    def _write_json(self, name, data):
+        with open(self._file(name), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    
+    def _load_index(self):
+        records = []
+        if os.path.exists(self._file(INDEX_FILE)):
+            with open(self._file(INDEX_FILE), encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json.loads(line))
+        
+        crops_path = self._file(CROPS_FILE)
+        size = os.path.getsize(crops_path) if os.path.exists(crops_path) else 0
+        if size != len(records) * self.frame_size:
+            count = min(size // self.frame_size, len(records))
+            print(f"⚠️ OCR dataset {self.path} was not closed cleanly, keeping {count} complete records")
+            records = records[:count]
+            with open(crops_path, 'ab') as f:
+                f.truncate(count * self.frame_size)
+            self.save_index(records)
+        return records
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def to_array(self, image):
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(np.asarray(image))
+        image = image.convert('L')
+        height, width = self.shape
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+    
+    def append(self, image, ocr, timing=None, confidence=None, source=None, label=None):
+        crop = self.to_array(image)
+        data = crop.tobytes()
+        with self.lock:
+            record = {
+                'id': len(self.records),
+                'hash': hashlib.blake2b(data, digest_size=8).hexdigest(),
+                'ocr': ocr,
+                'confidence': confidence,
+                'timing': timing,
+                'label': label,
+                'source': source,
+                'created': round(time.time(), 3)
+            }
+            with open(self._file(CROPS_FILE), 'ab') as f:
+                f.write(data)
+            with open(self._file(INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.records.append(record)
+        return record['id']
+    
+    def crops(self):
+        if not self.records:
+            return np.empty((0,) + self.shape, dtype=np.uint8)
+        return np.memmap(self._file(CROPS_FILE), dtype=np.uint8, mode='r', shape=(len(self.records),) + self.shape)
+    
+    def image(self, index, crops=None):
+        crops = self.crops() if crops is None else crops
+        return Image.fromarray(np.array(crops[index])).convert('RGB')
+    
+    def save_index(self, records=None):
+        records = self.records if records is None else records
+        tmp_path = self._file(INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self._file(INDEX_FILE))
+    
+    def set_label(self, index, label):
+        self.records[index]['label'] = label
+    
+    def compact(self, keep):
+        crops = self.crops()
+        tmp_path = self._file(CROPS_FILE + '.tmp')
+        records = []
+        with open(tmp_path, 'wb') as f:
+            for new_id, index in enumerate(keep):
+                f.write(crops[index].tobytes())
+                records.append(dict(self.records[index], id=new_id))
+        del crops
+        with self.lock:
+            os.replace(tmp_path, self._file(CROPS_FILE))
+            self.save_index(records)
+            self.records = records
+    
+    def stats(self):
+        labeled = [r for r in self.records if r.get('label') is not None]
+        return {
+            'records': len(self.records),
+            'labeled': len(labeled),
+            'unique': len({r['hash'] for r in self.records}),
+            'shape': list(self.shape),
+            'bytes': len(self.records) * self.frame_size
+        }
+    
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.ocr_dataset) if args.ocr_dataset else None
+
+def add_dataset_arguments(parser):
+    parser.add_argument('--ocr-dataset', metavar='DIR',
+                        help='Also record every crop with its OCR result into a packed dataset (see ocr_dataset.py)')
+
+def is_valid_timing(text):
+    return bool(text) and TIMING_PATTERN.match(text) is not None
+
+def difference_hash(crop):
+    small = np.asarray(Image.fromarray(np.asarray(crop)).resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+def deduplicate(dataset, perceptual=False):
+    crops = dataset.crops() if perceptual else None
+    groups = {}
+    for index, record in enumerate(dataset.records):
+        key = (difference_hash(crops[index]), record.get('ocr')) if perceptual else record['hash']
+        groups.setdefault(key, []).append(index)
+    del crops
+    
+    keep = []
+    for indexes in groups.values():
+        labeled = {}
+        for index in indexes:
+            label = dataset.records[index].get('label')
+            if label is not None:
+                labeled.setdefault(label, index)
+        keep.extend(labeled.values() if labeled else indexes[:1])
+    keep.sort()
+    
+    removed = len(dataset) - len(keep)
+    if removed:
+        dataset.compact(keep)
+    return removed
+
+def label_interactive(dataset):
+    crops = dataset.crops()
+    pending = [i for i, r in enumerate(dataset.records) if r.get('label') is None]
+    preview_path = dataset._file(PREVIEW_FILE)
+    print(f"🏷️ {len(pending)} unlabeled crops, preview is written to {preview_path}")
+    print("Enter - accept OCR, text - set label, '-' - no timing visible, 's' - skip, 'q' - quit")
+    
+    labeled = 0
+    try:
+        for index in pending:
+            record = dataset.records[index]
+            image = dataset.image(index, crops)
+            image.resize((image.width * 4, image.height * 4), Image.NEAREST).save(preview_path)
+            answer = input(f"#{index} OCR: {record.get('ocr') or '-'} > ").strip()
+            if answer == 'q':
+                break
+            if answer == 's':
+                continue
+            if answer == '':
+                answer = record.get('ocr') or ''
+            elif answer == '-':
+                answer = ''
+            if answer and not is_valid_timing(answer):
+                print(f"⚠️ '{answer}' is not HH:MM:SS, skipped")
+                continue
+            dataset.set_label(index, answer)
+            labeled += 1
+            if labeled % 20 == 0:
+                dataset.save_index()
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        del crops
+        dataset.save_index()
+    return labeled
+
+def label_command(args):
+    dataset = OCRDataset(args.dataset)
+    changed = 0
+    
+    if args.set:
+        for item in args.set:
+            index, _, label = item.partition('=')
+            dataset.set_label(int(index), label)
+            changed += 1
+    
+    if args.import_csv:
+        with open(args.import_csv, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0].strip().isdigit():
+                    dataset.set_label(int(row[0]), row[1].strip())
+                    changed += 1
+    
+    if args.accept_ocr:
+        for record in dataset.records:
+            confidence = record.get('confidence')
+            if record.get('label') is None and is_valid_timing(record.get('ocr')):
+                if confidence is None or confidence >= args.min_confidence:
+                    record['label'] = record['ocr']
+                    changed += 1
+    
+    if args.set or args.import_csv or args.accept_ocr:
+        dataset.save_index()
+    else:
+        changed = label_interactive(dataset)
+    
+    print(f"✅ Labeled {changed} crops, {dataset.stats()['labeled']}/{len(dataset)} labeled in total")
+
+def dedup_command(args):
+    dataset = OCRDataset(args.dataset)
+    before = len(dataset)
+    removed = deduplicate(dataset, perceptual=args.perceptual)
+    print(f"✅ Removed {removed} duplicates ({before} → {len(dataset)})")
+
+def replay_command(args):
+    from working_ocr_detector import WorkingOCRDetector
+    
+    dataset = OCRDataset(args.dataset)
+    detector = WorkingOCRDetector()
+    crops = dataset.crops()
+    indexes = [i for i, r in enumerate(dataset.records) if not args.labeled_only or r.get('label') is not None]
+    if args.limit:
+        indexes = indexes[:args.limit]
+    
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    total = labeled = correct = changed = 0
+    started = time.perf_counter()
+    try:
+        for index in indexes:
+            record = dataset.records[index]
+            timing = detector.extract_timing(dataset.image(index, crops))
+            predicted = timing if timing and detector.is_valid_timing(timing) else ''
+            total += 1
+            
+            if predicted != (record.get('ocr') or ''):
+                changed += 1
+            
+            label = record.get('label')
+            ok = None
+            if label is not None:
+                labeled += 1
+                ok = predicted == label
+                correct += ok
+            
+            if report and (ok is False or (label is None and predicted != (record.get('ocr') or ''))):
+                report.write(json.dumps({
+                    'id': index,
+                    'label': label,
+                    'recorded': record.get('ocr'),
+                    'predicted': predicted
+                }, ensure_ascii=False) + '\n')
+    finally:
+        del crops
+        if report:
+            report.close()
+    
+    elapsed = time.perf_counter() - started
+    print(f"🔁 Replayed {total} crops in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} crops/s)")
+    print(f"🔀 Changed vs recorded OCR: {changed}")
+    if labeled:
+        print(f"🎯 Accuracy on labeled crops: {correct}/{labeled} ({correct / labeled:.1%})")
+
+def stats_command(args):
+    for key, value in OCRDataset(args.dataset).stats().items():
+        print(f"{key}: {value}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Label, deduplicate and replay the packed OCR crop dataset')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    stats_parser = subparsers.add_parser('stats', help='Show dataset size and labeling progress')
+    stats_parser.add_argument('dataset', help='Dataset directory')
+    stats_parser.set_defaults(func=stats_command)
+    
+    label_parser = subparsers.add_parser('label', help='Label crops interactively or in bulk')
+    label_parser.add_argument('dataset', help='Dataset directory')
+    label_parser.add_argument('--set', action='append', metavar='ID=HH:MM:SS', help='Set one label (empty means no timing)')
+    label_parser.add_argument('--import', dest='import_csv', metavar='CSV', help='Import labels from id,label rows')
+    label_parser.add_argument('--accept-ocr', action='store_true', help='Use valid recorded OCR output as the label')
+    label_parser.add_argument('--min-confidence', type=float, default=0.0,
+                              help='Only accept OCR output with at least this confidence')
+    label_parser.set_defaults(func=label_command)
+    
+    dedup_parser = subparsers.add_parser('dedup', help='Drop byte-identical crops, preferring labeled copies')
+    dedup_parser.add_argument('dataset', help='Dataset directory')
+    dedup_parser.add_argument('--perceptual', action='store_true',
+                              help='Also drop near-identical crops (dHash) with the same label or OCR text')
+    dedup_parser.set_defaults(func=dedup_command)
+    
+    replay_parser = subparsers.add_parser('replay', help='Run WorkingOCRDetector over the dataset')
+    replay_parser.add_argument('dataset', help='Dataset directory')
+    replay_parser.add_argument('--labeled-only', action='store_true', help='Only replay labeled crops')
+    replay_parser.add_argument('--limit', type=int, help='Replay at most this many crops')
+    replay_parser.add_argument('--report', help='Write mismatches to this JSONL file')
+    replay_parser.set_defaults(func=replay_command)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import time
+import threading
+import numpy as np
+
+class PlayheadEstimator:
+    def __init__(self, seek_step=5.0, tolerance=2.0, drift=0.02, seek_tolerance=2.0, confirm=2):
+        self.seek_step = seek_step
+        self.tolerance = tolerance
+        self.drift = drift
+        self.seek_tolerance = seek_tolerance
+        self.confirm = confirm
+        self.lock = threading.Lock()
+        self.position = None
+        self.updated = None
+        self.playing = True
+        self.uncertainty = 0.0
+        self.resolution = None
+        self.pending = []
+        self.accepted = 0
+        self.rejected = 0
+        self.resets = 0
+    
+    def predict(self, now=None):
+        with self.lock:
+            return self._predict(time.monotonic() if now is None else now)
+    
+    def _predict(self, now):
+        if self.position is None:
+            return None
+        return self.position + (now - self.updated if self.playing else 0.0)
+    
+    def _tolerance(self, now):
+        return self.tolerance + self.drift * (now - self.updated) + self.uncertainty
+    
+    def observe(self, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.position is None:
+                self._reset(seconds, now)
+                return True
+            
+            elapsed = now - self.updated
+            error, _, playing = min(
+                (self._distance(seconds, self.position + elapsed), self.playing is not True, True),
+                (self._distance(seconds, self.position), self.playing is not False, False)
+            )
+            if error <= self._tolerance(now):
+                predicted = self.position + (elapsed if playing else 0.0)
+                self.position = min(max(predicted, seconds), seconds + 0.999)
+                if self.position != predicted:
+                    self.resolution = None
+                self.updated = now
+                self.playing = playing
+                self.uncertainty = 0.0
+                self.pending = []
+                self.accepted += 1
+                return True
+            
+            self.pending.append((seconds, now))
+            if len(self.pending) >= self.confirm and self._pending_consistent():
+                self.resets += 1
+                self._reset(seconds, now)
+                return True
+            self.rejected += 1
+            return False
+    
+    def _distance(self, seconds, predicted, slack=0.5):
+        return max(0.0, seconds - predicted - slack, predicted - (seconds + 1) - slack)
+    
+    def observe_boundary(self, seconds, changed_at, resolution):
+        if not self.observe(seconds, changed_at):
+            return False
+        with self.lock:
+            self.position = float(seconds)
+            self.updated = changed_at
+            self.playing = True
+            self.resolution = resolution
+        return True
+    
+    def _pending_consistent(self):
+        readings = self.pending[-self.confirm:]
+        for (previous, previous_at), (current, current_at) in zip(readings, readings[1:]):
+            progress = current - previous
+            if not (-self.tolerance <= progress <= current_at - previous_at + self.tolerance):
+                return False
+        return True
+    
+    def _reset(self, seconds, now):
+        self.position = seconds + 0.5
+        self.updated = now
+        self.uncertainty = 0.0
+        self.resolution = None
+        self.pending = []
+        self.accepted += 1
+    
+    def note_seek(self, delta, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.position is None:
+                return
+            self.position = max(0.0, self._predict(now) + delta)
+            self.updated = now
+            self.uncertainty += self.seek_tolerance
+            self.resolution = None
+    
+    def note_toggle(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.position is None:
+                return
+            self.position = self._predict(now)
+            self.updated = now
+            self.playing = not self.playing
+    
+    def on_input(self, actions):
+        for action in actions:
+            if action[0] == 'click' or (action[0] == 'key' and action[1] == 'space'):
+                presses = action[2] if action[0] == 'key' else 1
+                if presses % 2:
+                    self.note_toggle()
+            elif action[0] == 'key' and action[1] in ('left', 'right'):
+                self.note_seek((-1 if action[1] == 'left' else 1) * action[2] * self.seek_step)
+    
+    def stats(self):
+        return {
+            'position': self.predict(),
+            'playing': self.playing,
+            'resolution': self.resolution,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'resets': self.resets
+        }
+
+def wait_for_second_change(capture_region, region, timeout=1.2, interval=0.03, digit_share=0.3, threshold=200,
+                           min_changed=0.1):
+    left, top, width, height = region
+    digits = (int(width * (1 - digit_share)), 0, width, height)
+    
+    def sample():
+        before = time.monotonic()
+        frame = capture_region(left, top, width, height)
+        after = time.monotonic()
+        return frame, np.asarray(frame.convert('L').crop(digits)) > threshold, (before + after) / 2
+    
+    _, previous, previous_at = sample()
+    deadline = previous_at + timeout
+    while previous_at < deadline:
+        time.sleep(interval)
+        frame, pixels, sampled_at = sample()
+        ink = max(1, int(pixels.sum() + previous.sum()) // 2)
+        if np.count_nonzero(pixels != previous) / ink >= min_changed:
+            return frame, (previous_at + sampled_at) / 2, sampled_at - previous_at
+        previous, previous_at = pixels, sampled_at
+    return None, None, None
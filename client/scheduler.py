@@ -1,32 +1,135 @@
 import time
+import bisect
 import threading
+import traceback
 from datetime import datetime
 
 class TaskScheduler:
-    def __init__(self, interval_seconds=15):
+    def __init__(self, interval_seconds=15, max_errors=10):
         self.interval_seconds = interval_seconds
+        self.max_errors = max_errors
         self.is_running = False
         self.thread = None
+        self.stop_event = threading.Event()
+        self.ticks = 0
+        self.skips = 0
+        self.overruns = 0
+        self.errors = 0
+        self.consecutive_errors = 0
     
     def start_scheduled_task(self, task_function):
         self.is_running = True
+        self.stop_event.clear()
         self.thread = threading.Thread(target=self._run_scheduled_task, args=(task_function,))
         self.thread.daemon = True
         self.thread.start()
     
     def _run_scheduled_task(self, task_function):
         while self.is_running:
-            try:
-                result = task_function()
-            except:
-                pass
+            started = time.monotonic()
+            self._run_task(task_function)
+            elapsed = time.monotonic() - started
+            if elapsed > self.interval_seconds:
+                self.overruns += 1
             
-            time.sleep(self.interval_seconds)
+            self.stop_event.wait(self.interval_seconds)
+    
+    def _run_task(self, task_function):
+        self.ticks += 1
+        try:
+            task_function()
+            self.consecutive_errors = 0
+        except Exception as e:
+            self.errors += 1
+            self.consecutive_errors += 1
+            print(f"❌ Scheduled task failed ({self.consecutive_errors} in a row): {e}")
+            traceback.print_exc()
+            if self.max_errors and self.consecutive_errors >= self.max_errors:
+                print(f"🛑 Stopping scheduler after {self.consecutive_errors} failures in a row")
+                self.is_running = False
     
     def stop_scheduled_task(self):
         self.is_running = False
-        if self.thread:
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
             self.thread.join()
     
     def is_task_running(self):
-        return self.is_running 
\ No newline at end of file
+        return self.is_running
+    
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'skips': self.skips,
+            'overruns': self.overruns,
+            'errors': self.errors
+        }
+
+class CueScheduler(TaskScheduler):
+    def __init__(self, playhead, vtt_parser, interval_seconds=15, lead=0.2, max_gap=60.0, poll=0.5, max_errors=10):
+        super().__init__(interval_seconds, max_errors)
+        self.playhead = playhead
+        self.vtt_parser = vtt_parser
+        self.lead = lead
+        self.max_gap = max_gap
+        self.poll = poll
+        self.last_run = None
+        self.last_finished = None
+        self.target = None
+    
+    def next_run(self, now):
+        if self.last_run is None:
+            return now, None
+        
+        forced = self.last_run + self.max_gap
+        position = self.playhead.predict(now)
+        starts = self.vtt_parser.cue_starts
+        if position is None or not starts:
+            return self.last_run + self.interval_seconds, None
+        if not self.playhead.playing:
+            return forced, None
+        
+        index = bisect.bisect_right(starts, position)
+        if self.target is not None and self.target < len(starts):
+            if position < starts[self.target] - self.lead - 1.0:
+                self.target = None
+            else:
+                index = max(index, self.target + 1)
+        if index >= len(starts):
+            return forced, None
+        due = now + max(0.0, starts[index] - position - self.lead)
+        return (due, index) if due <= forced else (forced, None)
+    
+    def _run_scheduled_task(self, task_function):
+        while self.is_running:
+            now = time.monotonic()
+            due, target = self.next_run(now)
+            if due > now:
+                self.stop_event.wait(min(due - now, self.poll))
+                continue
+            
+            if self.last_finished is not None:
+                self.skips += int((now - self.last_finished) // self.interval_seconds)
+            
+            position_before = self.playhead.predict(now)
+            self.last_run = now
+            if target is not None:
+                self.target = target
+            self._run_task(task_function)
+            self.last_finished = time.monotonic()
+            
+            if self._missed_boundaries(position_before, self.playhead.predict(self.last_finished)):
+                self.overruns += 1
+    
+    def _missed_boundaries(self, position_before, position_after):
+        if position_before is None or position_after is None or position_after <= position_before:
+            return False
+        starts = self.vtt_parser.cue_starts
+        first = bisect.bisect_right(starts, position_before + self.lead + 0.1)
+        return first < len(starts) and starts[first] <= position_after
+    
+    def stats(self):
+        stats = super().stats()
+        now = time.monotonic()
+        stats['next_run_in'] = round(max(0.0, self.next_run(now)[0] - now), 2) if self.is_running else None
+        return stats
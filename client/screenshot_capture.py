@@ -5,6 +5,9 @@ class ScreenshotCapture:
     def __init__(self):
         pyautogui.FAILSAFE = True
     
+    def screen_size(self):
+        return pyautogui.size()
+    
     def capture_full_screen(self):
         screenshot = pyautogui.screenshot()
         return screenshot
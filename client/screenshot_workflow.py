@@ -1,56 +1,124 @@
 import time
+import math
 import threading
 from mouse_controller import MouseController
 from screenshot_capture import ScreenshotCapture
+from timing_locator import TimingLocator
+from playhead import PlayheadEstimator, wait_for_second_change
 from image_processor import ImageProcessor
 from file_manager import FileManager
 from working_ocr_detector import WorkingOCRDetector
 from vtt_parser import VTTParser
 from tts_engine import TTSEngine
+import shared_path
+from shared.subtitle_track import twin_url
+
+OCR_RETRY_CONFIDENCE = 0.4
+SUBTITLE_SOURCES = ('local', 'server')
 
 class ScreenshotWorkflow:
-    def __init__(self, output_dir="screenshots", vtt_url=None, enable_tts=True):
-        self.mouse_controller = MouseController()
+    def __init__(self, output_dir="screenshots", vtt_url=None, enable_tts=True, seek_step=5.0, input_backend=None,
+                 file_manager=None, ocr_dataset=None, timing_roi='auto', roi_cache='timing_roi.json', subsecond=False,
+                 subtitle_source='local'):
+        self.mouse_controller = MouseController(input_backend)
         self.screenshot_capture = ScreenshotCapture()
+        self.timing_locator = TimingLocator(self.screenshot_capture, timing_roi, roi_cache)
         self.image_processor = ImageProcessor()
-        self.file_manager = FileManager(output_dir)
+        self.file_manager = file_manager or FileManager(output_dir)
+        self.ocr_dataset = ocr_dataset
         self.text_detector = WorkingOCRDetector()
         self.vtt_parser = VTTParser()
+        self.eng_parser = VTTParser()
+        self.subtitle_source = subtitle_source
+        self.track_hashes = {}
         self.tts_engine = TTSEngine() if enable_tts else None
         self.vtt_url = vtt_url
         self.enable_tts = enable_tts
         self.last_subtitle = None
+        self.seek_step = seek_step
+        self.subsecond = subsecond
+        self.playhead = PlayheadEstimator(seek_step)
+        self.mouse_controller.add_listener(self.playhead.on_input)
         self._load_vtt_subtitles()
     
+    def eng_url(self):
+        return twin_url(self.vtt_url)
+    
+    def subtitle_urls(self):
+        return [url for url in (self.vtt_url, self.eng_url()) if url]
+    
     def _load_vtt_subtitles(self):
-        if self.vtt_url:
-            if self.vtt_parser.load_from_url(self.vtt_url):
-                print(f"✅ VTT subtitles loaded from: {self.vtt_url}")
-            else:
-                print(f"❌ Failed to load VTT subtitles from: {self.vtt_url}")
+        self.vtt_parser.clear()
+        self.eng_parser.clear()
+        self.track_hashes = {}
+        if not self.vtt_url:
+            return
+        if self.subtitle_source == 'server':
+            print(f"📡 Subtitles for {self.vtt_url} will be sent by the server")
+            return
+        
+        if self.vtt_parser.load_from_url(self.vtt_url):
+            print(f"✅ VTT subtitles loaded from: {self.vtt_url}")
+        else:
+            print(f"❌ Failed to load VTT subtitles from: {self.vtt_url}")
+        eng_url = self.eng_url()
+        if eng_url and not self.eng_parser.load_from_url(eng_url):
+            print(f"⚠️ English subtitles not available: {eng_url}")
+    
+    def apply_track(self, url, track_hash, blob=None):
+        if url == self.vtt_url:
+            parser = self.vtt_parser
+        elif url == self.eng_url():
+            parser = self.eng_parser
+        else:
+            return False
+        if blob is None:
+            return self.track_hashes.get(url) == track_hash
+        
+        if not parser.load_from_track(blob):
+            print(f"❌ Failed to load subtitle track from the server: {url}")
+            return False
+        self.track_hashes[url] = track_hash
+        print(f"✅ {len(parser.subtitles)} subtitles for {url} received from the server ({len(blob)} bytes)")
+        return True
     
     def execute_screenshot_workflow(self):
+        if self.subsecond:
+            self._sync_subsecond()
+        
         current_pos = self.mouse_controller.click_at_current_position()
         
         time.sleep(0.3)
         
-        left = max(0, current_pos.x - 100)
-        top = max(0, current_pos.y - 100)
-        width = 100
-        height = 40
+        left, top, width, height = self.timing_locator.region(current_pos)
         
         cropped_screenshot = self.screenshot_capture.capture_region(left, top, width, height)
         
-        timing = self.text_detector.extract_timing(cropped_screenshot)
+        ocr_result = self.text_detector.recognize(cropped_screenshot)
+        if (ocr_result.confidence < OCR_RETRY_CONFIDENCE and not self.text_detector.use_fallback
+                and self.playhead.predict() is None):
+            time.sleep(0.1)
+            retry_screenshot = self.screenshot_capture.capture_region(left, top, width, height)
+            retry_result = self.text_detector.recognize(retry_screenshot)
+            print(f"🔁 Low OCR confidence {ocr_result.confidence:.2f}, retried: {retry_result}")
+            if retry_result.confidence > ocr_result.confidence:
+                ocr_result, cropped_screenshot = retry_result, retry_screenshot
+        
+        self.timing_locator.report(ocr_result.confidence > 0 and self.text_detector.is_valid_timing(ocr_result.timing))
+        timing, timing_source = self._resolve_timing(ocr_result)
+        
+        position = self.playhead.predict() if timing else None
+        time_to_boundary = None
         
         if timing and self.text_detector.is_valid_timing(timing):
             print(f"🎬 {timing}")
             
             if self.vtt_parser.subtitles:
-                subtitle_info = self.vtt_parser.get_subtitle_info(timing)
-                if subtitle_info:
-                    timing_str, subtitle_text = subtitle_info
-                    print(f"💬 {timing_str} | {subtitle_text}")
+                subtitle, time_to_boundary = self._find_subtitle(self.vtt_parser, position, timing)
+                if subtitle:
+                    subtitle_text = subtitle.text
+                    boundary = f" (ends in {time_to_boundary:.1f}s)" if time_to_boundary is not None else ""
+                    print(f"💬 {self.vtt_parser.seconds_to_time(position)} | {subtitle_text}{boundary}")
                     
                     if self.enable_tts and self.tts_engine and subtitle_text.strip():
                         if self.last_subtitle != subtitle_text:
@@ -61,32 +129,114 @@ class ScreenshotWorkflow:
                     print(f"🔍 {timing} | No subtitle found")
         
         saved_filepath = self.file_manager.save_image(cropped_screenshot)
+        self._record_ocr_sample(cropped_screenshot, ocr_result, saved_filepath)
         
         subtitle_text = ''
         eng_subtitle_text = ''
         if timing and self.text_detector.is_valid_timing(timing):
             if self.vtt_parser.subtitles:
-                subtitle_info = self.vtt_parser.get_subtitle_info(timing)
-                if subtitle_info:
-                    timing_str, subtitle_text = subtitle_info
+                subtitle, _ = self._find_subtitle(self.vtt_parser, position, timing)
+                if subtitle:
+                    subtitle_text = subtitle.text
                     
-                    if self.vtt_url and "rus" in self.vtt_url:
-                        eng_url = self.vtt_url.replace("rus", "eng")
-                        eng_parser = VTTParser()
-                        if eng_parser.load_from_url(eng_url):
-                            eng_subtitle_info = eng_parser.get_subtitle_info(timing)
-                            if eng_subtitle_info:
-                                eng_subtitle_text = eng_subtitle_info[1]
+                    if self.eng_parser.subtitles:
+                        eng_subtitle, _ = self._find_subtitle(self.eng_parser, position, timing)
+                        if eng_subtitle:
+                            eng_subtitle_text = eng_subtitle.text
         
         return {
             'mouse_position': current_pos,
             'saved_filepath': saved_filepath,
-            'crop_size': 100,
+            'crop_size': width,
             'timing': timing,
+            'confidence': ocr_result.confidence,
+            'timing_source': timing_source,
+            'position': position,
+            'time_to_boundary': time_to_boundary,
             'subtitle_text': subtitle_text,
             'eng_subtitle_text': eng_subtitle_text
         }
     
+    def _record_ocr_sample(self, image, ocr_result, saved_filepath):
+        if not self.ocr_dataset:
+            return
+        try:
+            timing = ocr_result.timing
+            seconds = self.vtt_parser.time_to_seconds(timing) if timing and self.text_detector.is_valid_timing(timing) else None
+            self.ocr_dataset.append(image, timing, timing=seconds, confidence=round(ocr_result.confidence, 3),
+                                    source=saved_filepath)
+        except Exception as e:
+            print(f"❌ Failed to record OCR sample: {e}")
+    
+    def _sync_subsecond(self):
+        try:
+            region = self.timing_locator.region(self.mouse_controller.get_current_position())
+            frame, changed_at, resolution = wait_for_second_change(self.screenshot_capture.capture_region, region)
+            if frame is None:
+                print("⏱️ Seconds did not change, skipping sub-second sync")
+                return
+            
+            result = self.text_detector.recognize(frame)
+            if result.confidence > 0 and self.text_detector.is_valid_timing(result.timing):
+                seconds = self.vtt_parser.time_to_seconds(result.timing)
+                if self.playhead.observe_boundary(seconds, changed_at, resolution):
+                    print(f"⏱️ {result.timing} started {time.monotonic() - changed_at:.2f}s ago (±{resolution / 2:.2f}s)")
+        except Exception as e:
+            print(f"❌ Sub-second sync failed: {e}")
+    
+    def _find_subtitle(self, parser, position, timing):
+        subtitle, time_to_boundary = parser.find_cue_at(position)
+        if subtitle is None:
+            closest = parser.find_closest_subtitle(timing)
+            if closest:
+                return closest, None
+        return subtitle, time_to_boundary
+    
+    def _resolve_timing(self, ocr_result):
+        timing = ocr_result.timing
+        if ocr_result.confidence > 0 and self.text_detector.is_valid_timing(timing):
+            if self.playhead.observe(self.vtt_parser.time_to_seconds(timing)):
+                return timing, 'ocr'
+        
+        predicted = self.playhead.predict()
+        if predicted is None:
+            return None, None
+        
+        predicted_timing = self.vtt_parser.seconds_to_time(predicted)
+        if timing:
+            print(f"🚫 OCR {timing} does not fit the playhead, using predicted {predicted_timing}")
+        else:
+            print(f"🔮 OCR failed, using predicted {predicted_timing}")
+        return predicted_timing, 'predicted'
+    
+    def execute_seek_cue(self, offset=-1):
+        if not self.vtt_parser.subtitles:
+            raise ValueError("No VTT subtitles loaded")
+        current = self.playhead.predict()
+        if current is None:
+            raise ValueError("Playback position unknown, take a screenshot first")
+        
+        cue = self.vtt_parser.subtitles[self.vtt_parser.find_cue_index(current, offset)]
+        delta = self.vtt_parser.time_to_seconds(cue.start_time) - current
+        
+        if delta < 0:
+            steps = -math.ceil(-delta / self.seek_step)
+        else:
+            steps = math.floor(delta / self.seek_step)
+        
+        mouse_position = self.mouse_controller.get_current_position()
+        if steps:
+            mouse_position = self.mouse_controller.press_key('left' if steps < 0 else 'right', presses=abs(steps))
+        
+        print(f"🎯 {self.vtt_parser.seconds_to_time(current)} → {cue.start_time} ({steps:+d} steps)")
+        return {
+            'mouse_position': mouse_position,
+            'timing': self.vtt_parser.seconds_to_time(current),
+            'target_timing': cue.start_time,
+            'steps': steps,
+            'subtitle_text': cue.text
+        }
+    
     def execute_next_subtitle(self):
         if not self.vtt_url:
             raise ValueError("No VTT URL configured")
@@ -107,7 +257,7 @@ class ScreenshotWorkflow:
         self.vtt_url = new_url
         self._load_vtt_subtitles()
         
-        eng_url = new_url.replace("rus", "eng")
+        eng_url = self.eng_url()
         
         return {
             'old_url': old_url,
@@ -0,0 +1,7 @@
+import os
+import sys
+
+SHARED_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if SHARED_ROOT not in sys.path:
+    sys.path.append(SHARED_ROOT)
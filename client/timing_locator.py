@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import numpy as np
+from PIL import Image
+
+ROI_MODES = ('auto', 'cursor')
+TIMING_PATTERN = re.compile(r'\d{1,2}:\d{2}:\d{2}')
+
+class TimingLocator:
+    def __init__(self, screenshot_capture, mode='auto', cache_path='timing_roi.json', margin=6, scale=2,
+                 max_misses=3, recalibrate_interval=60.0):
+        if mode not in ROI_MODES:
+            raise ValueError(f"Unknown timing ROI mode '{mode}', choose from: {', '.join(ROI_MODES)}")
+        self.capture = screenshot_capture
+        self.mode = mode
+        self.cache_path = cache_path
+        self.margin = margin
+        self.scale = scale
+        self.max_misses = max_misses
+        self.recalibrate_interval = recalibrate_interval
+        self.cache = self._load_cache()
+        self.active_geometry = None
+        self.last_calibration = None
+        self.misses = 0
+        self.calibrations = 0
+    
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable timing ROI cache {self.cache_path}: {e}")
+            return {}
+    
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"❌ Failed to save timing ROI cache: {e}")
+    
+    def geometry(self):
+        width, height = self.capture.screen_size()
+        return f"{width}x{height}"
+    
+    def cursor_region(self, position):
+        return max(0, position.x - 100), max(0, position.y - 100), 100, 40
+    
+    def region(self, position):
+        self.active_geometry = None
+        if self.mode == 'cursor':
+            return self.cursor_region(position)
+        
+        geometry = self.geometry()
+        entry = self.cache.get(geometry)
+        if entry is None and self._calibration_due():
+            entry = self.calibrate(geometry, position)
+        if entry is None:
+            return self.cursor_region(position)
+        
+        self.active_geometry = geometry
+        return tuple(entry['roi'])
+    
+    def _calibration_due(self):
+        return self.last_calibration is None or time.monotonic() - self.last_calibration >= self.recalibrate_interval
+    
+    def report(self, valid):
+        if self.active_geometry is None:
+            return
+        if valid:
+            self.misses = 0
+            return
+        
+        self.misses += 1
+        if self.misses >= self.max_misses:
+            print(f"⚠️ No timing in the calibrated region {self.misses} times in a row, recalibrating")
+            self.cache.pop(self.active_geometry, None)
+            self._save_cache()
+            self.misses = 0
+            self.last_calibration = None
+    
+    def calibrate(self, geometry=None, position=None):
+        geometry = geometry or self.geometry()
+        self.last_calibration = time.monotonic()
+        self.calibrations += 1
+        started = time.perf_counter()
+        
+        try:
+            screen = self.capture.capture_full_screen()
+            boxes = self.find_timing_boxes(screen)
+        except Exception as e:
+            print(f"❌ Timing calibration failed, using cursor offset: {e}")
+            return None
+        if not boxes:
+            print(f"🔍 Timing not found on a full screen capture ({time.perf_counter() - started:.1f}s), using cursor offset")
+            return None
+        
+        if position is not None:
+            boxes.sort(key=lambda box: (box[0] + box[2] / 2 - position.x) ** 2 + (box[1] + box[3] / 2 - position.y) ** 2)
+        nearest = boxes[0]
+        same_row = [box for box in boxes if abs(box[1] - nearest[1]) < nearest[3]]
+        left, top, width, height, text = min(same_row, key=lambda box: box[0])
+        left = max(0, left - self.margin)
+        top = max(0, top - self.margin)
+        width = min(screen.width - left, width + 2 * self.margin)
+        height = min(screen.height - top, height + 2 * self.margin)
+        
+        entry = {'roi': [left, top, width, height], 'text': text, 'calibrated': time.time()}
+        self.cache[geometry] = entry
+        self._save_cache()
+        self.misses = 0
+        print(f"📐 Timing {text} found at ({left}, {top}) {width}x{height} on {geometry} "
+              f"in {time.perf_counter() - started:.1f}s")
+        return entry
+    
+    def find_timing_boxes(self, image):
+        import pytesseract
+        
+        gray = image.convert('L')
+        if self.scale != 1:
+            gray = gray.resize((gray.width * self.scale, gray.height * self.scale), Image.BILINEAR)
+        pixels = np.asarray(gray)
+        bright_text = Image.fromarray(np.where(pixels > 200, 0, 255).astype(np.uint8))
+        
+        for candidate in (bright_text, gray):
+            data = pytesseract.image_to_data(candidate, config='--psm 11', output_type=pytesseract.Output.DICT)
+            boxes = []
+            for i, text in enumerate(data['text']):
+                match = TIMING_PATTERN.search(text.replace(' ', ''))
+                if match:
+                    boxes.append((
+                        data['left'][i] // self.scale,
+                        data['top'][i] // self.scale,
+                        max(1, data['width'][i] // self.scale),
+                        max(1, data['height'][i] // self.scale),
+                        match.group(0)
+                    ))
+            if boxes:
+                return boxes
+        return []
+    
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'geometry': self.active_geometry,
+            'calibrations': self.calibrations,
+            'misses': self.misses,
+            'cached': len(self.cache)
+        }
+
+def add_locator_arguments(parser):
+    parser.add_argument('--timing-roi', choices=ROI_MODES, default='auto',
+                        help='Find the timing on screen once and capture only that region, or use a fixed offset from the cursor')
+    parser.add_argument('--roi-cache', default='timing_roi.json', help='Where calibrated timing regions are cached per screen size')
+    parser.add_argument('--subsecond', action='store_true',
+                        help='Before each screenshot watch the seconds change to know the position to a few tens of ms')
@@ -1,7 +1,52 @@
+import os
 import re
-import requests
+import mmap
+import codecs
+import bisect
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Iterable
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import shared_path
+from shared.subtitle_fetcher import SubtitleFetcher, FetchResult
+from shared.subtitle_formats import FORMATS, detect_format
+from shared.subtitle_search import SubtitleIndex
+from shared.subtitle_track import sort_cues, unpack_track
+
+ENCODING_SAMPLE_SIZE = 64 * 1024
+FALLBACK_ENCODING = 'cp1251'
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be')
+)
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def default_fetcher() -> SubtitleFetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = SubtitleFetcher()
+        return _fetcher
+
+def detect_encoding(sample: bytes) -> Tuple[str, int]:
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    
+    zeros = sample.count(0)
+    if zeros > len(sample) // 4:
+        odd_zeros = sample[1::2].count(0)
+        return ('utf-16-le' if odd_zeros > zeros - odd_zeros else 'utf-16-be'), 0
+    
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING, 0
 
 class VTTSubtitle:
     def __init__(self, start_time: str, end_time: str, text: str = ""):
@@ -13,83 +58,91 @@ class VTTSubtitle:
         return f"{self.start_time} --> {self.end_time}\n{self.text}"
 
 class VTTParser:
-    def __init__(self):
+    def __init__(self, fetcher: Optional[SubtitleFetcher] = None):
+        self.fetcher = fetcher
+        self.last_fetch: Optional[FetchResult] = None
         self.subtitles: List[VTTSubtitle] = []
+        self.cue_starts: List[float] = []
+        self.cue_ends: List[float] = []
+        self.format: Optional[str] = None
+        self.index = SubtitleIndex()
         self.time_pattern = re.compile(r'(\d{2}):(\d{2}):(\d{2})\.(\d{3})')
     
     def load_from_url(self, url: str) -> bool:
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            if response.encoding == 'ISO-8859-1':
-                response.encoding = 'utf-8'
-            
-            return self.parse_content(response.text)
-        except Exception as e:
-            print(f"Error loading VTT from URL: {e}")
+        if url.startswith('file://'):
+            return self.load_from_file(url2pathname(urlparse(url).path))
+        if '://' not in url and os.path.isfile(url):
+            return self.load_from_file(url)
+        
+        self.last_fetch = (self.fetcher or default_fetcher()).fetch(url)
+        if not self.last_fetch:
+            print(f"Error loading VTT from URL: {self.last_fetch.error} after {self.last_fetch.attempts} attempts")
             return False
+        return self.parse_content(self.last_fetch.text, source=url)
     
     def load_from_file(self, file_path: str) -> bool:
         try:
-            encodings = ['utf-8', 'utf-8-sig', 'cp1251', 'windows-1251', 'iso-8859-1']
-            content = None
-            
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        content = file.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
-                print(f"Error: Could not decode file with any encoding")
-                return False
-                
-            return self.parse_content(content)
+            with open(file_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return self.parse_lines([])
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    sample = data[:ENCODING_SAMPLE_SIZE]
+                    encoding, offset = detect_encoding(sample)
+                    subtitle_format = detect_format(sample[offset:].decode(encoding, 'ignore'), file_path)
+                    return self._parse_mapped(data, encoding, offset, subtitle_format)
         except Exception as e:
             print(f"Error loading VTT from file: {e}")
             return False
     
-    def parse_content(self, content: str) -> bool:
-        self.subtitles.clear()
+    def _parse_mapped(self, data: mmap.mmap, encoding: str, offset: int, subtitle_format: Optional[str] = None) -> bool:
+        if encoding.startswith('utf-16'):
+            with memoryview(data) as view:
+                return self.parse_lines(str(view[offset:], encoding, 'replace').split('\n'), subtitle_format)
+        
+        if encoding != FALLBACK_ENCODING:
+            data.seek(offset)
+            try:
+                return self.parse_lines((line.decode(encoding) for line in iter(data.readline, b'')), subtitle_format)
+            except UnicodeDecodeError:
+                pass
+        data.seek(offset)
+        return self.parse_lines((line.decode(FALLBACK_ENCODING, 'replace') for line in iter(data.readline, b'')),
+                                subtitle_format)
+    
+    def clear(self):
+        self.subtitles = []
+        self.cue_starts = []
+        self.cue_ends = []
+        self.index = SubtitleIndex()
+    
+    def load_from_track(self, blob: bytes) -> bool:
+        try:
+            _, cues = unpack_track(blob)
+        except Exception as e:
+            print(f"Error loading subtitle track: {e}")
+            return False
         
+        self.format = None
+        return self.load_cues(cues)
+    
+    def load_cues(self, cues: Iterable[Tuple[int, int, str]]) -> bool:
+        cues = sort_cues(cues)
+        self.subtitles = [VTTSubtitle(self.ms_to_time(start), self.ms_to_time(end), text) for start, end, text in cues]
+        self.cue_starts = [start // 1000 + start % 1000 / 1000.0 for start, _, _ in cues]
+        self.cue_ends = [end // 1000 + end % 1000 / 1000.0 for _, end, _ in cues]
+        self.index = SubtitleIndex(subtitle.text for subtitle in self.subtitles)
+        return len(self.subtitles) > 0
+    
+    def parse_content(self, content: str, source: Optional[str] = None) -> bool:
         content = content.strip()
         if content.startswith('\ufeff'):
             content = content[1:]
         
-        lines = content.split('\n')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line == 'WEBVTT' or not line:
-                i += 1
-                continue
-            
-            time_match = self.time_pattern.search(line)
-            if time_match:
-                start_time = time_match.group(0)
-                
-                end_match = self.time_pattern.search(line, time_match.end())
-                if end_match:
-                    end_time = end_match.group(0)
-                    
-                    text_lines = []
-                    i += 1
-                    while i < len(lines) and lines[i].strip():
-                        text_lines.append(lines[i].strip())
-                        i += 1
-                    
-                    text = '\n'.join(text_lines)
-                    subtitle = VTTSubtitle(start_time, end_time, text)
-                    self.subtitles.append(subtitle)
-            
-            i += 1
-        
-        return len(self.subtitles) > 0
+        return self.parse_lines(content.split('\n'), detect_format(content, source))
+    
+    def parse_lines(self, lines: Iterable[str], subtitle_format: Optional[str] = None) -> bool:
+        self.format = subtitle_format or 'vtt'
+        return self.load_cues(FORMATS[self.format].parse(lines))
     
     def time_to_seconds(self, time_str: str) -> float:
         if '.' in time_str:
@@ -123,6 +176,9 @@ class VTTParser:
         
         return f"{hours:02d}:{minutes:02d}:{secs:02d}.{ms:03d}"
     
+    def ms_to_time(self, ms: int) -> str:
+        return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+    
     def find_subtitle_at_time(self, timing: str) -> Optional[VTTSubtitle]:
         if not self.subtitles:
             return None
@@ -163,6 +219,32 @@ class VTTParser:
         
         return closest_subtitle if min_distance <= 5.0 else None
     
+    def find_cue_index(self, seconds: float, offset: int = 0, restart_threshold: float = 1.0) -> Optional[int]:
+        if not self.subtitles:
+            return None
+        
+        index = bisect.bisect_right(self.cue_starts, seconds) - 1
+        if offset < 0 and index >= 0 and seconds - self.cue_starts[index] > restart_threshold:
+            offset += 1
+        
+        return min(max(index + offset, 0), len(self.subtitles) - 1)
+    
+    def find_cue_at(self, seconds: float) -> Tuple[Optional[VTTSubtitle], Optional[float]]:
+        if not self.subtitles:
+            return None, None
+        
+        index = bisect.bisect_right(self.cue_starts, seconds) - 1
+        if index >= 0 and seconds <= self.cue_ends[index]:
+            return self.subtitles[index], self.cue_ends[index] - seconds
+        if index + 1 < len(self.subtitles):
+            return None, self.cue_starts[index + 1] - seconds
+        return None, None
+    
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[int, int, str]]:
+        matches = self.index.search(query)[:limit]
+        return [(round(self.cue_starts[i] * 1000), round(self.cue_ends[i] * 1000), self.subtitles[i].text)
+                for i in matches]
+    
     def get_subtitle_info(self, timing: str) -> Optional[Tuple[str, str]]:
         subtitle = self.find_subtitle_at_time(timing)
         if not subtitle:
@@ -2,12 +2,33 @@ import pytesseract
 import cv2
 import numpy as np
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
+DEFAULT_VARIANTS = ((3, 200), (3, 150), (2, 200), (4, None))
+TESSERACT_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789:'
+
+class TimingResult:
+    def __init__(self, timing=None, confidence=0.0, votes=0, candidates=()):
+        self.timing = timing
+        self.confidence = confidence
+        self.votes = votes
+        self.candidates = list(candidates)
+    
+    def __bool__(self):
+        return self.timing is not None
+    
+    def __repr__(self):
+        return f"TimingResult({self.timing!r}, confidence={self.confidence:.2f}, votes={self.votes}/{len(self.candidates)})"
+
 class WorkingOCRDetector:
-    def __init__(self):
+    def __init__(self, variants=DEFAULT_VARIANTS, workers=None):
         self.timing_pattern = re.compile(r'(\d{1,2}):(\d{2}):(\d{2})')
         self.use_fallback = False
+        self.variants = tuple(variants)
+        workers = min(workers or len(self.variants), len(self.variants))
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
         self._configure_tesseract()
     
     def _configure_tesseract(self):
@@ -28,22 +49,24 @@ class WorkingOCRDetector:
         
         self.use_fallback = True
     
-    def preprocess_image(self, image):
+    def preprocess_image(self, image, scale_factor=3, threshold=200):
         if isinstance(image, Image.Image):
-            image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            image_cv = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
         else:
             image_cv = image
         
-        scale_factor = 3
         height, width = image_cv.shape[:2]
         enlarged = cv2.resize(image_cv, (width * scale_factor, height * scale_factor), interpolation=cv2.INTER_CUBIC)
         
-        gray = cv2.cvtColor(enlarged, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(enlarged, cv2.COLOR_BGR2GRAY) if enlarged.ndim == 3 else enlarged
         
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
         enhanced = clahe.apply(gray)
         
-        _, thresh = cv2.threshold(enhanced, 200, 255, cv2.THRESH_BINARY)
+        if threshold is None:
+            _, thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        else:
+            _, thresh = cv2.threshold(enhanced, threshold, 255, cv2.THRESH_BINARY)
         
         kernel = np.ones((2,2), np.uint8)
         cleaned = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
@@ -51,33 +74,62 @@ class WorkingOCRDetector:
         return cleaned
     
     def extract_timing(self, image):
+        return self.recognize(image).timing
+    
+    def recognize(self, image):
         try:
-            processed_image = self.preprocess_image(image)
+            if isinstance(image, Image.Image):
+                image = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
             
-            if not self.use_fallback:
-                try:
-                    pil_image = Image.fromarray(processed_image)
-                    custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789:'
-                    text = pytesseract.image_to_string(pil_image, config=custom_config)
-                    text = text.strip().replace('\n', '').replace(' ', '')
-                    
-                    match = self.timing_pattern.search(text)
-                    if match:
-                        hours, minutes, seconds = match.groups()
-                        timing = f"{hours}:{minutes}:{seconds}"
-                        return timing
-                    
-                    fixed_timing = self._fix_timing_text(text)
-                    if fixed_timing:
-                        return fixed_timing
-                        
-                except:
-                    pass
+            if self.use_fallback:
+                timing = self._extract_timing_cv(self.preprocess_image(image))
+                return TimingResult(timing, 0.0, 1 if timing else 0, [(timing, 0.0)])
             
-            return self._extract_timing_cv(processed_image)
+            if self.executor:
+                candidates = list(self.executor.map(lambda variant: self._read_variant(image, *variant), self.variants))
+            else:
+                candidates = [self._read_variant(image, *variant) for variant in self.variants]
             
-        except:
-            return None
+            return self._vote(candidates)
+            
+        except Exception:
+            return TimingResult()
+    
+    def _read_variant(self, image, scale_factor, threshold):
+        try:
+            processed_image = self.preprocess_image(image, scale_factor, threshold)
+            data = pytesseract.image_to_data(Image.fromarray(processed_image), config=TESSERACT_CONFIG,
+                                             output_type=pytesseract.Output.DICT)
+            words = []
+            confidences = []
+            for text, conf in zip(data['text'], data['conf']):
+                text = str(text).strip()
+                if text and float(conf) >= 0:
+                    words.append(text)
+                    confidences.append(float(conf))
+            text = ''.join(words)
+            
+            match = self.timing_pattern.search(text)
+            timing = '{}:{}:{}'.format(*match.groups()) if match else self._fix_timing_text(text)
+            if not self.is_valid_timing(timing):
+                return (None, 0.0)
+            return (timing, sum(confidences) / len(confidences) / 100 if confidences else 0.0)
+        except Exception:
+            return (None, 0.0)
+    
+    def _vote(self, candidates):
+        scores = defaultdict(float)
+        votes = defaultdict(int)
+        for timing, confidence in candidates:
+            if timing:
+                scores[timing] += confidence
+                votes[timing] += 1
+        
+        if not votes:
+            return TimingResult(None, 0.0, 0, candidates)
+        
+        winner = max(votes, key=lambda timing: (votes[timing], scores[timing]))
+        return TimingResult(winner, scores[winner] / len(candidates), votes[winner], candidates)
     
     def _fix_timing_text(self, text):
         cleaned = re.sub(r'[^0-9:]', '', text)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import argparse
+import timeit
+from datetime import datetime
+
+import shared_path
+from shared.protocol import WireCodec, PROTOCOL_JSON, PROTOCOL_MSGPACK, msgpack
+
+
+def sample_messages():
+    now = datetime.now().isoformat()
+    return {
+        'execute_screenshot': {
+            'type': 'execute_screenshot',
+            'timestamp': now,
+            'command_id': 'cmd_20250101_120000',
+            'telegram_user_id': 123456789
+        },
+        'heartbeat': {
+            'type': 'heartbeat',
+            'client_id': 'a1b2c3d4',
+            'timestamp': now
+        },
+        'screenshot_completed': {
+            'type': 'screenshot_completed',
+            'client_id': 'a1b2c3d4',
+            'command_id': 'cmd_20250101_120000',
+            'telegram_user_id': 123456789,
+            'timestamp': now,
+            'subtitle_text': "- Hi.\n- Hi. Twenty-five quid? That's what we agreed, isn't it?",
+            'russian_text': '- Привет.\n- Привет. 25 фунтов? Мы ведь так договаривались, да?',
+            'timing': '0:01:26',
+            'result': {
+                'timing': '0:01:26',
+                'mouse_position': {'x': 1280, 'y': 1350},
+                'saved_filepath': 'screenshots/screenshot_20250101_120000_123.png',
+                'crop_size': 100
+            }
+        }
+    }
+
+
+def bench_codec(codec, message, number):
+    encoded = codec.encode(message)
+    decoded = WireCodec.decode(encoded)
+    if decoded != message:
+        raise AssertionError(f"{codec} does not round-trip {message['type']}")
+
+    size = len(encoded.encode('utf-8')) if isinstance(encoded, str) else len(encoded)
+    encode_time = timeit.timeit(lambda: codec.encode(message), number=number) / number
+    decode_time = timeit.timeit(lambda: WireCodec.decode(encoded), number=number) / number
+    return size, encode_time, decode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark wire protocol encodings')
+    parser.add_argument('--number', type=int, default=20000, help='Iterations per measurement')
+    args = parser.parse_args()
+
+    codecs = [WireCodec(PROTOCOL_JSON)]
+    if msgpack is not None:
+        codecs.append(WireCodec(PROTOCOL_MSGPACK))
+        codecs.append(WireCodec(PROTOCOL_MSGPACK, deflate=True))
+    else:
+        print("msgpack is not installed, only JSON is benchmarked")
+
+    print(f"{'message':<22} {'codec':<16} {'bytes':>6} {'encode us':>10} {'decode us':>10}")
+    for name, message in sample_messages().items():
+        for codec in codecs:
+            label = codec.protocol + ('+deflate' if codec.deflate else '')
+            size, encode_time, decode_time = bench_codec(codec, message, args.number)
+            print(f"{name:<22} {label:<16} {size:>6} {encode_time * 1e6:>10.2f} {decode_time * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import time
+
+
+class ClientHealth:
+    def __init__(self, remote_address=None, heartbeat_interval=30):
+        self.remote_address = remote_address
+        self.heartbeat_interval = heartbeat_interval
+        self.client_id = None
+        self.connected_at = time.time()
+        self.last_seen = time.monotonic()
+        self.last_heartbeat = None
+        self.heartbeats = 0
+        self.rtt_ms = None
+        self.queue_depth = 0
+
+    def touch(self, client_id=None):
+        self.last_seen = time.monotonic()
+        if client_id and client_id != self.client_id:
+            self.client_id = client_id
+            return True
+        return False
+
+    def record_heartbeat(self, rtt_ms=None):
+        now = time.monotonic()
+        self.last_seen = now
+        self.last_heartbeat = now
+        self.heartbeats += 1
+        if isinstance(rtt_ms, (int, float)) and rtt_ms >= 0:
+            self.rtt_ms = float(rtt_ms)
+
+    def idle_seconds(self, now=None):
+        return (now or time.monotonic()) - self.last_seen
+
+    def missed_heartbeats(self, now=None):
+        return int(self.idle_seconds(now) // self.heartbeat_interval)
+
+    def is_stale(self, max_missed, now=None):
+        return self.missed_heartbeats(now) >= max_missed
+
+    def summary(self):
+        return {
+            'client_id': self.client_id or 'unknown',
+            'remote_address': self.remote_address,
+            'connected_seconds': int(time.time() - self.connected_at),
+            'idle_seconds': round(self.idle_seconds(), 1),
+            'heartbeats': self.heartbeats,
+            'missed_heartbeats': self.missed_heartbeats(),
+            'rtt_ms': round(self.rtt_ms, 1) if self.rtt_ms is not None else None,
+            'queue_depth': self.queue_depth
+        }
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from load_test import SimulatedClient, percentile, format_ms, wait_for, raise_open_file_limit
+from telegram_webhook import SECRET_HEADER
+
+FAKE_TOKEN = '123456:FAKE-TOKEN-FOR-OFFLINE-BENCHMARKS'
+FAKE_BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_prompter_bot'}
+
+
+class FakeTelegramAPI:
+    def __init__(self, host='127.0.0.1', port=8881, flood_every=0, flood_retry_after=1):
+        self.host = host
+        self.port = port
+        self.flood_every = flood_every
+        self.flood_retry_after = flood_retry_after
+        self.runner = None
+        self.calls = {}
+        self.edits = {}
+        self.updates = []
+        self.update_added = asyncio.Event()
+        self.webhook_url = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.handle_method)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def _params(self, request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+
+    async def handle_method(self, request):
+        method = request.match_info['method']
+        params = await self._params(request)
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getMe':
+            result = FAKE_BOT_USER
+        elif method == 'setWebhook':
+            self.webhook_url = params.get('url')
+            result = True
+        elif method == 'deleteWebhook':
+            self.webhook_url = None
+            result = True
+        elif method == 'getUpdates':
+            result = await self.get_updates(int(params.get('offset', 0) or 0), float(params.get('timeout', 0) or 0))
+        elif method in ('editMessageText', 'sendMessage'):
+            if self.flood_every and self.calls[method] % self.flood_every == 0:
+                return web.json_response({
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.flood_retry_after}",
+                    'parameters': {'retry_after': self.flood_retry_after}
+                }, status=429)
+            chat_id = params.get('chat_id', 0)
+            self.edits.setdefault(chat_id, []).append((time.perf_counter(), params.get('text', '')))
+            result = {
+                'message_id': params.get('message_id', 1),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': params.get('text', '')
+            }
+        else:
+            result = True
+
+        return web.json_response({'ok': True, 'result': result})
+
+    async def get_updates(self, offset, timeout):
+        self.updates = [update for update in self.updates if update['update_id'] >= offset]
+        if not self.updates and timeout > 0:
+            self.update_added.clear()
+            try:
+                await asyncio.wait_for(self.update_added.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self.updates)
+
+    def queue_update(self, update):
+        self.updates.append(update)
+        self.update_added.set()
+
+
+class UpdateInjector:
+    def __init__(self, fake_api, webhook_url=None, secret_token=None):
+        self.fake_api = fake_api
+        self.webhook_url = webhook_url
+        self.secret_token = secret_token
+        self.update_id = 0
+        self.session = None
+
+    def callback_update(self, user_id, data='take_screenshot'):
+        self.update_id += 1
+        return {
+            'update_id': self.update_id,
+            'callback_query': {
+                'id': str(self.update_id),
+                'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bench'},
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': 1,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'text': '🎬 Управление переводом'
+                }
+            }
+        }
+
+    async def inject(self, update):
+        if not self.webhook_url:
+            self.fake_api.queue_update(update)
+            return
+
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        headers = {SECRET_HEADER: self.secret_token} if self.secret_token else {}
+        async with self.session.post(self.webhook_url, json=update, headers=headers) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Webhook rejected update: HTTP {response.status}")
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+
+
+async def run_benchmark(args):
+    raise_open_file_limit(args.clients)
+
+    fake_api = FakeTelegramAPI(port=args.api_port, flood_every=args.flood_every)
+    await fake_api.start()
+
+    secret = 'offline-benchmark-secret'
+    os.environ['TELEGRAM_BOT_TOKEN'] = FAKE_TOKEN
+    os.environ['TELEGRAM_API_BASE_URL'] = fake_api.base_url
+    os.environ['TELEGRAM_DEDUP_WINDOW'] = str(args.dedup_window)
+    webhook_url = None
+    if args.mode == 'webhook':
+        os.environ['TELEGRAM_WEBHOOK_URL'] = f"http://127.0.0.1:{args.webhook_port}"
+        os.environ['TELEGRAM_WEBHOOK_PORT'] = str(args.webhook_port)
+        os.environ['TELEGRAM_WEBHOOK_HOST'] = '127.0.0.1'
+        os.environ['TELEGRAM_WEBHOOK_SECRET'] = secret
+        webhook_url = f"http://127.0.0.1:{args.webhook_port}{os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram/webhook')}"
+    else:
+        os.environ.pop('TELEGRAM_WEBHOOK_URL', None)
+
+    from server import ScreenshotServer
+    server = ScreenshotServer(host='127.0.0.1', port=args.port, enable_telegram=True)
+    server.requests_log_file = os.path.join(tempfile.gettempdir(), 'fake_telegram_requests.log')
+    if not server.telegram_bot:
+        raise RuntimeError("Telegram bot failed to initialize")
+    server_task = asyncio.create_task(server.start())
+
+    def bot_ready():
+        application = server.telegram_bot.application
+        if application is None or not application.running:
+            return False
+        if args.mode == 'webhook':
+            return fake_api.webhook_url is not None
+        return application.updater.running
+
+    if not await wait_for(bot_ready, timeout=10):
+        raise RuntimeError("Telegram bot did not start against the fake API")
+
+    uri = f"ws://127.0.0.1:{args.port}"
+    clients = [SimulatedClient(i, uri, args.response_delay) for i in range(args.clients)]
+    for client in clients:
+        await client.connect()
+    await wait_for(lambda: len(server.clients) >= len(clients), timeout=10)
+
+    injector = UpdateInjector(fake_api, webhook_url, secret)
+    first_latencies = []
+    all_latencies = []
+    push_started = {}
+    missed = 0
+    for i in range(args.presses):
+        user_id = 100000 + i
+        started = time.perf_counter()
+        push_started[user_id] = started
+        await injector.inject(injector.callback_update(user_id, args.button))
+
+        def received():
+            return all(user_id in client.received_by_user for client in clients)
+
+        if not await wait_for(received, timeout=args.timeout, poll=0.001):
+            missed += 1
+        receipts = [client.received_by_user[user_id] - started for client in clients if user_id in client.received_by_user]
+        if receipts:
+            first_latencies.append(min(receipts))
+            all_latencies.append(max(receipts))
+        await asyncio.sleep(args.interval)
+
+    def pushed(user_id):
+        return [at for at, text in fake_api.edits.get(user_id, []) if 'Simulated subtitle' in text]
+
+    if args.button == 'take_screenshot':
+        await wait_for(lambda: all(pushed(user_id) for user_id in push_started), timeout=args.timeout)
+    push_latencies = [pushed(user_id)[0] - started for user_id, started in push_started.items() if pushed(user_id)]
+
+    print(f"=== Button-to-client latency ({args.mode}, offline) ===")
+    print(f"Presses:              {args.presses} ({missed} not delivered to every client)")
+    print(f"Clients:              {len(clients)}")
+    print(f"First client:         p50 {format_ms(percentile(first_latencies, 0.5))}, "
+          f"p95 {format_ms(percentile(first_latencies, 0.95))}, "
+          f"mean {format_ms(statistics.mean(first_latencies) if first_latencies else 0)}")
+    print(f"All clients:          p50 {format_ms(percentile(all_latencies, 0.5))}, "
+          f"p95 {format_ms(percentile(all_latencies, 0.95))}, "
+          f"max {format_ms(max(all_latencies, default=0))}")
+    if push_latencies:
+        print(f"Result pushed:        p50 {format_ms(percentile(push_latencies, 0.5))}, "
+              f"p95 {format_ms(percentile(push_latencies, 0.95))} ({len(push_latencies)} chats)")
+    print(f"Bot API calls:        {dict(sorted(fake_api.calls.items()))}")
+    print(f"Bot stats:            {server.telegram_bot.get_stats()}")
+
+    await injector.close()
+    for client in clients:
+        await client.close()
+    await server.stop()
+    server_task.cancel()
+    try:
+        await server_task
+    except asyncio.CancelledError:
+        pass
+    await fake_api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline Telegram button-to-client latency benchmark')
+    parser.add_argument('--mode', choices=['webhook', 'polling'], default='webhook', help='Bot update delivery mode')
+    parser.add_argument('--port', type=int, default=8866, help='Websocket port of the test server')
+    parser.add_argument('--api-port', type=int, default=8881, help='Port of the fake Bot API')
+    parser.add_argument('--webhook-port', type=int, default=8882, help='Port of the webhook receiver')
+    parser.add_argument('--clients', type=int, default=10, help='Number of simulated clients')
+    parser.add_argument('--presses', type=int, default=50, help='Number of button presses to inject')
+    parser.add_argument('--button', default='take_screenshot', help='Callback data of the pressed button')
+    parser.add_argument('--interval', type=float, default=0.05, help='Pause between presses in seconds')
+    parser.add_argument('--response-delay', type=float, default=0.0, help='Client response delay in seconds')
+    parser.add_argument('--dedup-window', type=float, default=0.0,
+                        help='Bot dedup window; presses collapsed into an in-flight command never reach clients')
+    parser.add_argument('--flood-every', type=int, default=0, help='Answer every Nth message edit with a 429 flood wait')
+    parser.add_argument('--timeout', type=float, default=5, help='Seconds to wait for each press to arrive')
+    parser.add_argument('--log-level', default='WARNING', help='Log level')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ python3 -m venv venv
 source venv/bin/activate
 
 echo "Installing dependencies..."
-pip install websockets==12.0 python-telegram-bot==20.7 python-dotenv==1.0.0
+pip install websockets==12.0 python-telegram-bot==20.7 python-dotenv==1.0.0 'msgpack>=1.0.0' 'redis>=4.2.0' 'aiohttp>=3.8.0'
 
 echo "Creating .env file..."
 cat > .env << 'EOF'
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import logging
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import websockets
+
+from server import ScreenshotServer
+import shared_path
+from shared.protocol import WireCodec, PROTOCOL_JSON, PROTOCOL_VERSION
+
+COMMAND_TYPES = {
+    'screenshot': 'execute_screenshot',
+    'left': 'execute_left_key',
+    'space': 'execute_space_key',
+    'next': 'execute_next_subtitle'
+}
+
+RESPONSE_TYPES = {
+    'execute_screenshot': ('screenshot_completed', 'screenshot_error'),
+    'execute_left_key': ('left_key_completed', 'left_key_error'),
+    'execute_space_key': ('space_key_completed', 'space_key_error'),
+    'execute_next_subtitle': ('next_subtitle_completed', 'next_subtitle_error')
+}
+
+logger = logging.getLogger(__name__)
+
+
+class LoadTestServer(ScreenshotServer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.responses_received = {}
+
+    async def handle_client_message(self, websocket, data):
+        message_type = data.get('type')
+        self.responses_received[message_type] = self.responses_received.get(message_type, 0) + 1
+        await super().handle_client_message(websocket, data)
+
+
+class SimulatedClient:
+    def __init__(self, index, uri, response_delay=0.0, response_jitter=0.0, failure_rate=0.0,
+                 protocol=PROTOCOL_JSON, deflate=False):
+        self.client_id = f"sim_{index:05d}"
+        self.uri = uri
+        self.protocol = protocol
+        self.deflate = deflate
+        self.codec = WireCodec()
+        self.response_delay = response_delay
+        self.response_jitter = response_jitter
+        self.failure_rate = failure_rate
+        self.websocket = None
+        self.received = {}
+        self.received_by_user = {}
+        self.commands_received = 0
+        self.responses_sent = 0
+        self.failures_sent = 0
+        self.pending = asyncio.Queue()
+        self.tasks = []
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.uri, max_queue=None)
+        self.tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._execute_loop())
+        ]
+
+    async def _read_loop(self):
+        try:
+            async for message in self.websocket:
+                received_at = time.perf_counter()
+                data = WireCodec.decode(message)
+                message_type = data.get('type')
+                if message_type in RESPONSE_TYPES:
+                    self.received[data.get('command_id')] = received_at
+                    self.received_by_user.setdefault(data.get('telegram_user_id'), received_at)
+                    self.commands_received += 1
+                    self.pending.put_nowait(data)
+                elif message_type == 'connection_established' and self.protocol != PROTOCOL_JSON:
+                    await self.websocket.send(self.codec.encode({
+                        'type': 'protocol_select',
+                        'client_id': self.client_id,
+                        'protocol': self.protocol,
+                        'protocol_version': PROTOCOL_VERSION,
+                        'deflate': self.deflate
+                    }))
+                    self.codec = WireCodec(self.protocol, deflate=self.deflate)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _execute_loop(self):
+        while True:
+            data = await self.pending.get()
+            delay = self.response_delay + random.uniform(0, self.response_jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            completed_type, error_type = RESPONSE_TYPES[data['type']]
+            response = {
+                'client_id': self.client_id,
+                'command_id': data.get('command_id'),
+                'telegram_user_id': data.get('telegram_user_id'),
+                'timestamp': datetime.now().isoformat()
+            }
+            if random.random() < self.failure_rate:
+                response['type'] = error_type
+                response['error'] = 'Simulated failure'
+                self.failures_sent += 1
+            else:
+                response['type'] = completed_type
+                response['result'] = {'timing': None}
+                if completed_type == 'screenshot_completed':
+                    response['subtitle_text'] = f"Simulated subtitle {self.client_id}"
+                    response['russian_text'] = f"Симулированный субтитр {self.client_id}"
+                    response['timing'] = '00:00:01'
+
+            try:
+                await self.websocket.send(self.codec.encode(response))
+                self.responses_sent += 1
+            except websockets.exceptions.ConnectionClosed:
+                return
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.websocket:
+            await self.websocket.close()
+
+
+def raise_open_file_limit(required):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = required * 2 + 256
+    if soft < wanted:
+        new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+        soft = new_soft
+    if soft < wanted:
+        logger.warning(f"Open file limit {soft} may be too low for {required} clients")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.2f} ms"
+
+
+async def connect_clients(clients, batch_size):
+    failed = 0
+    for start in range(0, len(clients), batch_size):
+        batch = clients[start:start + batch_size]
+        results = await asyncio.gather(*(client.connect() for client in batch), return_exceptions=True)
+        failed += sum(1 for result in results if isinstance(result, Exception))
+    return failed
+
+
+async def wait_for(condition, timeout, poll=0.05):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(poll)
+    return condition()
+
+
+async def run_load_test(args):
+    raise_open_file_limit(args.clients)
+
+    server = LoadTestServer(host=args.host, port=args.port, enable_telegram=False)
+    server_task = asyncio.create_task(server.start())
+    await wait_for(lambda: server.server is not None, timeout=5)
+
+    uri = f"ws://{args.host}:{args.port}"
+    clients = [
+        SimulatedClient(i, uri, args.response_delay, args.response_jitter, args.failure_rate,
+                        args.protocol, args.deflate)
+        for i in range(args.clients)
+    ]
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    connect_started = time.perf_counter()
+    connect_failures = await connect_clients(clients, args.connect_batch)
+    connected = args.clients - connect_failures
+    await wait_for(lambda: len(server.clients) >= connected, timeout=args.timeout)
+    connect_elapsed = time.perf_counter() - connect_started
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    commands = args.commands.split(',')
+    broadcasts = []
+    storm_started = time.perf_counter()
+    for i in range(args.storm):
+        command = commands[i % len(commands)]
+        started = time.perf_counter()
+        command_id, queued = await server.send_command(COMMAND_TYPES[command], None)
+        finished = time.perf_counter()
+        broadcasts.append((command_id, started, finished, queued))
+        if args.rate > 0:
+            await asyncio.sleep(1.0 / args.rate)
+    storm_elapsed = time.perf_counter() - storm_started
+
+    def queues_drained():
+        return server.get_queue_stats().get('depth', 0) == 0
+
+    await wait_for(queues_drained, timeout=args.timeout)
+    await wait_for(lambda: sum(c.responses_sent for c in clients) >= sum(c.commands_received for c in clients),
+                   timeout=args.timeout)
+    await asyncio.sleep(0.2)
+    queue_stats = server.get_queue_stats()
+
+    delivery_latencies = []
+    fanout_latencies = []
+    send_durations = []
+    for command_id, started, finished, queued in broadcasts:
+        send_durations.append(finished - started)
+        receipts = [client.received[command_id] - started for client in clients if command_id in client.received]
+        delivery_latencies.extend(receipts)
+        if receipts:
+            fanout_latencies.append(max(receipts))
+
+    total_queued = sum(queued for _, _, _, queued in broadcasts)
+    total_delivered = sum(c.commands_received for c in clients)
+    responses_sent = sum(c.responses_sent for c in clients)
+    failures_sent = sum(c.failures_sent for c in clients)
+    responses_received = sum(
+        count for message_type, count in server.responses_received.items()
+        if message_type not in ('heartbeat', 'protocol_select')
+    )
+
+    print("=== ScreenshotServer load test ===")
+    print(f"Clients:               {connected}/{args.clients} connected in {connect_elapsed:.2f}s")
+    print(f"Server-side sockets:   {len(server.clients)}")
+    if connected:
+        print(f"Memory per connection: {(memory_after - memory_before) / connected / 1024:.1f} KiB "
+              f"(server socket + simulated peer, Python heap)")
+    print(f"Broadcasts:            {len(broadcasts)} in {storm_elapsed:.2f}s "
+          f"({len(broadcasts) / storm_elapsed if storm_elapsed else 0:.1f}/s)")
+    print(f"Broadcast call time:   p50 {format_ms(percentile(send_durations, 0.5))}, "
+          f"p95 {format_ms(percentile(send_durations, 0.95))}, max {format_ms(max(send_durations, default=0))}")
+    print(f"Delivery latency:      p50 {format_ms(percentile(delivery_latencies, 0.5))}, "
+          f"p95 {format_ms(percentile(delivery_latencies, 0.95))}, "
+          f"p99 {format_ms(percentile(delivery_latencies, 0.99))}")
+    print(f"Fan-out latency:       p50 {format_ms(percentile(fanout_latencies, 0.5))}, "
+          f"p95 {format_ms(percentile(fanout_latencies, 0.95))}, "
+          f"mean {format_ms(statistics.mean(fanout_latencies) if fanout_latencies else 0)}")
+    lost = total_queued - queue_stats.get('coalesced', 0) - queue_stats.get('dropped', 0) - total_delivered
+    print(f"Messages:              {total_queued} queued, {queue_stats.get('coalesced', 0)} coalesced, "
+          f"{queue_stats.get('dropped', 0)} dropped by full queues, {total_delivered} received, {lost} lost")
+    print(f"Queues:                max depth {queue_stats.get('max_depth', 0)}, "
+          f"{queue_stats.get('ack_timeouts', 0)} completion timeouts")
+    print(f"Responses:             {responses_sent} sent ({failures_sent} simulated failures), "
+          f"{responses_received} received by server, {responses_sent - responses_received} lost")
+
+    for client in clients:
+        await client.close()
+    await server.stop()
+    server_task.cancel()
+    try:
+        await server_task
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test ScreenshotServer with simulated clients')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind the test server on')
+    parser.add_argument('--port', type=int, default=8865, help='Port to bind the test server on')
+    parser.add_argument('--clients', type=int, default=200, help='Number of simulated clients')
+    parser.add_argument('--connect-batch', type=int, default=100, help='Clients connected concurrently')
+    parser.add_argument('--storm', type=int, default=50, help='Number of commands to broadcast')
+    parser.add_argument('--rate', type=float, default=0, help='Commands per second (0 = as fast as possible)')
+    parser.add_argument('--commands', default='screenshot,left',
+                        help=f"Comma-separated command mix: {','.join(COMMAND_TYPES)}")
+    parser.add_argument('--response-delay', type=float, default=0.05, help='Client response delay in seconds')
+    parser.add_argument('--response-jitter', type=float, default=0.0, help='Random extra response delay')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of commands answered with an error')
+    parser.add_argument('--protocol', choices=['json', 'msgpack'], default='json', help='Wire protocol of clients')
+    parser.add_argument('--deflate', action='store_true', help='Request compressed binary messages')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for deliveries to drain')
+    parser.add_argument('--log-level', default='WARNING', help='Server log level')
+    args = parser.parse_args()
+
+    unknown = [c for c in args.commands.split(',') if c not in COMMAND_TYPES]
+    if unknown:
+        parser.error(f"Unknown commands: {', '.join(unknown)}")
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
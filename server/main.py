@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 
+import argparse
 import asyncio
 import signal
 import sys
+import os
 import logging
+import tempfile
+from dotenv import load_dotenv
 from server import ScreenshotServer
+from pubsub import create_bus, UnixSocketHub
 
-def setup_logging():
+load_dotenv()
+
+def setup_logging(worker_index=None):
+    name = '%(name)s' if worker_index is None else f'worker-{worker_index} - %(name)s'
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format=f'%(asctime)s - {name} - %(levelname)s - %(message)s',
         handlers=[
             logging.StreamHandler(sys.stdout),
             logging.FileHandler('screenshot_server.log')
@@ -17,19 +25,42 @@ def setup_logging():
     )
     return logging.getLogger(__name__)
 
-async def main():
-    logger = setup_logging()
-    logger.info("Starting Screenshot Server...")
-    
-    server = ScreenshotServer(host='0.0.0.0', port=8765, enable_telegram=True)
-    
-    def signal_handler(sig, frame):
+def parse_args():
+    parser = argparse.ArgumentParser(description='Screenshot Server')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '1')),
+                        help='Number of worker processes sharing the listening port')
+    parser.add_argument('--worker-index', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ipc-path', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+async def run_server(logger, worker_index=None, ipc_path=None):
+    enable_telegram = os.getenv('ENABLE_TELEGRAM', '1') != '0'
+    instance_id = os.getenv('INSTANCE_ID') or None
+    bus_url = os.getenv('PUBSUB_URL')
+
+    if worker_index is not None:
+        enable_telegram = enable_telegram and worker_index == 0
+        instance_id = f"{instance_id or os.uname().nodename}-w{worker_index}"
+        bus_url = bus_url or f"ipc://{ipc_path}"
+
+    server = ScreenshotServer(
+        host=os.getenv('SERVER_HOST', '0.0.0.0'),
+        port=int(os.getenv('SERVER_PORT', '8765')),
+        enable_telegram=enable_telegram,
+        bus=create_bus(bus_url),
+        instance_id=instance_id,
+        reuse_port=worker_index is not None,
+        subtitle_ttl=float(os.getenv('SUBTITLE_TTL', '3600'))
+    )
+
+    def signal_handler(sig):
         logger.info(f"Received signal {sig}, shutting down...")
         asyncio.create_task(server.stop())
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig)
+
     try:
         await server.start()
     except KeyboardInterrupt:
@@ -40,5 +71,69 @@ async def main():
         await server.stop()
         logger.info("Server stopped")
 
+async def spawn_worker(index, ipc_path):
+    return await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__),
+        '--worker-index', str(index),
+        '--ipc-path', ipc_path,
+        start_new_session=True
+    )
+
+async def supervise(logger, workers):
+    ipc_path = os.path.join(tempfile.gettempdir(), f"screenshot_server_{os.getpid()}.sock")
+    hub = UnixSocketHub(ipc_path)
+    await hub.start()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    processes = {}
+    for index in range(workers):
+        processes[index] = await spawn_worker(index, ipc_path)
+    logger.info(f"Started {workers} workers on port {os.getenv('SERVER_PORT', '8765')}, "
+                f"worker 0 runs the Telegram bot")
+
+    while not stopping.is_set():
+        waiters = {asyncio.create_task(process.wait()): index for index, process in processes.items()}
+        stop_waiter = asyncio.create_task(stopping.wait())
+        done, _ = await asyncio.wait(list(waiters) + [stop_waiter], return_when=asyncio.FIRST_COMPLETED)
+        for task in list(waiters) + [stop_waiter]:
+            if task not in done:
+                task.cancel()
+
+        if stopping.is_set():
+            break
+
+        for task in done:
+            if task in waiters:
+                index = waiters[task]
+                logger.warning(f"Worker {index} exited with code {task.result()}, restarting")
+                await asyncio.sleep(1)
+                processes[index] = await spawn_worker(index, ipc_path)
+
+    logger.info("Stopping workers...")
+    for process in processes.values():
+        if process.returncode is None:
+            process.terminate()
+    await asyncio.gather(*(process.wait() for process in processes.values()))
+    await hub.stop()
+    logger.info("All workers stopped")
+
+async def main():
+    args = parse_args()
+    logger = setup_logging(args.worker_index)
+
+    if args.worker_index is not None:
+        logger.info(f"Starting Screenshot Server worker {args.worker_index}...")
+        await run_server(logger, args.worker_index, args.ipc_path)
+    elif args.workers > 1:
+        logger.info(f"Starting Screenshot Server supervisor with {args.workers} workers...")
+        await supervise(logger, args.workers)
+    else:
+        logger.info("Starting Screenshot Server...")
+        await run_server(logger)
+
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from collections import deque
+
+COMPLETION_TYPES = {
+    'screenshot_completed',
+    'screenshot_error',
+    'left_key_completed',
+    'left_key_error',
+    'space_key_completed',
+    'space_key_error',
+    'next_subtitle_completed',
+    'next_subtitle_error',
+    'seek_cue_completed',
+    'seek_cue_error',
+}
+
+QUEUED = 'queued'
+COALESCED = 'coalesced'
+DROPPED = 'dropped'
+
+logger = logging.getLogger(__name__)
+
+
+class ClientOutboundQueue:
+    def __init__(self, send, max_size=16, ack_timeout=15.0, on_closed=None, on_coalesced=None):
+        self.send = send
+        self.max_size = max_size
+        self.ack_timeout = ack_timeout
+        self.on_closed = on_closed
+        self.on_coalesced = on_coalesced
+        self.items = deque()
+        self.superseded = {}
+        self.in_flight = None
+        self.ack_event = asyncio.Event()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.enqueued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.ack_timeouts = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self.items) + (1 if self.in_flight else 0)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        self.items.clear()
+        self.superseded.clear()
+
+    def put(self, message, encoded=None):
+        self.enqueued += 1
+        item = (message, encoded if encoded is not None else {})
+        status = self._coalesce(item)
+
+        if status is None:
+            status = QUEUED
+            if len(self.items) >= self.max_size:
+                dropped, _ = self.items.popleft()
+                self.superseded.pop(dropped.get('command_id'), None)
+                self.dropped += 1
+                status = DROPPED
+                logger.warning(f"Outbound queue full, dropped {dropped.get('type')} {dropped.get('command_id')}")
+            self.items.append(item)
+
+        self.max_depth = max(self.max_depth, self.depth)
+        self.wakeup.set()
+        return status
+
+    def _coalesce(self, item):
+        message = item[0]
+        message_type = message.get('type')
+
+        if message_type == 'execute_screenshot':
+            for pending in list(self.items):
+                if pending[0].get('type') == 'execute_screenshot':
+                    self.items.remove(pending)
+                    self._supersede(pending[0], message)
+                    self.items.append(item)
+                    return COALESCED
+
+        elif message_type == 'execute_left_key' and self.items:
+            last = self.items[-1][0]
+            if last.get('type') == 'execute_left_key':
+                merged = dict(message)
+                merged['count'] = last.get('count', 1) + message.get('count', 1)
+                self.items[-1] = (merged, {})
+                self._supersede(last, merged)
+                return COALESCED
+
+        elif message_type == 'execute_seek_cue' and self.items:
+            last = self.items[-1][0]
+            if last.get('type') == 'execute_seek_cue':
+                merged = dict(message)
+                merged['offset'] = last.get('offset', 0) + message.get('offset', 0)
+                self.items[-1] = (merged, {})
+                self._supersede(last, merged)
+                return COALESCED
+
+        return None
+
+    def _supersede(self, replaced, message):
+        self.coalesced += 1
+        replaced_id = replaced.get('command_id')
+        command_id = message.get('command_id')
+        if replaced_id is None or replaced_id == command_id:
+            return
+        superseded = self.superseded.pop(replaced_id, []) + [replaced_id]
+        self.superseded[command_id] = superseded
+        if self.on_coalesced:
+            self.on_coalesced(superseded, command_id)
+
+    def ack(self, command_id):
+        if command_id is not None and command_id == self.in_flight:
+            self.ack_event.set()
+
+    async def run(self):
+        while True:
+            if not self.items:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            message, encoded = self.items.popleft()
+            self.in_flight = message.get('command_id')
+            self.superseded.pop(self.in_flight, None)
+            self.ack_event.clear()
+            try:
+                await self.send(message, encoded)
+                self.sent += 1
+            except Exception as e:
+                logger.info(f"Outbound queue stopped: {e}")
+                self.in_flight = None
+                if self.on_closed:
+                    self.on_closed()
+                return
+
+            if self.in_flight is not None:
+                try:
+                    await asyncio.wait_for(self.ack_event.wait(), timeout=self.ack_timeout)
+                except asyncio.TimeoutError:
+                    self.ack_timeouts += 1
+                    logger.warning(f"No completion for {self.in_flight} after {self.ack_timeout}s, sending next command")
+            self.in_flight = None
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'ack_timeouts': self.ack_timeouts
+        }
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import os
+
+CHANNEL_PREFIX = 'audio_prompter'
+CHANNEL_COMMANDS = f'{CHANNEL_PREFIX}:commands'
+CHANNEL_RESPONSES = f'{CHANNEL_PREFIX}:responses'
+CHANNEL_REGISTRY = f'{CHANNEL_PREFIX}:registry'
+
+IPC_LINE_LIMIT = 16 * 1024 * 1024
+IPC_RECONNECT_DELAY = 0.1
+IPC_MAX_RECONNECT_DELAY = 5.0
+HUB_DRAIN_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def instance_channel(instance_id):
+    return f'{CHANNEL_PREFIX}:instance:{instance_id}'
+
+
+class PubSubBus:
+    def __init__(self):
+        self.handlers = {}
+        self.inbox = asyncio.Queue()
+        self.dispatcher = None
+
+    async def connect(self):
+        if self.dispatcher is None:
+            self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self):
+        if self.dispatcher:
+            self.dispatcher.cancel()
+            self.dispatcher = None
+
+    async def subscribe(self, channel, handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel, message):
+        raise NotImplementedError
+
+    def deliver(self, channel, payload):
+        self.inbox.put_nowait((channel, payload))
+
+    async def _dispatch(self):
+        while True:
+            channel, payload = await self.inbox.get()
+            try:
+                message = json.loads(payload)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Dropping malformed bus message on {channel}: {e}")
+                continue
+            for handler in list(self.handlers.get(channel, [])):
+                try:
+                    await handler(message)
+                except Exception as e:
+                    logger.error(f"Bus handler error on {channel}: {e}")
+
+
+class InProcessBus(PubSubBus):
+    _hubs = {}
+
+    def __init__(self, name='default'):
+        super().__init__()
+        self.name = name
+        self.hub = InProcessBus._hubs.setdefault(name, {})
+
+    async def subscribe(self, channel, handler):
+        await super().subscribe(channel, handler)
+        subscribers = self.hub.setdefault(channel, [])
+        if self not in subscribers:
+            subscribers.append(self)
+
+    async def publish(self, channel, message):
+        payload = json.dumps(message)
+        for bus in list(self.hub.get(channel, [])):
+            bus.deliver(channel, payload)
+
+    async def close(self):
+        for subscribers in self.hub.values():
+            if self in subscribers:
+                subscribers.remove(self)
+        await super().close()
+
+
+class RedisBus(PubSubBus):
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self.redis = None
+        self.pubsub = None
+        self.listener = None
+
+    async def connect(self):
+        import redis.asyncio as aioredis
+        self.redis = aioredis.from_url(self.url)
+        self.pubsub = self.redis.pubsub()
+        await super().connect()
+        self.listener = asyncio.create_task(self._listen())
+        logger.info(f"Connected to Redis bus at {self.url}")
+
+    async def subscribe(self, channel, handler):
+        await super().subscribe(channel, handler)
+        await self.pubsub.subscribe(channel)
+
+    async def publish(self, channel, message):
+        await self.redis.publish(channel, json.dumps(message))
+
+    async def _listen(self):
+        while True:
+            if not self.pubsub.subscribed:
+                await asyncio.sleep(0.1)
+                continue
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                logger.error(f"Redis bus receive error: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message and message.get('type') == 'message':
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode('utf-8')
+                self.deliver(channel, message['data'])
+
+    async def close(self):
+        if self.listener:
+            self.listener.cancel()
+            self.listener = None
+        await super().close()
+        if self.pubsub:
+            await self.pubsub.close()
+        if self.redis:
+            await self.redis.close()
+
+
+class UnixSocketBus(PubSubBus):
+    def __init__(self, path, connect_attempts=50):
+        super().__init__()
+        self.path = path
+        self.connect_attempts = connect_attempts
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+
+    async def connect(self):
+        for attempt in range(self.connect_attempts):
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.path, limit=IPC_LINE_LIMIT)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(IPC_RECONNECT_DELAY)
+        else:
+            raise ConnectionError(f"IPC hub is not available at {self.path}")
+        await super().connect()
+        self.reader_task = asyncio.create_task(self._read())
+
+    async def _reconnect(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        delay = IPC_RECONNECT_DELAY
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=IPC_LINE_LIMIT)
+                break
+            except OSError as e:
+                logger.warning(f"IPC hub unavailable ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, IPC_MAX_RECONNECT_DELAY)
+        self.reader, self.writer = reader, writer
+        for channel in self.handlers:
+            await self._send({'op': 'sub', 'channel': channel})
+        logger.info(f"Reconnected to IPC hub, resubscribed to {len(self.handlers)} channels")
+
+    async def subscribe(self, channel, handler):
+        await super().subscribe(channel, handler)
+        await self._send({'op': 'sub', 'channel': channel})
+
+    async def publish(self, channel, message):
+        await self._send({'op': 'pub', 'channel': channel, 'payload': json.dumps(message)})
+
+    async def _send(self, frame):
+        if self.writer is None or self.writer.is_closing():
+            raise ConnectionError("IPC hub is not connected")
+        self.writer.write(json.dumps(frame).encode('utf-8') + b'\n')
+        await self.writer.drain()
+
+    async def _read(self):
+        while True:
+            try:
+                line = await self.reader.readline()
+            except ConnectionError:
+                line = b''
+            except ValueError as e:
+                logger.warning(f"Dropping oversized IPC frame: {e}")
+                continue
+            if not line:
+                logger.error("Lost connection to IPC hub, reconnecting")
+                await self._reconnect()
+                continue
+            try:
+                frame = json.loads(line)
+                channel, payload = frame['channel'], frame['payload']
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(f"Dropping malformed IPC frame: {e!r}")
+                continue
+            self.deliver(channel, payload)
+
+    async def close(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+            self.reader_task = None
+        await super().close()
+        if self.writer:
+            self.writer.close()
+
+
+class UnixSocketHub:
+    def __init__(self, path):
+        self.path = path
+        self.server = None
+        self.subscribers = {}
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, self.path, limit=IPC_LINE_LIMIT)
+        logger.info(f"IPC hub listening on {self.path}")
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    logger.warning(f"IPC hub dropped an oversized frame: {e}")
+                    continue
+                if not line:
+                    break
+                try:
+                    frame = json.loads(line)
+                    op, channel = frame.get('op'), frame['channel']
+                    if op == 'pub':
+                        data = json.dumps({'channel': channel, 'payload': frame['payload']}).encode('utf-8') + b'\n'
+                except (ValueError, TypeError, KeyError, AttributeError) as e:
+                    logger.warning(f"IPC hub received malformed frame: {e!r}")
+                    continue
+                if op == 'sub':
+                    self.subscribers.setdefault(channel, set()).add(writer)
+                elif op == 'pub':
+                    await self._broadcast(channel, data)
+        except ConnectionError as e:
+            logger.info(f"IPC hub peer disconnected: {e}")
+        finally:
+            self._drop(writer)
+
+    async def _broadcast(self, channel, data):
+        subscribers = self.subscribers.get(channel, set())
+        targets = []
+        for subscriber in list(subscribers):
+            if subscriber.is_closing():
+                subscribers.discard(subscriber)
+            else:
+                subscriber.write(data)
+                targets.append(subscriber)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(subscriber.drain(), HUB_DRAIN_TIMEOUT) for subscriber in targets),
+            return_exceptions=True
+        )
+        for subscriber, result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.warning(f"IPC hub dropped a slow or broken subscriber: {result!r}")
+                self._drop(subscriber)
+
+    def _drop(self, writer):
+        for subscribers in self.subscribers.values():
+            subscribers.discard(writer)
+        writer.close()
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def create_bus(url):
+    if not url:
+        return None
+    if url.startswith('memory://'):
+        return InProcessBus(url[len('memory://'):] or 'default')
+    if url.startswith('ipc://'):
+        return UnixSocketBus(url[len('ipc://'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBus(url)
+    raise ValueError(f"Unsupported pub/sub URL: {url}")
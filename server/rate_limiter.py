@@ -0,0 +1,89 @@
+import time
+
+DEFAULT_LIMIT = (10, 5.0)
+DEFAULT_LIMITS = {
+    'execute_screenshot': (3, 0.5),
+    'execute_next_subtitle': (2, 0.2)
+}
+
+
+def parse_limits(spec):
+    limits = dict(DEFAULT_LIMITS)
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        command_type, _, value = item.partition('=')
+        burst, _, rate = value.partition('/')
+        try:
+            limits[command_type.strip()] = (int(burst), float(rate))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{item}', expected command_type=burst/rate")
+    return limits
+
+
+class TokenBucket:
+    def __init__(self, capacity, rate, now=None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = now if now is not None else time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now):
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    def __init__(self, limits=None, default=DEFAULT_LIMIT, prune_interval=60):
+        self.limits = limits if limits is not None else dict(DEFAULT_LIMITS)
+        self.default = default
+        self.prune_interval = prune_interval
+        self.buckets = {}
+        self.allowed = 0
+        self.rejected = {}
+        self.last_prune = time.monotonic()
+
+    def check(self, user_id, command_type, now=None):
+        now = now if now is not None else time.monotonic()
+        if now - self.last_prune >= self.prune_interval:
+            self.prune(now)
+
+        key = (user_id, command_type)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            capacity, rate = self.limits.get(command_type, self.default)
+            bucket = self.buckets[key] = TokenBucket(capacity, rate, now)
+
+        retry_after = bucket.take(now)
+        if retry_after:
+            self.rejected[command_type] = self.rejected.get(command_type, 0) + 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def prune(self, now):
+        for key, bucket in list(self.buckets.items()):
+            if bucket.is_full(now):
+                del self.buckets[key]
+        self.last_prune = now
+
+    def stats(self):
+        return {
+            'allowed': self.allowed,
+            'rejected': sum(self.rejected.values()),
+            'rejected_by_command': dict(self.rejected),
+            'tracked_buckets': len(self.buckets)
+        }
@@ -8,15 +8,54 @@ from typing import Set, Dict, Any
 import logging
 import time
 import os
+import uuid
+import base64
+import shared_path
+from shared.protocol import WireCodec, ProtocolError, supported_protocols, PROTOCOL_JSON, PROTOCOL_VERSION
+from connection_health import ClientHealth
+from outbound_queue import ClientOutboundQueue, COMPLETION_TYPES, QUEUED, COALESCED, DROPPED
+from pubsub import CHANNEL_COMMANDS, CHANNEL_RESPONSES, CHANNEL_REGISTRY, instance_channel
+from subtitle_registry import SubtitleRegistry
+
+COMMAND_PREFIXES = {
+    'execute_screenshot': 'cmd',
+    'execute_left_key': 'left',
+    'execute_space_key': 'space',
+    'execute_next_subtitle': 'next',
+    'execute_seek_cue': 'seek'
+}
 
 class ScreenshotServer:
-    def __init__(self, host='0.0.0.0', port=8765, enable_telegram=True):
+    def __init__(self, host='0.0.0.0', port=8765, enable_telegram=True, protocols=None,
+                 heartbeat_interval=30, max_missed_heartbeats=3, queue_size=16, command_ack_timeout=15.0,
+                 bus=None, instance_id=None, reuse_port=False, subtitle_ttl=3600.0):
         self.host = host
         self.port = port
+        self.bus = bus
+        self.bus_connected = False
+        self.reuse_port = reuse_port
+        self.instance_id = instance_id or str(uuid.uuid4())[:8]
+        self.local_client_ids: Dict[str, websockets.WebSocketServerProtocol] = {}
+        self.remote_clients: Dict[str, tuple] = {}
         self.clients: Set[websockets.WebSocketServerProtocol] = set()
+        self.client_codecs: Dict[websockets.WebSocketServerProtocol, WireCodec] = {}
+        self.client_health: Dict[websockets.WebSocketServerProtocol, ClientHealth] = {}
+        self.client_queues: Dict[websockets.WebSocketServerProtocol, ClientOutboundQueue] = {}
+        self.queue_size = queue_size
+        self.command_ack_timeout = command_ack_timeout
+        self.command_counter = 0
+        self.retired_queue_stats = {}
+        self.protocols = [p for p in (protocols or supported_protocols()) if p in supported_protocols()]
+        self.heartbeat_interval = heartbeat_interval
+        self.max_missed_heartbeats = max_missed_heartbeats
+        self.reaped_clients = 0
+        self.subtitles = SubtitleRegistry(ttl=subtitle_ttl)
+        self.subtitle_subscriptions: Dict[websockets.WebSocketServerProtocol, Dict[str, str]] = {}
+        self.subtitle_task = None
         self.server = None
         self.telegram_bot = None
         self.telegram_task = None
+        self.reaper_task = None
         self.is_running = False
         self.start_time = time.time()
         self.requests_log_file = "user_requests.log"
@@ -35,29 +74,83 @@ class ScreenshotServer:
     
     async def register_client(self, websocket: websockets.WebSocketServerProtocol):
         self.clients.add(websocket)
+        self.client_codecs[websocket] = WireCodec()
+        self.client_health[websocket] = ClientHealth(websocket.remote_address, self.heartbeat_interval)
+        queue = ClientOutboundQueue(
+            lambda message, encoded: self._send_queued(websocket, message, encoded),
+            max_size=self.queue_size,
+            ack_timeout=self.command_ack_timeout,
+            on_closed=lambda: self.forget_client(websocket),
+            on_coalesced=self.on_commands_coalesced
+        )
+        self.client_queues[websocket] = queue
+        queue.start()
         self.logger.info(f"Client connected. Total clients: {len(self.clients)}")
         
         try:
-            await websocket.send(json.dumps({
+            await self.send_to_client(websocket, {
                 'type': 'connection_established',
-                'timestamp': datetime.now().isoformat()
-            }))
+                'timestamp': datetime.now().isoformat(),
+                'protocols': self.protocols,
+                'protocol_version': PROTOCOL_VERSION
+            })
             
             async for message in websocket:
                 try:
-                    data = json.loads(message)
+                    data = WireCodec.decode(message)
+                    health = self.client_health.get(websocket)
+                    if health and health.touch(data.get('client_id')):
+                        await self.on_client_identified(websocket, health.client_id)
                     await self.handle_client_message(websocket, data)
-                except json.JSONDecodeError:
+                except ProtocolError as e:
+                    self.logger.warning(f"Invalid message from client: {e}")
                     continue
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
-            self.clients.remove(websocket)
+            self.forget_client(websocket)
             self.logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
     
     async def handle_client_message(self, websocket: websockets.WebSocketServerProtocol, data: Dict[str, Any]):
         message_type = data.get('type')
         
+        if message_type in COMPLETION_TYPES:
+            queue = self.client_queues.get(websocket)
+            if queue:
+                queue.ack(data.get('command_id'))
+            await self.route_command_result(data)
+        
+        elif message_type == 'protocol_select':
+            await self.handle_protocol_select(websocket, data)
+        
+        elif message_type == 'heartbeat':
+            health = self.client_health.get(websocket)
+            if health:
+                health.record_heartbeat(data.get('rtt_ms'))
+            await self.send_to_client(websocket, {
+                'type': 'heartbeat_ack',
+                'timestamp': datetime.now().isoformat(),
+                'heartbeat_id': data.get('heartbeat_id')
+            })
+        
+        elif message_type == 'subtitle_subscribe':
+            asyncio.create_task(self.handle_subtitle_subscribe(websocket, data))
+        
+        elif message_type == 'subtitle_lookup':
+            asyncio.create_task(self.handle_subtitle_lookup(websocket, data))
+        
+        elif message_type == 'subtitle_announce':
+            asyncio.create_task(self.handle_subtitle_announce(data))
+    
+    async def route_command_result(self, data):
+        if self.bus and not self.telegram_bot:
+            await self.bus.publish(CHANNEL_RESPONSES, {'origin': self.instance_id, 'data': data})
+            return
+        await self.handle_command_result(data)
+    
+    async def handle_command_result(self, data):
+        message_type = data.get('type')
+        
         if message_type == 'screenshot_completed':
             client_id = data.get('client_id', 'unknown')
             telegram_user_id = data.get('telegram_user_id')
@@ -65,9 +158,33 @@ class ScreenshotServer:
             subtitle_text = data.get('subtitle_text')
             russian_text = data.get('russian_text', '')
             timing = data.get('timing', '')
+            if not subtitle_text and data.get('url') and data.get('position') is not None:
+                try:
+                    russian_text, eng_text, _ = await self.subtitles.lookup(data['url'], data['position'])
+                    subtitle_text = eng_text or russian_text
+                    russian_text = russian_text or ''
+                except Exception as e:
+                    self.logger.warning(f"Subtitle lookup for client {client_id} failed: {e}")
             self.logger.info(f"Screenshot completed by client {client_id}: {result.get('timing', 'N/A')}")
-            if telegram_user_id and subtitle_text:
-                await self.handle_subtitle_response(telegram_user_id, subtitle_text, russian_text, timing)
+            if telegram_user_id:
+                await self.handle_subtitle_response(telegram_user_id, subtitle_text or '', russian_text, timing,
+                                                    data.get('command_id'))
+        
+        elif message_type in ('screenshot_error', 'seek_cue_error'):
+            client_id = data.get('client_id', 'unknown')
+            telegram_user_id = data.get('telegram_user_id')
+            error = data.get('error', 'unknown error')
+            self.logger.warning(f"{message_type} from client {client_id}: {error}")
+            if telegram_user_id:
+                await self.handle_command_error(telegram_user_id, data.get('command_id'), error)
+        
+        elif message_type == 'seek_cue_completed':
+            client_id = data.get('client_id', 'unknown')
+            telegram_user_id = data.get('telegram_user_id')
+            result = data.get('result', {})
+            self.logger.info(f"Seek completed by client {client_id}: {result.get('timing')} -> {result.get('target_timing')}")
+            if telegram_user_id:
+                await self.handle_seek_response(telegram_user_id, data.get('command_id'), result)
         
         elif message_type == 'left_key_completed':
             client_id = data.get('client_id', 'unknown')
@@ -92,130 +209,369 @@ class ScreenshotServer:
             self.logger.info(f"Next subtitle completed by client {client_id}")
             if telegram_user_id:
                 await self.handle_next_subtitle_response(telegram_user_id, result)
-        
-        elif message_type == 'heartbeat':
-            await websocket.send(json.dumps({
-                'type': 'heartbeat_ack',
-                'timestamp': datetime.now().isoformat()
-            }))
     
-    async def broadcast_screenshot_command(self, telegram_user_id=None):
-        if not self.clients:
-            self.logger.warning("No connected clients to send screenshot command to")
+    async def handle_protocol_select(self, websocket, data):
+        protocol = data.get('protocol')
+        if protocol not in self.protocols or data.get('protocol_version', PROTOCOL_VERSION) != PROTOCOL_VERSION:
+            self.logger.warning(f"Client requested unsupported protocol {protocol}, keeping JSON")
+            protocol = PROTOCOL_JSON
+        
+        codec = WireCodec(protocol, deflate=bool(data.get('deflate')))
+        self.client_codecs[websocket] = codec
+        self.logger.info(f"Client {data.get('client_id', 'unknown')} switched to {codec}")
+        await self.send_to_client(websocket, {
+            'type': 'protocol_selected',
+            'timestamp': datetime.now().isoformat(),
+            'protocol': codec.protocol,
+            'deflate': codec.deflate
+        })
+    
+    def encode_blob(self, websocket, blob):
+        codec = self.client_codecs.get(websocket)
+        if codec is None or codec.protocol == PROTOCOL_JSON:
+            return base64.b64encode(blob).decode('ascii')
+        return blob
+    
+    async def send_subtitle_track(self, websocket, url, known_hash=None):
+        try:
+            track = await self.subtitles.get(url)
+        except Exception as e:
+            self.logger.warning(f"Failed to load subtitles {url}: {e}")
+            await self.send_to_client(websocket, {
+                'type': 'subtitle_track',
+                'timestamp': datetime.now().isoformat(),
+                'url': url,
+                'error': str(e)
+            })
             return
         
+        subscriptions = self.subtitle_subscriptions.get(websocket)
+        if subscriptions is not None and url in subscriptions:
+            subscriptions[url] = track.hash
         message = {
-            'type': 'execute_screenshot',
+            'type': 'subtitle_track',
             'timestamp': datetime.now().isoformat(),
-            'command_id': f"cmd_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'telegram_user_id': telegram_user_id
+            'url': url,
+            'hash': track.hash
         }
-        
-        message_json = json.dumps(message)
-        disconnected_clients = set()
-        sent_count = 0
-        
-        for client in self.clients:
-            try:
-                await client.send(message_json)
-                sent_count += 1
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                self.logger.error(f"Error sending to client: {e}")
-                disconnected_clients.add(client)
-        
-        for client in disconnected_clients:
-            self.clients.discard(client)
-        
-        if disconnected_clients:
-            self.logger.info(f"Removed {len(disconnected_clients)} disconnected clients")
-        
-        self.logger.info(f"Screenshot command sent to {sent_count} clients")
-        return sent_count
+        if track.hash != known_hash:
+            message['blob'] = self.encode_blob(websocket, track.blob)
+        await self.send_to_client(websocket, message)
     
-    async def broadcast_left_key_command(self, telegram_user_id=None):
-        if not self.clients:
-            self.logger.warning("No connected clients to send left key command to")
+    async def handle_subtitle_subscribe(self, websocket, data):
+        urls = [url for url in data.get('urls') or [] if url]
+        hashes = data.get('hashes') or []
+        known = {url: hashes[i] if i < len(hashes) else None for i, url in enumerate(urls)}
+        if websocket not in self.clients:
             return
-        
-        message = {
-            'type': 'execute_left_key',
+        self.subtitle_subscriptions[websocket] = dict(known)
+        self.logger.info(f"Client {data.get('client_id', 'unknown')} subscribed to {len(urls)} subtitle tracks")
+        await asyncio.gather(*(self.send_subtitle_track(websocket, url, known[url]) for url in urls))
+    
+    async def handle_subtitle_announce(self, data):
+        urls = [url for url in data.get('urls') or [] if url]
+        self.logger.info(f"Client {data.get('client_id', 'unknown')} announced {len(urls)} subtitle tracks")
+        results = await asyncio.gather(*(self.subtitles.get(url) for url in urls), return_exceptions=True)
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Failed to load announced subtitles {url}: {result}")
+    
+    async def handle_subtitle_lookup(self, websocket, data):
+        url = data.get('url')
+        response = {
+            'type': 'subtitle_cue',
             'timestamp': datetime.now().isoformat(),
-            'command_id': f"left_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'telegram_user_id': telegram_user_id
+            'request_id': data.get('request_id'),
+            'url': url,
+            'position': data.get('position'),
+            'timing': data.get('timing')
         }
-        
-        message_json = json.dumps(message)
-        disconnected_clients = set()
-        sent_count = 0
-        
-        for client in self.clients:
+        try:
+            position = data.get('position')
+            if position is None:
+                hours, minutes, seconds = (int(part) for part in data.get('timing', '').split(':'))
+                position = hours * 3600 + minutes * 60 + seconds + 0.5
+            russian_text, eng_text, time_to_boundary = await self.subtitles.lookup(url, position)
+            response.update({
+                'subtitle_text': eng_text or russian_text or '',
+                'russian_text': russian_text or '',
+                'time_to_boundary': time_to_boundary
+            })
+        except Exception as e:
+            response['error'] = str(e)
+        await self.send_to_client(websocket, response)
+    
+    async def run_subtitle_refresh(self):
+        while self.is_running:
+            await asyncio.sleep(self.subtitles.ttl)
+            subscribed = {url for subscriptions in self.subtitle_subscriptions.values() for url in subscriptions}
+            for url in subscribed:
+                try:
+                    track = await self.subtitles.get(url, refresh=True)
+                except Exception as e:
+                    self.logger.warning(f"Failed to refresh subtitles {url}: {e}")
+                    continue
+                for websocket, subscriptions in list(self.subtitle_subscriptions.items()):
+                    if url in subscriptions and subscriptions[url] != track.hash:
+                        try:
+                            await self.send_subtitle_track(websocket, url, subscriptions[url])
+                        except Exception as e:
+                            self.logger.warning(f"Failed to push subtitles {url}: {e}")
+    
+    def encode_for_client(self, websocket, message, cache=None):
+        codec = self.client_codecs.get(websocket) or WireCodec()
+        if cache is None:
+            return codec.encode(message)
+        if codec.key not in cache:
+            cache[codec.key] = codec.encode(message)
+        return cache[codec.key]
+    
+    async def send_to_client(self, websocket, message):
+        await websocket.send(self.encode_for_client(websocket, message))
+    
+    def forget_client(self, websocket):
+        health = self.client_health.get(websocket)
+        if health and health.client_id and self.local_client_ids.get(health.client_id) is websocket:
+            del self.local_client_ids[health.client_id]
+            if self.bus and self.is_running:
+                asyncio.create_task(self.publish_registry('leave', [health.client_id]))
+        self.clients.discard(websocket)
+        self.client_codecs.pop(websocket, None)
+        self.client_health.pop(websocket, None)
+        self.subtitle_subscriptions.pop(websocket, None)
+        queue = self.client_queues.pop(websocket, None)
+        if queue:
+            self.retired_queue_stats = self.merge_queue_stats(self.retired_queue_stats, queue.stats())
+            queue.stop()
+    
+    def get_queue_depth(self, websocket):
+        queue = self.client_queues.get(websocket)
+        return queue.depth if queue else 0
+    
+    def merge_queue_stats(self, total, stats):
+        merged = dict(total)
+        for key, value in stats.items():
+            if key == 'max_depth':
+                merged[key] = max(merged.get(key, 0), value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+        return merged
+    
+    def get_queue_stats(self):
+        totals = {key: value for key, value in self.retired_queue_stats.items() if key != 'depth'}
+        totals['depth'] = 0
+        for queue in list(self.client_queues.values()):
+            totals = self.merge_queue_stats(totals, queue.stats())
+        return totals
+    
+    def get_client_health(self):
+        summaries = []
+        for websocket, health in list(self.client_health.items()):
+            health.queue_depth = self.get_queue_depth(websocket)
+            summaries.append(health.summary())
+        return summaries
+    
+    def get_status(self):
+        return {
+            'uptime': self.get_uptime(),
+            'instance_id': self.instance_id,
+            'clients': len(self.clients),
+            'remote_clients': len(self.remote_clients),
+            'reaped_clients': self.reaped_clients,
+            'heartbeat_interval': self.heartbeat_interval,
+            'max_missed_heartbeats': self.max_missed_heartbeats,
+            'queues': self.get_queue_stats(),
+            'telegram': self.telegram_bot.get_stats() if self.telegram_bot else None,
+            'subtitles': dict(self.subtitles.stats(), subscribers=len(self.subtitle_subscriptions)),
+            'client_health': self.get_client_health()
+        }
+    
+    async def reap_stale_clients(self):
+        now = time.monotonic()
+        stale = [
+            websocket for websocket, health in list(self.client_health.items())
+            if health.is_stale(self.max_missed_heartbeats, now)
+        ]
+        
+        for websocket in stale:
+            health = self.client_health.get(websocket)
+            self.logger.warning(
+                f"Evicting stale client {health.client_id or 'unknown'}: "
+                f"no messages for {health.idle_seconds(now):.0f}s"
+            )
+            self.forget_client(websocket)
+            self.reaped_clients += 1
+            asyncio.create_task(self._close_stale_client(websocket))
+        
+        return len(stale)
+    
+    async def _close_stale_client(self, websocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1001, reason='Heartbeat timeout'), timeout=5)
+        except Exception:
+            websocket.transport.abort()
+    
+    async def run_heartbeat_reaper(self):
+        interval = max(1, self.heartbeat_interval / 2)
+        while self.is_running:
+            await asyncio.sleep(interval)
             try:
-                await client.send(message_json)
-                sent_count += 1
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
+                await self.reap_stale_clients()
+                if self.bus:
+                    self.expire_remote_clients()
+                    await self.publish_registry('announce', list(self.local_client_ids))
             except Exception as e:
-                self.logger.error(f"Error sending to client: {e}")
-                disconnected_clients.add(client)
-        
-        for client in disconnected_clients:
-            self.clients.discard(client)
-        
-        if disconnected_clients:
-            self.logger.info(f"Removed {len(disconnected_clients)} disconnected clients")
-        
-        self.logger.info(f"Left key command sent to {sent_count} clients")
-        return sent_count
+                self.logger.error(f"Heartbeat reaper error: {e}")
     
-    async def broadcast_space_key_command(self, telegram_user_id=None):
-        if not self.clients:
-            self.logger.warning("No connected clients to send space key command to")
-            return
-        
-        message = {
-            'type': 'execute_space_key',
-            'timestamp': datetime.now().isoformat(),
-            'command_id': f"space_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'telegram_user_id': telegram_user_id
-        }
+    def next_command_id(self, prefix):
+        self.command_counter += 1
+        return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.command_counter}"
     
-    async def broadcast_next_subtitle_command(self, telegram_user_id=None):
-        if not self.clients:
-            self.logger.warning("No connected clients to send next subtitle command to")
-            return
+    async def send_command(self, command_type, telegram_user_id=None, client_id=None, **fields):
+        if not self.clients and not self.remote_clients:
+            self.logger.warning(f"No connected clients to send {command_type} command to")
+            return None, 0
         
         message = {
-            'type': 'execute_next_subtitle',
+            'type': command_type,
             'timestamp': datetime.now().isoformat(),
-            'command_id': f"next_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'command_id': self.next_command_id(COMMAND_PREFIXES.get(command_type, 'cmd')),
             'telegram_user_id': telegram_user_id
         }
+        message.update(fields)
         
-        message_json = json.dumps(message)
-        disconnected_clients = set()
-        sent_count = 0
-        
-        for client in self.clients:
-            try:
-                await client.send(message_json)
-                sent_count += 1
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                self.logger.error(f"Error sending to client: {e}")
-                disconnected_clients.add(client)
-        
-        for client in disconnected_clients:
-            self.clients.discard(client)
+        queued_count = self.enqueue_command(message, client_id)
+        if self.bus:
+            queued_count += await self.publish_command(message, client_id)
+        return message['command_id'], queued_count
+    
+    def enqueue_command(self, message, client_id=None):
+        if client_id:
+            websocket = self.local_client_ids.get(client_id)
+            targets = [websocket] if websocket else []
+        else:
+            targets = list(self.clients)
+        
+        encoded = {}
+        statuses = {QUEUED: 0, COALESCED: 0, DROPPED: 0}
+        for client in targets:
+            queue = self.client_queues.get(client)
+            if queue:
+                statuses[queue.put(message, encoded)] += 1
+        
+        queued_count = sum(statuses.values())
+        if queued_count:
+            self.logger.info(
+                f"{message['type']} command queued for {queued_count} clients "
+                f"({statuses[COALESCED]} coalesced, {statuses[DROPPED]} dropped stale commands)"
+            )
+        return queued_count
+    
+    async def publish_command(self, message, client_id=None):
+        envelope = {'origin': self.instance_id, 'command': message, 'client_id': client_id}
+        if not client_id:
+            await self.bus.publish(CHANNEL_COMMANDS, envelope)
+            return len(self.remote_clients)
+        if client_id in self.local_client_ids:
+            return 0
+        if client_id not in self.remote_clients:
+            self.logger.warning(f"Client {client_id} is not connected to any instance")
+            return 0
+        instance_id, _ = self.remote_clients[client_id]
+        await self.bus.publish(instance_channel(instance_id), envelope)
+        return 1
+    
+    async def on_bus_command(self, envelope):
+        if envelope.get('origin') == self.instance_id:
+            return
+        self.enqueue_command(envelope['command'], envelope.get('client_id'))
+    
+    async def on_bus_response(self, envelope):
+        if envelope.get('origin') == self.instance_id:
+            return
+        await self.handle_command_result(envelope['data'])
+    
+    async def on_bus_registry(self, envelope):
+        instance_id = envelope.get('instance_id')
+        if instance_id == self.instance_id:
+            return
         
-        if disconnected_clients:
-            self.logger.info(f"Removed {len(disconnected_clients)} disconnected clients")
+        event = envelope.get('event')
+        if event == 'sync_request':
+            await self.publish_registry('announce', list(self.local_client_ids))
+            return
         
-        self.logger.info(f"Space key command sent to {sent_count} clients")
+        now = time.monotonic()
+        if event == 'announce':
+            for client_id, (owner, _) in list(self.remote_clients.items()):
+                if owner == instance_id:
+                    del self.remote_clients[client_id]
+        for client_id in envelope.get('client_ids', []):
+            if event in ('join', 'announce'):
+                self.remote_clients[client_id] = (instance_id, now)
+            elif event == 'leave' and self.remote_clients.get(client_id, (None,))[0] == instance_id:
+                del self.remote_clients[client_id]
+    
+    async def publish_registry(self, event, client_ids=None):
+        try:
+            await self.bus.publish(CHANNEL_REGISTRY, {
+                'event': event,
+                'instance_id': self.instance_id,
+                'client_ids': client_ids or []
+            })
+        except Exception as e:
+            self.logger.error(f"Failed to publish registry event {event}: {e}")
+    
+    async def on_client_identified(self, websocket, client_id):
+        self.local_client_ids[client_id] = websocket
+        if self.bus:
+            await self.publish_registry('join', [client_id])
+    
+    def expire_remote_clients(self):
+        deadline = time.monotonic() - self.heartbeat_interval * self.max_missed_heartbeats
+        for client_id, (_, seen) in list(self.remote_clients.items()):
+            if seen < deadline:
+                del self.remote_clients[client_id]
+    
+    async def start_bus(self):
+        await self.bus.connect()
+        self.bus_connected = True
+        await self.bus.subscribe(CHANNEL_COMMANDS, self.on_bus_command)
+        await self.bus.subscribe(instance_channel(self.instance_id), self.on_bus_command)
+        await self.bus.subscribe(CHANNEL_REGISTRY, self.on_bus_registry)
+        if self.telegram_bot:
+            await self.bus.subscribe(CHANNEL_RESPONSES, self.on_bus_response)
+        await self.publish_registry('sync_request')
+        self.logger.info(f"Instance {self.instance_id} joined the pub/sub bus")
+    
+    async def broadcast_screenshot_command(self, telegram_user_id=None):
+        _, sent_count = await self.send_command('execute_screenshot', telegram_user_id)
+        return sent_count
+    
+    async def broadcast_left_key_command(self, telegram_user_id=None):
+        _, sent_count = await self.send_command('execute_left_key', telegram_user_id, count=1)
+        return sent_count
+    
+    async def broadcast_space_key_command(self, telegram_user_id=None):
+        _, sent_count = await self.send_command('execute_space_key', telegram_user_id)
+        return sent_count
+    
+    async def broadcast_seek_cue_command(self, telegram_user_id=None, offset=-1):
+        _, sent_count = await self.send_command('execute_seek_cue', telegram_user_id, offset=offset)
         return sent_count
     
+    async def broadcast_next_subtitle_command(self, telegram_user_id=None):
+        _, sent_count = await self.send_command('execute_next_subtitle', telegram_user_id)
+        return sent_count
+    
+    def on_commands_coalesced(self, superseded, command_id):
+        self.logger.info(f"Commands {superseded} merged into {command_id}")
+        if self.telegram_bot:
+            self.telegram_bot.merge_pending_results(superseded, command_id)
+    
+    async def _send_queued(self, websocket, message, encoded):
+        await websocket.send(self.encode_for_client(websocket, message, encoded))
+    
     def get_uptime(self):
         uptime_seconds = int(time.time() - self.start_time)
         hours = uptime_seconds // 3600
@@ -235,11 +591,18 @@ class ScreenshotServer:
         self.server = await websockets.serve(
             self.register_client,
             self.host,
-            self.port
+            self.port,
+            reuse_port=self.reuse_port
         )
         
         self.logger.info(f"Screenshot server started on {self.host}:{self.port}")
         
+        if self.bus:
+            await self.start_bus()
+        
+        self.reaper_task = asyncio.create_task(self.run_heartbeat_reaper())
+        self.subtitle_task = asyncio.create_task(self.run_subtitle_refresh())
+        
         if self.telegram_bot:
             self.telegram_task = asyncio.create_task(self.telegram_bot.start())
             self.logger.info("Telegram bot started")
@@ -252,6 +615,15 @@ class ScreenshotServer:
     async def stop(self):
         self.is_running = False
         
+        if self.reaper_task:
+            self.reaper_task.cancel()
+            self.reaper_task = None
+        
+        if self.subtitle_task:
+            self.subtitle_task.cancel()
+            self.subtitle_task = None
+        await self.subtitles.close()
+        
         if self.telegram_task:
             self.telegram_task.cancel()
             try:
@@ -262,23 +634,42 @@ class ScreenshotServer:
         if self.telegram_bot:
             await self.telegram_bot.stop()
         
+        if self.bus and self.bus_connected:
+            self.bus_connected = False
+            await self.publish_registry('leave', list(self.local_client_ids))
+            await self.bus.close()
+        
         if self.server:
             self.server.close()
             await self.server.wait_closed()
         
         for client in list(self.clients):
+            self.forget_client(client)
             try:
                 await client.close()
             except:
                 pass
         
         self.clients.clear()
+        self.client_codecs.clear()
+        self.client_health.clear()
+        self.subtitle_subscriptions.clear()
+        self.local_client_ids.clear()
         self.logger.info("Server stopped")
     
-    async def handle_subtitle_response(self, telegram_user_id, subtitle_text, russian_text="", timing=""):
-        self.log_user_request(telegram_user_id, subtitle_text.replace("\n", " "), russian_text.replace("\n", " "), timing)
+    async def handle_subtitle_response(self, telegram_user_id, subtitle_text, russian_text="", timing="", command_id=None):
+        if subtitle_text:
+            self.log_user_request(telegram_user_id, subtitle_text.replace("\n", " "), russian_text.replace("\n", " "), timing)
+        if self.telegram_bot:
+            await self.telegram_bot.send_subtitle_response(telegram_user_id, subtitle_text, russian_text, timing, command_id)
+    
+    async def handle_seek_response(self, telegram_user_id, command_id, result):
+        if self.telegram_bot:
+            await self.telegram_bot.send_seek_response(telegram_user_id, command_id, result)
+    
+    async def handle_command_error(self, telegram_user_id, command_id, error):
         if self.telegram_bot:
-            await self.telegram_bot.send_subtitle_response(telegram_user_id, subtitle_text)
+            await self.telegram_bot.send_command_error(telegram_user_id, command_id, error)
     
     async def handle_key_response(self, telegram_user_id, key_type):
         if self.telegram_bot:
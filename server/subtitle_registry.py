@@ -0,0 +1,147 @@
+import time
+import bisect
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+
+import shared_path
+from shared.subtitle_fetcher import AsyncSubtitleFetcher
+from shared.subtitle_formats import detect_format
+from shared.subtitle_search import SubtitleIndex
+from shared.subtitle_track import parse_cues, pack_track, twin_url
+
+logger = logging.getLogger(__name__)
+
+
+def parse_track(text, source=None):
+    return parse_cues(text.splitlines(), detect_format(text, source))
+
+
+class SubtitleTrack:
+    def __init__(self, url, cues):
+        self.url = url
+        self.starts = [cue[0] / 1000.0 for cue in cues]
+        self.ends = [cue[1] / 1000.0 for cue in cues]
+        self.texts = [cue[2] for cue in cues]
+        self.blob = pack_track(url, cues)
+        self.hash = hashlib.blake2b(self.blob, digest_size=12).hexdigest()
+        self.index = SubtitleIndex(self.texts)
+        self.fetched_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def cue_at(self, seconds):
+        index = bisect.bisect_right(self.starts, seconds) - 1
+        if index >= 0 and seconds <= self.ends[index]:
+            return self.texts[index], self.ends[index] - seconds
+        if index + 1 < len(self.starts):
+            return None, self.starts[index + 1] - seconds
+        return None, None
+
+    def cue(self, index):
+        return round(self.starts[index] * 1000), round(self.ends[index] * 1000), self.texts[index]
+
+
+class SubtitleRegistry:
+    def __init__(self, ttl=3600.0, max_tracks=64, fetcher=None):
+        self.ttl = ttl
+        self.max_tracks = max_tracks
+        self.fetcher = fetcher or AsyncSubtitleFetcher(cache_size=max_tracks)
+        self.tracks: OrderedDict = OrderedDict()
+        self.inflight = {}
+        self.fetches = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _fresh(self, track):
+        return track is not None and time.monotonic() - track.fetched_at < self.ttl
+
+    async def get(self, url, refresh=False):
+        track = self.tracks.get(url)
+        if not refresh and self._fresh(track):
+            self.tracks.move_to_end(url)
+            self.hits += 1
+            return track
+
+        task = self.inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, track))
+            self.inflight[url] = task
+            task.add_done_callback(lambda _: self.inflight.pop(url, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url, previous):
+        self.fetches += 1
+        started = time.perf_counter()
+        try:
+            result = await self.fetcher.fetch(url)
+            if not result:
+                raise RuntimeError(f"{result.error} after {result.attempts} attempts")
+            if result.not_modified and previous is not None:
+                previous.fetched_at = time.monotonic()
+                return previous
+            track = SubtitleTrack(url, parse_track(result.text, url))
+            if not len(track):
+                raise ValueError("no cues found")
+        except Exception as e:
+            self.errors += 1
+            if previous is None:
+                raise
+            logger.warning(f"Refreshing subtitles {url} failed, keeping the cached track: {e}")
+            previous.fetched_at = time.monotonic()
+            return previous
+
+        if previous is not None and previous.hash == track.hash:
+            previous.fetched_at = track.fetched_at
+            return previous
+
+        self.tracks[url] = track
+        self.tracks.move_to_end(url)
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.popitem(last=False)
+        logger.info(f"Indexed {len(track)} cues from {url} in {(time.perf_counter() - started) * 1000:.0f} ms "
+                    f"({len(track.blob)} bytes, {track.hash})")
+        return track
+
+    async def lookup(self, url, seconds):
+        track = await self.get(url)
+        text, time_to_boundary = track.cue_at(seconds)
+
+        eng_text = None
+        eng_url = twin_url(url)
+        if eng_url and text:
+            try:
+                eng_text, _ = (await self.get(eng_url)).cue_at(seconds)
+            except Exception as e:
+                logger.warning(f"English subtitles {eng_url} unavailable: {e}")
+        return text, eng_text, time_to_boundary
+
+    def search(self, query, limit=20):
+        total = 0
+        matches = []
+        for url, track in reversed(self.tracks.items()):
+            cue_ids = track.index.search(query)
+            total += len(cue_ids)
+            matches.extend((url, *track.cue(i)) for i in cue_ids[:max(limit - len(matches), 0)])
+        return total, matches
+
+    async def close(self):
+        await self.fetcher.close()
+
+    def stats(self):
+        return {
+            'tracks': len(self.tracks),
+            'cues': sum(len(track) for track in self.tracks.values()),
+            'bytes': sum(len(track.blob) for track in self.tracks.values()),
+            'terms': sum(len(track.index.postings) for track in self.tracks.values()),
+            'fetches': self.fetches,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'http': self.fetcher.stats()
+        }
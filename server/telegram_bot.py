@@ -3,17 +3,60 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter, parse_limits
+from telegram_sender import TelegramSender
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MAX_MESSAGE_LENGTH = 4096
+RESULT_EXPIRY_CHECK = 5
+FIND_LIMIT = 20
+MAX_ANSWERED_TARGETS = 1024
+
+BUTTON_COMMANDS = {
+    'take_screenshot': ('execute_screenshot', "📸 Скриншот запрошен", {}),
+    'press_space': ('execute_space_key', "⏯️ Пауза/воспроизведение", {}),
+    'press_left': ('execute_left_key', "⏪ Назад", {'count': 1}),
+    'next_subtitle': ('execute_next_subtitle', "⏭ Следующие субтитры", {}),
+    'prev_cue': ('execute_seek_cue', "⏮ Предыдущая реплика", {'offset': -1}),
+    'next_cue': ('execute_seek_cue', "⏩ Следующая реплика", {'offset': 1})
+}
+
+RESULT_COMMANDS = {'execute_screenshot', 'execute_seek_cue'}
+DEDUP_COMMANDS = {'execute_screenshot'}
+
 class ScreenshotTelegramBot:
     def __init__(self, screenshot_server):
         self.screenshot_server = screenshot_server
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+        self.api_base_url = os.getenv('TELEGRAM_API_BASE_URL')
+        self.webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL')
+        self.webhook_path = os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram/webhook')
+        self.webhook_secret = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+        self.webhook_host = os.getenv('TELEGRAM_WEBHOOK_HOST', '0.0.0.0')
+        self.webhook_port = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8080'))
+        self.edit_interval = float(os.getenv('TELEGRAM_EDIT_INTERVAL', '1.0'))
+        self.edits_per_second = float(os.getenv('TELEGRAM_EDITS_PER_SECOND', '25'))
+        self.sender_workers = int(os.getenv('TELEGRAM_SENDER_WORKERS', '4'))
+        self.result_timeout = float(os.getenv('TELEGRAM_RESULT_TIMEOUT', '60'))
         self.application = None
+        self.webhook_receiver = None
+        self.sender = None
+        self.expirer_task = None
+        self.pending_results = {}
+        self.command_aliases = {}
+        self.answered_targets = OrderedDict()
+        self.inflight_commands = {}
+        self.collapsed_commands = 0
+        self.dedup_window = float(os.getenv('TELEGRAM_DEDUP_WINDOW', '3.0'))
+        self.rate_limiter = RateLimiter(parse_limits(os.getenv('TELEGRAM_RATE_LIMITS')))
+        self.stopped = asyncio.Event()
         
         if not self.bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
@@ -24,6 +67,10 @@ class ScreenshotTelegramBot:
                 InlineKeyboardButton("⏪", callback_data='press_left'),
                 InlineKeyboardButton("⏯️", callback_data='press_space'),
                 InlineKeyboardButton("📸", callback_data='take_screenshot')
+            ],
+            [
+                InlineKeyboardButton("⏮", callback_data='prev_cue'),
+                InlineKeyboardButton("⏩", callback_data='next_cue')
             ]
         ]
     
@@ -47,179 +94,297 @@ class ScreenshotTelegramBot:
         logger.info(f"Next command received from user {update.effective_user.id}")
         await self.handle_next_subtitle(update, context)
     
-
+    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        logger.info(f"Status command received from user {update.effective_user.id}")
+        await update.message.reply_text(self._format_status(self.screenshot_server.get_status()))
+    
+    async def find_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        query = " ".join(context.args or [])
+        logger.info(f"Find command received from user {update.effective_user.id}: {query!r}")
+        
+        if not query:
+            await update.message.reply_text("🔎 Использование: /find <слова из реплики>")
+            return
+        
+        registry = self.screenshot_server.subtitles
+        if not registry.tracks:
+            await update.message.reply_text("📭 На сервере нет загруженных субтитров: ни один клиент еще не сообщил свои дорожки")
+            return
+        
+        started = time.perf_counter()
+        total, matches = registry.search(query, limit=FIND_LIMIT)
+        logger.info(f"Found {total} cues for {query!r} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        await update.message.reply_text(self._format_matches(query, total, matches)[:MAX_MESSAGE_LENGTH])
+    
+    def _format_matches(self, query, total, matches):
+        if not matches:
+            return f"🔎 «{query}»: ничего не найдено в загруженных субтитрах"
+        
+        lines = [f"🔎 «{query}»: найдено {total}"]
+        for url, start_ms, end_ms, text in matches:
+            episode = os.path.basename(urlparse(url).path) or url
+            clock = f"{start_ms // 3600000:02d}:{start_ms // 60000 % 60:02d}:{start_ms // 1000 % 60:02d}.{start_ms % 1000:03d}"
+            text = text.replace("\n", " ")
+            lines.append(f"• {episode} ⏱ {clock} ({start_ms}–{end_ms} ms)\n  {text}")
+        if total > len(matches):
+            lines.append(f"... и еще {total - len(matches)}")
+        return "\n".join(lines)
+    
+    def _format_status(self, status, max_clients=20):
+        lines = [
+            "📊 Статус сервера",
+            f"Аптайм: {status['uptime']}",
+            f"Клиентов: {status['clients']}",
+            f"Отключено по таймауту heartbeat: {status['reaped_clients']}"
+        ]
+        
+        if status.get('remote_clients'):
+            lines.append(f"Инстанс {status['instance_id']}, клиентов на других инстансах: {status['remote_clients']}")
+        
+        queues = status.get('queues')
+        if queues:
+            lines.append(
+                f"Очереди: в ожидании {queues.get('depth', 0)}, макс. глубина {queues.get('max_depth', 0)}, "
+                f"объединено {queues.get('coalesced', 0)}, отброшено {queues.get('dropped', 0)}"
+            )
+        
+        telegram = status.get('telegram')
+        if telegram:
+            lines.append(
+                f"Бот: отклонено лимитом {telegram['rejected']}, объединено повторных запросов {telegram['collapsed']}, "
+                f"ждут ответа {telegram['pending_results']}"
+            )
+            sender = telegram.get('sender')
+            if sender:
+                lines.append(
+                    f"Отправка: в очереди {sender['queued']}, отправлено {sender['sent']}, объединено {sender['coalesced']}, "
+                    f"flood wait {sender['flood_waits']}, ошибок {sender['failed']}"
+                )
+        
+        subtitles = status.get('subtitles')
+        if subtitles and subtitles['tracks']:
+            lines.append(
+                f"Субтитры: дорожек {subtitles['tracks']} ({subtitles['cues']} реплик), подписчиков {subtitles['subscribers']}, "
+                f"загрузок {subtitles['fetches']}, из кэша {subtitles['hits']}, ошибок {subtitles['errors']}, "
+                f"слов в индексе {subtitles.get('terms', 0)}"
+            )
+        
+        clients = sorted(status['client_health'], key=lambda c: c['idle_seconds'], reverse=True)
+        if clients:
+            lines.append("")
+        for client in clients[:max_clients]:
+            rtt = f"{client['rtt_ms']:.0f} ms" if client['rtt_ms'] is not None else "n/a"
+            lines.append(
+                f"• {client['client_id']}: RTT {rtt}, пропущено {client['missed_heartbeats']}, "
+                f"очередь {client['queue_depth']}, активность {client['idle_seconds']:.0f}с назад"
+            )
+        if len(clients) > max_clients:
+            lines.append(f"... и еще {len(clients) - max_clients}")
+        
+        return "\n".join(lines)
+    
+    
     
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         logger.info(f"Button callback received: {query.data} from user {update.effective_user.id}")
-        await query.answer()
         
-        if query.data == 'take_screenshot':
-            await self.take_screenshot(update, context)
-        elif query.data == 'press_space':
-            await self.press_space(update, context)
-        elif query.data == 'press_left':
-            await self.press_left(update, context)
-
+        if query.data in BUTTON_COMMANDS:
+            await self.dispatch_command(update, query.data)
+        else:
+            await self._answer(query)
     
     async def take_screenshot(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        try:
-            telegram_user_id = update.effective_user.id
-            await self.screenshot_server.broadcast_screenshot_command(telegram_user_id)
-            
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = "🎬 Выберите действие"
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        message,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("✅ Выполнено!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=reply_markup
-                )
-            
-            logger.info(f"Screenshot command sent via Telegram by user {update.effective_user.id}")
-        
-        except Exception as e:
-            error_msg = f"❌ Ошибка: {str(e)}"
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        error_msg,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("❌ Ошибка!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    error_msg,
-                    reply_markup=reply_markup
-                )
-            logger.error(f"Telegram bot error: {e}")
+        await self.dispatch_command(update, 'take_screenshot')
     
     async def press_space(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        try:
-            telegram_user_id = update.effective_user.id
-            await self.screenshot_server.broadcast_space_key_command(telegram_user_id)
-            
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = "🎬 Выберите действие"
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        message,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("✅ Выполнено!")
-                    else:
-                        raise edit_error
+        await self.dispatch_command(update, 'press_space')
+    
+    async def press_left(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.dispatch_command(update, 'press_left')
+    
+    async def handle_next_subtitle(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.dispatch_command(update, 'next_subtitle')
+    
+    async def dispatch_command(self, update: Update, action):
+        command_type, ack_text, fields = BUTTON_COMMANDS[action]
+        telegram_user_id = update.effective_user.id
+        query = update.callback_query
+        
+        retry_after = self.rate_limiter.check(telegram_user_id, command_type)
+        if retry_after:
+            logger.info(f"Rate limited {command_type} from user {telegram_user_id}, retry in {retry_after:.1f}s")
+            text = f"⏳ Слишком часто, повторите через {max(1, round(retry_after))} с"
+            if query:
+                await self._answer(query, text)
             else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=reply_markup
-                )
-            
-            logger.info(f"Space key command sent via Telegram by user {update.effective_user.id}")
+                await update.message.reply_text(text)
+            return
+        
+        if query:
+            await self._answer(query, ack_text)
+        
+        dedup_key = (command_type, tuple(sorted(fields.items())))
+        if command_type in DEDUP_COMMANDS and await self._join_inflight(dedup_key, update):
+            return
         
+        try:
+            command_id, sent_count = await self.screenshot_server.send_command(command_type, telegram_user_id, **fields)
         except Exception as e:
-            error_msg = f"❌ Ошибка: {str(e)}"
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        error_msg,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("❌ Ошибка!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    error_msg,
-                    reply_markup=reply_markup
-                )
             logger.error(f"Telegram bot error: {e}")
+            await self._reply(update, f"❌ Ошибка: {str(e)}")
+            return
+        
+        if not sent_count:
+            await self._reply(update, "❌ Нет подключенных клиентов")
+            return
+        
+        logger.info(f"{command_type} command {command_id} sent via Telegram by user {telegram_user_id}")
+        if command_type in RESULT_COMMANDS:
+            pending = self.pending_results.setdefault(command_id, {'targets': [], 'results': []})
+            pending['created'] = time.monotonic()
+            target = await self._result_target(update)
+            if target not in pending['targets']:
+                pending['targets'].append(target)
+            if pending['results']:
+                self._edit_targets(pending)
+            if command_type in DEDUP_COMMANDS:
+                self.inflight_commands[dedup_key] = command_id
     
-    async def press_left(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        try:
-            telegram_user_id = update.effective_user.id
-            await self.screenshot_server.broadcast_left_key_command(telegram_user_id)
-            
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = "🎬 Выберите действие"
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        message,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("✅ Выполнено!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=reply_markup
-                )
-            
-            logger.info(f"Left key command sent via Telegram by user {update.effective_user.id}")
+    async def _join_inflight(self, dedup_key, update):
+        command_id = self.inflight_commands.get(dedup_key)
+        pending = self.pending_results.get(command_id)
+        if not pending or pending['results'] or time.monotonic() - pending['created'] > self.dedup_window:
+            self.inflight_commands.pop(dedup_key, None)
+            return False
         
+        target = await self._result_target(update)
+        if target not in pending['targets']:
+            pending['targets'].append(target)
+        self.collapsed_commands += 1
+        logger.info(f"Collapsed {dedup_key[0]} from user {update.effective_user.id} into in-flight command {command_id}")
+        return True
+    
+    async def _answer(self, query, text=None):
+        try:
+            await query.answer(text)
         except Exception as e:
-            error_msg = f"❌ Ошибка: {str(e)}"
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        error_msg,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("❌ Ошибка!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    error_msg,
-                    reply_markup=reply_markup
-                )
-            logger.error(f"Telegram bot error: {e}")
+            logger.warning(f"Failed to answer callback query: {e}")
+    
+    async def _reply(self, update, text):
+        if update.callback_query:
+            message = update.callback_query.message
+            self.queue_edit(message.chat_id, message.message_id, text)
+        else:
+            await update.message.reply_text(text, reply_markup=InlineKeyboardMarkup(self._create_keyboard()))
+    
+    async def _result_target(self, update):
+        if update.callback_query:
+            message = update.callback_query.message
+        else:
+            message = await update.message.reply_text(
+                "⏳ Делаю скриншот...",
+                reply_markup=InlineKeyboardMarkup(self._create_keyboard())
+            )
+        return message.chat_id, message.message_id
+    
+    def _format_subtitle(self, subtitle_text, russian_text, timing):
+        lines = []
+        if subtitle_text and subtitle_text != russian_text:
+            lines.append(f"🇬🇧 {subtitle_text}")
+        if russian_text:
+            lines.append(f"🇷🇺 {russian_text}")
+        if not lines:
+            lines.append("🤷 Субтитр не найден")
+        if timing:
+            lines.append(f"⏱ {timing}")
+        return "\n".join(lines)
+    
+    def merge_pending_results(self, superseded, command_id):
+        merged = self.pending_results.get(command_id)
+        for old_id in superseded:
+            self.command_aliases[old_id] = command_id
+            pending = self.pending_results.pop(old_id, None)
+            if not pending:
+                continue
+            if merged is None:
+                merged = self.pending_results[command_id] = pending
+                continue
+            merged['created'] = max(merged['created'], pending['created'])
+            merged['targets'] += [target for target in pending['targets'] if target not in merged['targets']]
+            merged['results'] += [result for result in pending['results'] if result not in merged['results']]
+        for dedup_key, inflight_id in self.inflight_commands.items():
+            if inflight_id in superseded:
+                self.inflight_commands[dedup_key] = command_id
+    
+    def _push_result(self, command_id, text):
+        command_id = self.command_aliases.get(command_id, command_id)
+        pending = self.pending_results.get(command_id)
+        if not pending:
+            logger.info(f"Dropping result for unknown or expired command {command_id}")
+            return
+        if text not in pending['results']:
+            pending['results'].append(text)
+        self._edit_targets(pending)
+    
+    def _edit_targets(self, pending):
+        for target in pending['targets']:
+            self.answered_targets[target] = True
+            self.answered_targets.move_to_end(target)
+            self.queue_edit(*target, "\n\n".join(pending['results']))
+        while len(self.answered_targets) > MAX_ANSWERED_TARGETS:
+            self.answered_targets.popitem(last=False)
     
-    async def send_subtitle_response(self, telegram_user_id, subtitle_text):
-        logger.info(f"Subtitle response logged for user {telegram_user_id}: {subtitle_text}")
+    def queue_edit(self, chat_id, message_id, text):
+        if self.sender:
+            self.sender.edit_message(chat_id, message_id, text[:MAX_MESSAGE_LENGTH],
+                                     reply_markup=InlineKeyboardMarkup(self._create_keyboard()))
+    
+    def expire_pending_results(self):
+        deadline = time.monotonic() - self.result_timeout
+        for command_id, pending in list(self.pending_results.items()):
+            if pending['created'] < deadline:
+                del self.pending_results[command_id]
+                if not pending['results']:
+                    for target in pending['targets']:
+                        if target not in self.answered_targets:
+                            self.queue_edit(*target, "⌛ Клиенты не ответили")
+        for dedup_key, command_id in list(self.inflight_commands.items()):
+            if command_id not in self.pending_results:
+                del self.inflight_commands[dedup_key]
+        for old_id, command_id in list(self.command_aliases.items()):
+            if command_id not in self.pending_results:
+                del self.command_aliases[old_id]
+    
+    def get_stats(self):
+        stats = self.rate_limiter.stats()
+        stats.update({
+            'collapsed': self.collapsed_commands,
+            'pending_results': len(self.pending_results),
+            'sender': self.sender.stats() if self.sender else None
+        })
+        return stats
+    
+    async def run_result_expirer(self):
+        while True:
+            await asyncio.sleep(min(RESULT_EXPIRY_CHECK, self.result_timeout))
+            self.expire_pending_results()
+    
+    async def send_subtitle_response(self, telegram_user_id, subtitle_text, russian_text="", timing="", command_id=None):
+        logger.info(f"Subtitle response for user {telegram_user_id}: {subtitle_text}")
+        self._push_result(command_id, self._format_subtitle(subtitle_text, russian_text, timing))
+    
+    async def send_seek_response(self, telegram_user_id, command_id, result):
+        logger.info(f"Seek response for user {telegram_user_id}: {result}")
+        steps = result.get('steps', 0)
+        lines = [f"🎯 {result.get('timing', '?')} → {result.get('target_timing', '?')} (шагов: {abs(steps)})"]
+        if result.get('subtitle_text'):
+            lines.append(f"💬 {result['subtitle_text']}")
+        self._push_result(command_id, "\n".join(lines))
+    
+    async def send_command_error(self, telegram_user_id, command_id, error):
+        logger.info(f"Command {command_id} failed for user {telegram_user_id}: {error}")
+        self._push_result(command_id, f"❌ Ошибка: {error}")
     
     async def send_key_response(self, telegram_user_id, key_type):
         logger.info(f"Key response logged for user {telegram_user_id}: {key_type}")
@@ -227,87 +392,82 @@ class ScreenshotTelegramBot:
     async def send_next_subtitle_response(self, telegram_user_id, result):
         logger.info(f"Next subtitle response logged for user {telegram_user_id}: {result}")
     
-    async def handle_next_subtitle(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        try:
-            telegram_user_id = update.effective_user.id
-            await self.screenshot_server.broadcast_next_subtitle_command(telegram_user_id)
-            
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = "🎬 Выберите действие"
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        message,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("✅ Выполнено!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    message,
-                    reply_markup=reply_markup
-                )
-            
-            logger.info(f"Next subtitle command sent via Telegram by user {update.effective_user.id}")
-        
-        except Exception as e:
-            error_msg = f"❌ Ошибка: {str(e)}"
-            keyboard = self._create_keyboard()
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(update, 'callback_query'):
-                try:
-                    await update.callback_query.edit_message_text(
-                        error_msg,
-                        reply_markup=reply_markup
-                    )
-                except Exception as edit_error:
-                    if "Message is not modified" in str(edit_error):
-                        await update.callback_query.answer("❌ Ошибка!")
-                    else:
-                        raise edit_error
-            else:
-                await update.message.reply_text(
-                    error_msg,
-                    reply_markup=reply_markup
-                )
-            logger.error(f"Telegram bot error: {e}")
-    
     async def start(self):
         if not self.bot_token:
             logger.error("Telegram bot token not configured")
             return
         
         logger.info(f"Initializing Telegram bot with token: {self.bot_token[:10]}...")
-        self.application = Application.builder().token(self.bot_token).build()
+        builder = Application.builder().token(self.bot_token)
+        if self.api_base_url:
+            builder = builder.base_url(self.api_base_url)
+        self.application = builder.build()
         
         self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("pause", self.pause_command))
-        self.application.add_handler(CommandHandler("next", self.next_command))
-        self.application.add_handler(CallbackQueryHandler(self.button_callback))
+        self.application.add_handler(CommandHandler("pause", self.pause_command, block=False))
+        self.application.add_handler(CommandHandler("next", self.next_command, block=False))
+        self.application.add_handler(CommandHandler("status", self.status_command))
+        self.application.add_handler(CommandHandler("find", self.find_command))
+        self.application.add_handler(CallbackQueryHandler(self.button_callback, block=False))
         
         logger.info("Starting Telegram bot...")
         await self.application.initialize()
         await self.application.start()
-        await self.application.updater.start_polling()
+        self.sender = TelegramSender(
+            self.application.bot,
+            workers=self.sender_workers,
+            chat_interval=self.edit_interval,
+            rate=self.edits_per_second
+        )
+        self.sender.start()
+        self.expirer_task = asyncio.create_task(self.run_result_expirer())
+        
+        if self.webhook_url:
+            await self.start_webhook()
+        else:
+            await self.application.updater.start_polling()
         logger.info("Telegram bot started successfully")
         
         # Keep the bot running
         try:
-            await self.application.updater.idle()
+            await self.stopped.wait()
         except asyncio.CancelledError:
             pass
     
+    async def start_webhook(self):
+        from telegram_webhook import TelegramWebhookReceiver
+        
+        self.webhook_receiver = TelegramWebhookReceiver(
+            self.application,
+            path=self.webhook_path,
+            secret_token=self.webhook_secret,
+            host=self.webhook_host,
+            port=self.webhook_port
+        )
+        await self.webhook_receiver.start()
+        
+        url = self.webhook_url.rstrip('/') + self.webhook_path
+        await self.application.bot.set_webhook(
+            url,
+            secret_token=self.webhook_secret,
+            allowed_updates=Update.ALL_TYPES
+        )
+        logger.info(f"Telegram webhook registered at {url}")
+    
     async def stop(self):
         if self.application:
             logger.info("Stopping Telegram bot...")
-            await self.application.updater.stop()
+            self.stopped.set()
+            if self.expirer_task:
+                self.expirer_task.cancel()
+                self.expirer_task = None
+            if self.webhook_receiver:
+                await self.webhook_receiver.stop()
+                self.webhook_receiver = None
+            if self.application.updater.running:
+                await self.application.updater.stop()
+            if self.sender:
+                await self.sender.stop()
             await self.application.stop()
             await self.application.shutdown()
             logger.info("Telegram bot stopped") 
\ No newline at end of file
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundMessage:
+    def __init__(self, kind, chat_id, text, message_id=None, reply_markup=None):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = message_id
+        self.reply_markup = reply_markup
+        self.attempts = 0
+
+
+class TelegramSender:
+    def __init__(self, bot, workers=4, chat_interval=1.0, rate=25.0, max_retries=3, max_backoff=30.0):
+        self.bot = bot
+        self.workers = workers
+        self.chat_interval = chat_interval
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(max(1, int(rate)), rate)
+        self.chats = {}
+        self.not_before = {}
+        self.scheduled = set()
+        self.ready = asyncio.Queue()
+        self.tasks = []
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.flood_waits = 0
+        self.failed = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def edit_message(self, chat_id, message_id, text, reply_markup=None):
+        messages = self.chats.setdefault(chat_id, deque())
+        for message in messages:
+            if message.kind == 'edit' and message.message_id == message_id:
+                message.text = text
+                message.reply_markup = reply_markup
+                self.coalesced += 1
+                return
+        messages.append(OutboundMessage('edit', chat_id, text, message_id, reply_markup))
+        self._schedule(chat_id)
+
+    def send_message(self, chat_id, text, reply_markup=None):
+        self.chats.setdefault(chat_id, deque()).append(OutboundMessage('send', chat_id, text, reply_markup=reply_markup))
+        self._schedule(chat_id)
+
+    def _schedule(self, chat_id, delay=0):
+        if chat_id in self.scheduled:
+            return
+        self.scheduled.add(chat_id)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.ready.put_nowait, chat_id)
+        else:
+            self.ready.put_nowait(chat_id)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self.ready.get()
+            delay = self.not_before.get(chat_id, 0) - time.monotonic()
+            if delay > 0:
+                self.scheduled.discard(chat_id)
+                self._schedule(chat_id, delay)
+                continue
+
+            messages = self.chats.get(chat_id)
+            if messages:
+                while True:
+                    wait = self.bucket.take(time.monotonic())
+                    if not wait:
+                        break
+                    await asyncio.sleep(wait)
+                await self._deliver(messages.popleft())
+                self.not_before[chat_id] = max(self.not_before.get(chat_id, 0), time.monotonic() + self.chat_interval)
+
+            self.scheduled.discard(chat_id)
+            if self.chats.get(chat_id):
+                self._schedule(chat_id, self.not_before.get(chat_id, 0) - time.monotonic())
+            else:
+                self.chats.pop(chat_id, None)
+                self._prune_not_before()
+
+    def _prune_not_before(self):
+        if len(self.not_before) <= 1000:
+            return
+        now = time.monotonic()
+        for chat_id, until in list(self.not_before.items()):
+            if until <= now:
+                del self.not_before[chat_id]
+
+    async def _deliver(self, message):
+        try:
+            if message.kind == 'edit':
+                await self.bot.edit_message_text(
+                    message.text,
+                    chat_id=message.chat_id,
+                    message_id=message.message_id,
+                    reply_markup=message.reply_markup
+                )
+            else:
+                await self.bot.send_message(message.chat_id, message.text, reply_markup=message.reply_markup)
+            self.sent += 1
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else float(e.retry_after)
+            self.flood_waits += 1
+            logger.warning(f"Flood control for chat {message.chat_id}, retrying in {retry_after:.0f}s")
+            self._retry(message, retry_after)
+        except BadRequest as e:
+            if "Message is not modified" not in str(e):
+                self.failed += 1
+                logger.error(f"Failed to {message.kind} message in chat {message.chat_id}: {e}")
+        except (TimedOut, NetworkError) as e:
+            message.attempts += 1
+            if message.attempts > self.max_retries:
+                self.failed += 1
+                logger.error(f"Giving up on {message.kind} in chat {message.chat_id} after {message.attempts} attempts: {e}")
+                return
+            backoff = min(self.max_backoff, 0.5 * 2 ** message.attempts) * random.uniform(0.5, 1.5)
+            logger.warning(f"Network error for chat {message.chat_id}, retrying in {backoff:.1f}s: {e}")
+            self._retry(message, backoff)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Failed to {message.kind} message in chat {message.chat_id}: {e}")
+
+    def _retry(self, message, delay):
+        self.retried += 1
+        self.not_before[message.chat_id] = time.monotonic() + delay
+        messages = self.chats.setdefault(message.chat_id, deque())
+        if message.kind == 'edit' and any(m.kind == 'edit' and m.message_id == message.message_id for m in messages):
+            self.coalesced += 1
+            return
+        messages.appendleft(message)
+
+    def stats(self):
+        return {
+            'queued': sum(len(messages) for messages in self.chats.values()),
+            'chats': len(self.chats),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retried': self.retried,
+            'flood_waits': self.flood_waits,
+            'failed': self.failed
+        }
@@ -0,0 +1,56 @@
+import logging
+from aiohttp import web
+from telegram import Update
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramWebhookReceiver:
+    def __init__(self, application, path='/telegram/webhook', secret_token=None, host='0.0.0.0', port=8080):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.updates_received = 0
+        self.updates_rejected = 0
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Telegram webhook receiver listening on {self.host}:{self.port}{self.path}")
+
+    async def handle_update(self, request):
+        if self.secret_token and request.headers.get(SECRET_HEADER) != self.secret_token:
+            self.updates_rejected += 1
+            logger.warning(f"Rejected webhook request from {request.remote}: bad secret token")
+            return web.Response(status=403)
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            self.updates_rejected += 1
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        self.updates_received += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def stop(self):
+        if self.runner:
+            try:
+                await self.application.bot.delete_webhook()
+                logger.info("Telegram webhook removed")
+            except Exception as e:
+                logger.warning(f"Failed to remove Telegram webhook: {e}")
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,201 @@
+import json
+import zlib
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROTOCOL_JSON = 'json'
+PROTOCOL_MSGPACK = 'msgpack'
+PROTOCOL_VERSION = 1
+
+FLAG_DEFLATE = 0x01
+DEFLATE_MIN_SIZE = 256
+
+# Codes are positional: append new entries, never reorder or remove.
+MESSAGE_TYPES = [
+    'connection_established',
+    'protocol_select',
+    'protocol_selected',
+    'heartbeat',
+    'heartbeat_ack',
+    'execute_screenshot',
+    'execute_left_key',
+    'execute_space_key',
+    'execute_next_subtitle',
+    'screenshot_completed',
+    'screenshot_error',
+    'left_key_completed',
+    'left_key_error',
+    'space_key_completed',
+    'space_key_error',
+    'next_subtitle_completed',
+    'next_subtitle_error',
+    'client_hello',
+    'execute_seek_cue',
+    'seek_cue_completed',
+    'seek_cue_error',
+    'subtitle_subscribe',
+    'subtitle_track',
+    'subtitle_lookup',
+    'subtitle_cue',
+    'subtitle_announce',
+]
+
+FIELDS = [
+    'type',
+    'timestamp',
+    'command_id',
+    'telegram_user_id',
+    'client_id',
+    'result',
+    'timing',
+    'subtitle_text',
+    'russian_text',
+    'error',
+    'mouse_position',
+    'x',
+    'y',
+    'saved_filepath',
+    'crop_size',
+    'new_url',
+    'old_url',
+    'eng_url',
+    'protocol',
+    'protocols',
+    'protocol_version',
+    'deflate',
+    'heartbeat_id',
+    'rtt_ms',
+    'count',
+    'offset',
+    'steps',
+    'target_timing',
+    'url',
+    'urls',
+    'hash',
+    'hashes',
+    'blob',
+    'position',
+    'request_id',
+    'time_to_boundary',
+]
+
+TIMESTAMP_FIELDS = {'timestamp'}
+
+_TYPE_CODES = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+_FIELD_CODES = {name: code for code, name in enumerate(FIELDS)}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def supported_protocols():
+    if msgpack is None:
+        return [PROTOCOL_JSON]
+    return [PROTOCOL_MSGPACK, PROTOCOL_JSON]
+
+
+def negotiate_protocol(offered, preferred=None):
+    local = supported_protocols()
+    if preferred:
+        return preferred if preferred in local and preferred in offered else PROTOCOL_JSON
+    for protocol in local:
+        if protocol in offered:
+            return protocol
+    return PROTOCOL_JSON
+
+
+def _compact(value, key=None):
+    if isinstance(value, dict):
+        return {_FIELD_CODES.get(k, k): _compact(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    if key == 'type' and value in _TYPE_CODES:
+        return _TYPE_CODES[value]
+    if key in TIMESTAMP_FIELDS and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return value
+    return value
+
+
+def _expand(value, key=None):
+    if isinstance(value, dict):
+        expanded = {}
+        for k, v in value.items():
+            name = FIELDS[k] if isinstance(k, int) and 0 <= k < len(FIELDS) else k
+            expanded[name] = _expand(v, name)
+        return expanded
+    if isinstance(value, list):
+        return [_expand(v) for v in value]
+    if key == 'type' and isinstance(value, int):
+        if not 0 <= value < len(MESSAGE_TYPES):
+            raise ProtocolError(f"Unknown message type code: {value}")
+        return MESSAGE_TYPES[value]
+    if key in TIMESTAMP_FIELDS and isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).isoformat()
+    return value
+
+
+class WireCodec:
+    def __init__(self, protocol=PROTOCOL_JSON, deflate=False):
+        if protocol == PROTOCOL_MSGPACK and msgpack is None:
+            raise ProtocolError("msgpack is not installed")
+        if protocol not in (PROTOCOL_JSON, PROTOCOL_MSGPACK):
+            raise ProtocolError(f"Unknown protocol: {protocol}")
+        self.protocol = protocol
+        self.deflate = deflate and protocol != PROTOCOL_JSON
+
+    @property
+    def key(self):
+        return (self.protocol, self.deflate)
+
+    def encode(self, message):
+        if self.protocol == PROTOCOL_JSON:
+            return json.dumps(message)
+
+        payload = msgpack.packb(_compact(message), use_bin_type=True)
+        flags = 0
+        if self.deflate and len(payload) >= DEFLATE_MIN_SIZE:
+            compressed = zlib.compress(payload, 6)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= FLAG_DEFLATE
+        return bytes((PROTOCOL_VERSION, flags)) + payload
+
+    @staticmethod
+    def decode(message):
+        if isinstance(message, str):
+            try:
+                return json.loads(message)
+            except json.JSONDecodeError as e:
+                raise ProtocolError(f"Invalid JSON message: {e}") from e
+
+        if msgpack is None:
+            raise ProtocolError("Binary message received but msgpack is not installed")
+        if len(message) < 2:
+            raise ProtocolError("Binary message too short")
+
+        version, flags = message[0], message[1]
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"Unsupported binary protocol version: {version}")
+
+        payload = bytes(message[2:])
+        try:
+            if flags & FLAG_DEFLATE:
+                payload = zlib.decompress(payload)
+            data = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        except (zlib.error, ValueError, msgpack.UnpackException) as e:
+            raise ProtocolError(f"Invalid binary message: {e}") from e
+
+        if not isinstance(data, dict):
+            raise ProtocolError("Binary message is not a map")
+        return _expand(data)
+
+    def __repr__(self):
+        return f"WireCodec({self.protocol!r}, deflate={self.deflate})"
@@ -0,0 +1,226 @@
+import re
+import time
+import random
+import asyncio
+import threading
+from collections import OrderedDict
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+FALLBACK_ENCODINGS = ('utf-8-sig', 'cp1251')
+CHARSET_PATTERN = re.compile(r'charset="?([\w.:-]+)', re.IGNORECASE)
+
+
+class FetchResult:
+    def __init__(self, url, status=None, content=None, charset=None, etag=None, last_modified=None,
+                 not_modified=False, error=None, attempts=0, elapsed=0.0):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.charset = charset
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+        self.error = error
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None and self.content is not None
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def text(self):
+        if self.content is None:
+            return None
+        declared = self.charset.lower() if self.charset else None
+        encodings = FALLBACK_ENCODINGS
+        if declared not in (None, 'iso-8859-1', 'latin-1'):
+            encodings = (declared,) + encodings
+        for encoding in encodings:
+            try:
+                return self.content.decode('utf-8-sig' if encoding in ('utf-8', 'utf8') else encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
+        return self.content.decode('latin-1')
+
+    def __repr__(self):
+        state = 'not modified' if self.not_modified else self.error or f"{len(self.content)} bytes"
+        return f"FetchResult({self.url!r}, {self.status}, {state}, attempts={self.attempts})"
+
+
+class _FetcherBase:
+    def __init__(self, timeout=10.0, connect_timeout=3.0, retries=3, backoff=0.25, max_backoff=4.0, pool_size=8,
+                 cache_size=32):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def _prepare(self, url):
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        with self.lock:
+            cached = self.cache.get(url)
+        if cached:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        return headers, cached
+
+    def _delay(self, attempt, retry_after=None):
+        try:
+            if retry_after is not None:
+                return min(self.max_backoff, float(retry_after))
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _complete(self, url, cached, status, headers, content, attempts, started):
+        elapsed = time.perf_counter() - started
+        if status == 304 and cached:
+            self.not_modified += 1
+            return FetchResult(url, status, cached.content, cached.charset, cached.etag, cached.last_modified,
+                               not_modified=True, attempts=attempts, elapsed=elapsed)
+        if not 200 <= status < 300:
+            return self._failed(url, status, f"HTTP {status}", attempts, started)
+
+        match = CHARSET_PATTERN.search(headers.get('Content-Type', ''))
+        result = FetchResult(url, status, content, match.group(1) if match else None, headers.get('ETag'),
+                             headers.get('Last-Modified'), attempts=attempts, elapsed=elapsed)
+        if result.etag or result.last_modified:
+            with self.lock:
+                self.cache[url] = result
+                self.cache.move_to_end(url)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return result
+
+    def _failed(self, url, status, error, attempts, started):
+        self.errors += 1
+        return FetchResult(url, status, error=error, attempts=attempts, elapsed=time.perf_counter() - started)
+
+    def forget(self, url):
+        with self.lock:
+            self.cache.pop(url, None)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'retried': self.retried,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'cached': len(self.cache)
+        }
+
+
+class SubtitleFetcher(_FetcherBase):
+    def __init__(self, **kwargs):
+        if requests is None:
+            raise RuntimeError("requests is not installed")
+        super().__init__(**kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url):
+        headers, cached = self._prepare(url)
+        started = time.perf_counter()
+        status = None
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            retry_after = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=(self.connect_timeout, self.timeout))
+                status = response.status_code
+                if status not in RETRY_STATUSES or attempt == self.retries:
+                    return self._complete(url, cached, status, response.headers, response.content, attempt + 1,
+                                          started)
+                error = f"HTTP {status}"
+                retry_after = response.headers.get('Retry-After')
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.retries:
+                self.retried += 1
+                time.sleep(self._delay(attempt, retry_after))
+        return self._failed(url, status, error, self.retries + 1, started)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncSubtitleFetcher(_FetcherBase):
+    def __init__(self, **kwargs):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed")
+        super().__init__(**kwargs)
+        self.session = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.timeout)
+            )
+        return self.session
+
+    async def fetch(self, url):
+        headers, cached = self._prepare(url)
+        started = time.perf_counter()
+        status = None
+        for attempt in range(self.retries + 1):
+            self.requests += 1
+            retry_after = None
+            try:
+                async with self._session().get(url, headers=headers) as response:
+                    status = response.status
+                    if status not in RETRY_STATUSES or attempt == self.retries:
+                        return self._complete(url, cached, status, response.headers, await response.read(),
+                                              attempt + 1, started)
+                    error = f"HTTP {status}"
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(self._delay(attempt, retry_after))
+        return self._failed(url, status, error, self.retries + 1, started)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
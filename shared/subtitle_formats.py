@@ -0,0 +1,234 @@
+import os
+import re
+import html
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+
+SNIFF_SIZE = 4096
+TTML_PARAMETER_NS = '{http://www.w3.org/ns/ttml#parameter}'
+
+VTT_TIMING = re.compile(
+    r'(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})'
+)
+SRT_SNIFF = re.compile(r'\d+:\d{2}:\d{2},\d{1,3}\s*-->')
+SRT_TIMING = re.compile(r'(\d+):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})')
+MARKUP = re.compile(r'<[^>]*>|\{[^}]*\}')
+ASS_OVERRIDE = re.compile(r'\{[^}]*\}')
+ASS_DRAWING = re.compile(r'\\p[1-9]')
+ASS_TIME = re.compile(r'(\d+):(\d{2}):(\d{2})[.:](\d{1,3})')
+TTML_CLOCK = re.compile(r'(\d+):(\d{2}):(\d{2})(?:\.(\d+)|:(\d+(?:\.\d+)?))?$')
+TTML_OFFSET = re.compile(r'(\d+(?:\.\d+)?)(h|ms|m|s|f|t)$')
+WHITESPACE = re.compile(r'\s+')
+
+FORMATS = {}
+
+
+class SubtitleFormat:
+    def __init__(self, name, extensions, parse, sniff):
+        self.name = name
+        self.extensions = extensions
+        self.parse = parse
+        self.sniff = sniff
+
+    def __repr__(self):
+        return f"SubtitleFormat({self.name!r})"
+
+
+def register_format(name, extensions=(), sniff=None):
+    def decorator(parse):
+        FORMATS[name] = SubtitleFormat(name, tuple(extensions), parse, sniff)
+        return parse
+    return decorator
+
+
+def detect_format(sample, source=None):
+    if source:
+        extension = os.path.splitext(urlparse(source).path)[1].lower()
+        for subtitle_format in FORMATS.values():
+            if extension in subtitle_format.extensions:
+                return subtitle_format.name
+
+    head = sample[:SNIFF_SIZE].lstrip('\ufeff \r\n\t')
+    for subtitle_format in FORMATS.values():
+        if subtitle_format.sniff and subtitle_format.sniff(head):
+            return subtitle_format.name
+    return None
+
+
+def _fraction_ms(digits):
+    return int((digits + '00')[:3]) if digits else 0
+
+
+def _clock_ms(hours, minutes, seconds, fraction):
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + _fraction_ms(fraction)
+
+
+def strip_markup(text):
+    if '<' in text or '{' in text:
+        text = MARKUP.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+
+def _cue_text(lines):
+    return '\n'.join(line for line in (line.strip() for line in lines) if line)
+
+
+@register_format('vtt', extensions=('.vtt',), sniff=lambda head: head.startswith('WEBVTT'))
+def parse_vtt(lines):
+    timing = None
+    text = []
+    for line in lines:
+        line = line.strip()
+        if timing is not None:
+            if line:
+                text.append(line)
+                continue
+            if text:
+                yield timing[0], timing[1], '\n'.join(text)
+            timing = None
+            text = []
+            continue
+
+        match = VTT_TIMING.search(line) if '-->' in line else None
+        if match:
+            groups = match.groups()
+            timing = (_clock_ms(*groups[:4]), _clock_ms(*groups[4:]))
+
+    if timing is not None and text:
+        yield timing[0], timing[1], '\n'.join(text)
+
+
+@register_format('srt', extensions=('.srt',), sniff=lambda head: SRT_SNIFF.search(head) is not None)
+def parse_srt(lines):
+    timing = None
+    text = []
+    for line in lines:
+        line = line.strip()
+        match = SRT_TIMING.search(line) if '-->' in line else None
+        if match:
+            if timing is not None:
+                if text and text[-1].isdigit():
+                    text.pop()
+                if text:
+                    yield timing[0], timing[1], '\n'.join(text)
+            groups = match.groups()
+            timing = (_clock_ms(*groups[:4]), _clock_ms(*groups[4:]))
+            text = []
+        elif timing is None:
+            continue
+        elif line:
+            line = strip_markup(line).strip()
+            if line:
+                text.append(line)
+        else:
+            if text:
+                yield timing[0], timing[1], '\n'.join(text)
+            timing = None
+            text = []
+
+    if timing is not None and text:
+        yield timing[0], timing[1], '\n'.join(text)
+
+
+def _ass_time(value):
+    match = ASS_TIME.match(value.strip())
+    return _clock_ms(*match.groups()) if match else None
+
+
+def _ass_text(text):
+    if '{' in text:
+        if ASS_DRAWING.search(text):
+            return ''
+        text = ASS_OVERRIDE.sub('', text)
+    if '\\' in text:
+        text = text.replace('\\N', '\n').replace('\\n', '\n').replace('\\h', ' ')
+    if '<' in text or '&' in text:
+        text = strip_markup(text)
+    return _cue_text(text.split('\n'))
+
+
+@register_format('ass', extensions=('.ass', '.ssa'), sniff=lambda head: '[Script Info]' in head or '[Events]' in head)
+def parse_ass(lines):
+    fields = ['layer', 'start', 'end', 'style', 'name', 'marginl', 'marginr', 'marginv', 'effect', 'text']
+    in_events = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_events = line.lower() == '[events]'
+            continue
+        if not in_events:
+            continue
+
+        key, _, value = line.partition(':')
+        key = key.strip().lower()
+        if key == 'format':
+            fields = [field.strip().lower() for field in value.split(',')]
+        elif key == 'dialogue':
+            values = value.split(',', len(fields) - 1)
+            if len(values) < len(fields):
+                continue
+            event = dict(zip(fields, values))
+            start, end = _ass_time(event.get('start', '')), _ass_time(event.get('end', ''))
+            text = _ass_text(event.get('text', ''))
+            if start is not None and end is not None and text:
+                yield start, end, text
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2] if isinstance(tag, str) else ''
+
+
+def _ttml_ms(value, frame_rate, tick_rate):
+    value = (value or '').strip()
+    match = TTML_CLOCK.match(value)
+    if match:
+        hours, minutes, seconds, fraction, frames = match.groups()
+        ms = _clock_ms(hours, minutes, seconds, fraction)
+        return ms + round(float(frames) * 1000 / frame_rate) if frames else ms
+    match = TTML_OFFSET.match(value)
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2)
+    scale = {'h': 3600000, 'm': 60000, 's': 1000, 'ms': 1, 'f': 1000 / frame_rate, 't': 1000 / tick_rate}[unit]
+    return round(number * scale)
+
+
+def _ttml_text(element):
+    parts = [WHITESPACE.sub(' ', element.text or '')]
+    for child in element:
+        parts.append('\n' if _local_name(child.tag) == 'br' else _ttml_text(child))
+        parts.append(WHITESPACE.sub(' ', child.tail or ''))
+    return ''.join(parts)
+
+
+@register_format('ttml', extensions=('.ttml', '.dfxp', '.xml'), sniff=lambda head: '<tt' in head and 'ttml' in head)
+def parse_ttml(lines):
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    frame_rate = 30.0
+    tick_rate = 1.0
+    for line in lines:
+        parser.feed(line if line.endswith('\n') else line + '\n')
+        for event, element in parser.read_events():
+            name = _local_name(element.tag)
+            if event == 'start':
+                if name == 'tt':
+                    declared_frame_rate = element.get(TTML_PARAMETER_NS + 'frameRate')
+                    declared_tick_rate = element.get(TTML_PARAMETER_NS + 'tickRate')
+                    frame_rate = float(declared_frame_rate or frame_rate)
+                    tick_rate = float(declared_tick_rate or (frame_rate if declared_frame_rate else 1.0))
+                continue
+            if name != 'p':
+                continue
+
+            begin = _ttml_ms(element.get('begin'), frame_rate, tick_rate)
+            end = _ttml_ms(element.get('end'), frame_rate, tick_rate)
+            if end is None and begin is not None and element.get('dur'):
+                duration = _ttml_ms(element.get('dur'), frame_rate, tick_rate)
+                end = begin + duration if duration is not None else None
+            text = _cue_text(_ttml_text(element).split('\n'))
+            element.clear()
+            if begin is not None and end is not None and text:
+                yield begin, end, text
+    parser.close()
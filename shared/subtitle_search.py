@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+CYRILLIC_PATTERN = re.compile(r'[а-я]')
+MIN_STEM = 3
+
+RU_REFLEXIVE = ('ся', 'сь')
+RU_ENDINGS = frozenset((
+    'иями', 'ями', 'ами', 'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ать', 'ять', 'еть', 'ить', 'ешь', 'ишь',
+    'ете', 'ите', 'ила', 'ило', 'или', 'ала', 'ало', 'али', 'ела', 'ело', 'ели', 'ует', 'уют', 'ов', 'ев',
+    'ей', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ах',
+    'ях', 'ых', 'их', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят', 'ил', 'ал', 'ел', 'а', 'я', 'о', 'е', 'и', 'ы', 'у',
+    'ю', 'й', 'ь'
+))
+RU_ENDING_LENGTHS = sorted({len(ending) for ending in RU_ENDINGS}, reverse=True)
+EN_SUFFIXES = (('ies', 'y'), ('sses', 'ss'), ('ing', ''), ('ed', ''), ('es', ''), ('s', ''), ('ly', ''))
+EN_DOUBLES = set('bdgmnprt')
+
+
+def _stem_ru(word):
+    for ending in RU_REFLEXIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    for length in RU_ENDING_LENGTHS:
+        if len(word) - length >= MIN_STEM and word[-length:] in RU_ENDINGS:
+            return word[:-length]
+    return word
+
+
+def _stem_en(word):
+    if word.endswith('ss') or word.endswith('us'):
+        return word
+    for suffix, replacement in EN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)] + replacement
+            if suffix in ('ing', 'ed') and word[-1] == word[-2] and word[-1] in EN_DOUBLES:
+                word = word[:-1]
+            break
+    if word.endswith('e') and len(word) > MIN_STEM:
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def normalize(word):
+    word = word.lower().replace('ё', 'е')
+    if word.isdigit():
+        return word
+    if CYRILLIC_PATTERN.search(word):
+        return _stem_ru(word)
+    return _stem_en(word)
+
+
+def tokenize(text):
+    if '<' in text:
+        text = TAG_PATTERN.sub(' ', text)
+    return [normalize(word) for word in TOKEN_PATTERN.findall(text)]
+
+
+class SubtitleIndex:
+    def __init__(self, texts=()):
+        self.postings = {}
+        self.size = 0
+        for text in texts:
+            self.add(text)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, text):
+        cue_id = self.size
+        self.size += 1
+        for token in tokenize(text):
+            cue_ids = self.postings.get(token)
+            if cue_ids is None:
+                self.postings[token] = [cue_id]
+            elif cue_ids[-1] != cue_id:
+                cue_ids.append(cue_id)
+        return cue_id
+
+    def search(self, query):
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        lists = sorted((self.postings.get(token, ()) for token in tokens), key=len)
+        result = lists[0]
+        for cue_ids in lists[1:]:
+            if not result:
+                break
+            members = set(cue_ids)
+            result = [cue_id for cue_id in result if cue_id in members]
+        return list(result)
+
+    def stats(self):
+        return {'cues': self.size, 'terms': len(self.postings), 'postings': sum(map(len, self.postings.values()))}
@@ -0,0 +1,36 @@
+import zlib
+from itertools import accumulate
+
+import msgpack
+
+from shared.subtitle_formats import FORMATS
+
+TRACK_FORMAT = 1
+
+
+def twin_url(url):
+    return url.replace('rus', 'eng') if url and 'rus' in url else None
+
+
+def sort_cues(cues):
+    return sorted(cues, key=lambda cue: cue[0])
+
+
+def parse_cues(lines, subtitle_format=None):
+    return sort_cues(FORMATS[subtitle_format or 'vtt'].parse(lines))
+
+
+def pack_track(url, cues):
+    starts = [cue[0] for cue in cues]
+    deltas = [current - previous for previous, current in zip([0] + starts, starts)]
+    durations = [end - start for start, end, _ in cues]
+    texts = [cue[2] for cue in cues]
+    return zlib.compress(msgpack.packb([TRACK_FORMAT, url, deltas, durations, texts], use_bin_type=True), 9)
+
+
+def unpack_track(blob):
+    version, url, deltas, durations, texts = msgpack.unpackb(zlib.decompress(blob), raw=False)
+    if version != TRACK_FORMAT:
+        raise ValueError(f"Unsupported subtitle track format: {version}")
+    starts = list(accumulate(deltas))
+    return url, [(start, start + duration, text) for start, duration, text in zip(starts, durations, texts)]